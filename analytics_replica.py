@@ -0,0 +1,185 @@
+import os
+import sys
+import tempfile
+import time
+import duckdb
+from db import connect, release
+
+# Local columnar copy of the ranking history for diagnostics and ad-hoc
+# analysis; queries against it cost no Neon compute.
+REPLICA_PATH = os.getenv("ANALYTICS_REPLICA_PATH", "analytics_replica.duckdb")
+
+# Mirrored tables: (name, day column or None for a full refresh, columns as (name, DuckDB type))
+TABLES = (
+    ("miniapps", None, (
+        ("id", "VARCHAR"), ("short_id", "VARCHAR"), ("name", "VARCHAR"), ("domain", "VARCHAR"),
+        ("home_url", "VARCHAR"), ("icon_url", "VARCHAR"), ("image_url", "VARCHAR"),
+        ("splash_image_url", "VARCHAR"), ("splash_background_color", "VARCHAR"), ("button_title", "VARCHAR"),
+        ("supports_notifications", "BOOLEAN"), ("primary_category", "VARCHAR"), ("author_fid", "BIGINT"),
+        ("author_username", "VARCHAR"), ("author_display_name", "VARCHAR"),
+        ("author_follower_count", "INTEGER"), ("author_following_count", "INTEGER"),
+        ("created_at", "TIMESTAMPTZ"), ("updated_at", "TIMESTAMPTZ"),
+    )),
+    ("miniapp_rankings", "ranking_date", (
+        ("miniapp_id", "VARCHAR"), ("ranking_date", "DATE"), ("rank", "INTEGER"),
+        ("rank_72h_change", "INTEGER"),
+    )),
+    ("miniapp_statistics", "stat_date", (
+        ("miniapp_id", "VARCHAR"), ("stat_date", "DATE"), ("current_rank", "INTEGER"),
+        ("rank_24h_change", "INTEGER"), ("rank_72h_change", "INTEGER"), ("rank_7d_change", "INTEGER"),
+        ("rank_30d_change", "INTEGER"), ("total_rankings", "INTEGER"), ("avg_rank", "DOUBLE"),
+        ("best_rank", "INTEGER"), ("worst_rank", "INTEGER"),
+        ("rank_24h_window_days", "SMALLINT"), ("rank_72h_window_days", "SMALLINT"),
+        ("rank_7d_window_days", "SMALLINT"), ("rank_30d_window_days", "SMALLINT"),
+    )),
+)
+
+# Per-day fingerprint of the Neon rows each replicated day was copied from
+DAYS_TABLE = "replica_days"
+
+
+def _create_tables(replica):
+    """Creates the mirrored tables; one whose columns changed since is recreated empty."""
+    replica.execute(f"CREATE TABLE IF NOT EXISTS {DAYS_TABLE} (table_name VARCHAR, day DATE, rows BIGINT, fingerprint VARCHAR)")
+    for name, _, columns in TABLES:
+        existing = [r[0] for r in replica.execute(
+            "SELECT column_name FROM information_schema.columns WHERE table_name = ? ORDER BY ordinal_position", [name]
+        ).fetchall()]
+        if existing and existing != [c for c, _ in columns]:
+            replica.execute(f"DROP TABLE {name}")
+            replica.execute(f"DELETE FROM {DAYS_TABLE} WHERE table_name = ?", [name])
+        replica.execute(f"CREATE TABLE IF NOT EXISTS {name} ({', '.join(f'{c} {t}' for c, t in columns)})")
+
+
+def watermark(replica, table, column):
+    """Latest day present in the replica's copy of `table`, or None when empty."""
+    return replica.execute(f"SELECT MAX({column}) FROM {table}").fetchone()[0]
+
+
+def day_fingerprints(cursor, name, column, columns):
+    """{day: (rows, fingerprint)} of a Neon table's mirrored columns, from one aggregate scan.
+
+    The fingerprint is an order-independent sum of row hashes, so any
+    rewritten, added or deleted row of a day changes it.
+    """
+    cursor.execute(f"""
+        SELECT {column}, COUNT(*), SUM(hashtextextended(ROW({', '.join(c for c, _ in columns)})::text, 0))::text
+        FROM {name} GROUP BY {column}
+    """)
+    return {day: (rows, fingerprint) for day, rows, fingerprint in cursor.fetchall()}
+
+
+def _copy_table(cursor, replica, name, columns, where="", params=()):
+    """Streams the selected Postgres rows into the replica through a CSV file."""
+    select = cursor.mogrify(f"SELECT {', '.join(c for c, _ in columns)} FROM {name} {where}", params).decode()
+    with tempfile.NamedTemporaryFile(suffix=".csv") as f:
+        cursor.copy_expert(f"COPY ({select}) TO STDOUT WITH (FORMAT csv)", f)
+        f.flush()
+        # DuckDB cannot sniff an empty file
+        if f.tell() == 0:
+            return 0
+        # Quoted empty fields are empty strings; only unquoted ones are NULL
+        types = "{" + ", ".join(f"'{c}': '{t}'" for c, t in columns) + "}"
+        return replica.execute(
+            f"INSERT INTO {name} SELECT * FROM read_csv(?, header = false, columns = {types}, allow_quoted_nulls = false)",
+            [f.name]
+        ).fetchone()[0]
+
+
+def sync(path=None):
+    """Brings the replica up to date with Neon and returns {table: rows copied}.
+
+    Dated tables are compared day by day: a day is copied again whenever
+    its row count or fingerprint in Neon differs from the one it was last
+    copied with, so days rewritten by a backfill or a rank_derivation rerun
+    are picked up, not only new ones. Days that partition_manager has since
+    rolled up in Neon are kept here with their daily rows. miniapps is
+    small and is replaced in full.
+    """
+    copied = {}
+    conn = None
+    replica = duckdb.connect(path or REPLICA_PATH)
+    try:
+        conn = connect(statement_timeout_ms=0)
+        cursor = conn.cursor()
+        replica.execute("BEGIN")
+        _create_tables(replica)
+        for name, column, columns in TABLES:
+            if column is None:
+                replica.execute(f"DELETE FROM {name}")
+                copied[name] = _copy_table(cursor, replica, name, columns)
+                continue
+            source = day_fingerprints(cursor, name, column, columns)
+            synced = {
+                day: (rows, fingerprint) for day, rows, fingerprint in replica.execute(
+                    f"SELECT day, rows, fingerprint FROM {DAYS_TABLE} WHERE table_name = ?", [name]
+                ).fetchall()
+            }
+            changed = sorted(day for day, state in source.items() if synced.get(day) != state)
+            copied[name] = 0
+            if not changed:
+                continue
+            replica.execute(f"DELETE FROM {name} WHERE list_contains(?, {column})", [changed])
+            copied[name] = _copy_table(cursor, replica, name, columns, f"WHERE {column} = ANY(%s::date[])", (changed,))
+            replica.execute(f"DELETE FROM {DAYS_TABLE} WHERE table_name = ? AND list_contains(?, day)", [name, changed])
+            replica.executemany(
+                f"INSERT INTO {DAYS_TABLE} VALUES (?, ?, ?, ?)",
+                [(name, day, *source[day]) for day in changed]
+            )
+        replica.execute("COMMIT")
+    finally:
+        release(conn)
+        replica.close()
+    return copied
+
+
+def query(sql, params=None, path=None):
+    """Runs a read-only query on the replica; returns (column names, rows)."""
+    replica = duckdb.connect(path or REPLICA_PATH, read_only=True)
+    try:
+        result = replica.execute(sql, params or [])
+        return [d[0] for d in result.description], result.fetchall()
+    finally:
+        replica.close()
+
+
+def _print_table(columns, rows):
+    cells = [[("" if v is None else str(v)) for v in row] for row in rows]
+    widths = [max([len(c)] + [len(r[i]) for r in cells]) for i, c in enumerate(columns)]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in cells:
+        print("  ".join(v.ljust(w) for v, w in zip(row, widths)))
+
+
+def main():
+    args = sys.argv[1:]
+    if args[:1] == ["--sync"]:
+        started = time.perf_counter()
+        copied = sync()
+        for name, rows in copied.items():
+            print(f"   {name}: {rows} rows copied")
+        print(f"✅ Replica {REPLICA_PATH} synced in {time.perf_counter() - started:.1f}s")
+    elif args[:1] == ["--status"]:
+        replica = duckdb.connect(REPLICA_PATH, read_only=True)
+        try:
+            for name, column, _ in TABLES:
+                rows = replica.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+                mark = f", watermark {watermark(replica, name, column)}" if column else ""
+                print(f"   {name}: {rows} rows{mark}")
+        finally:
+            replica.close()
+    elif len(args) == 1:
+        # A query, or a file holding one
+        sql = open(args[0]).read() if args[0].endswith(".sql") else args[0]
+        started = time.perf_counter()
+        columns, rows = query(sql)
+        _print_table(columns, rows)
+        print(f"({len(rows)} rows, {(time.perf_counter() - started) * 1000:.0f} ms)")
+    else:
+        print('Usage: python analytics_replica.py [--sync | --status | "SELECT ..." | query.sql]')
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
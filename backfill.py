@@ -0,0 +1,293 @@
+import argparse
+import glob
+import json
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date, timedelta
+from dotenv import load_dotenv
+from db import connect, release
+from bulk_loader import BulkLoader, miniapp_row
+from miniapp_fetcher import FetchError
+from miniapp_schema import snapshot_entries
+from running_aggregates import rebuild
+from rank_derivation import LOOKBACK_DAYS, derive_changes
+from snapshot_archive import ArchiveError, SnapshotArchive
+from object_store import ObjectStoreError, open_store
+from json_codec import loads
+from backup_store import STORE_DIR, BackupStoreError, get_snapshot, list_days
+
+load_dotenv()
+
+_BACKUP_NAME_RE = re.compile(r"top_miniapps_(\d{4}-\d{2}-\d{2})\.json$")
+
+def decode_snapshot(day, raw=None, path=None, archive=None, store_dir=None):
+    """Parses one day's payload into `miniapps` and `miniapp_rankings` rows.
+
+    The payload is a raw JSON string, a JSON file, an (archive path, sha256)
+    pair or a backup store directory. Runs in a worker process, so it only
+    takes and returns plain data; any unreadable payload raises ValueError.
+    """
+    try:
+        if archive:
+            entries = SnapshotArchive(*archive).entries()
+        elif store_dir:
+            entries = get_snapshot(day, store_dir)
+        else:
+            if path:
+                with open(path, "rb") as f:
+                    raw = f.read()
+            entries = snapshot_entries(loads(raw))
+        meta_rows = [miniapp_row(e['miniApp']) for e in entries]
+        ranking_rows = [(e['miniApp']['id'], day, e['rank'], e.get('rank72hChange')) for e in entries]
+    except (OSError, ValueError, KeyError, TypeError, ArchiveError, BackupStoreError, FetchError) as e:
+        raise ValueError(f"{day}: {type(e).__name__}: {e}")
+    return day, meta_rows, ranking_rows
+
+
+def find_backup_files(json_dir, start, end):
+    """Returns {date: path} of dated JSON backups (and top_miniapps.json) in range."""
+    files = {}
+    for path in glob.glob(os.path.join(json_dir, "top_miniapps_*.json")):
+        match = _BACKUP_NAME_RE.search(path)
+        if match:
+            day = date.fromisoformat(match.group(1))
+            if start <= day <= end:
+                files[day] = path
+    # The undated file carries its date inside the wrapper
+    latest = os.path.join(json_dir, "top_miniapps.json")
+    if os.path.exists(latest):
+        try:
+            with open(latest, encoding="utf-8") as f:
+                snapshot_date = json.load(f).get('snapshotDate')
+        except (ValueError, AttributeError):
+            snapshot_date = None
+        if snapshot_date:
+            day = date.fromisoformat(snapshot_date)
+            if start <= day <= end:
+                files.setdefault(day, latest)
+    return files
+
+
+def iter_db_snapshots(conn, start, end):
+    """Streams (date, raw_json, archive_path, archive_sha256, object_key) with a server-side cursor."""
+    with conn.cursor(name="backfill_snapshots") as cursor:
+        cursor.itersize = 4
+        cursor.execute("""
+            SELECT snapshot_date, raw_json, archive_path, archive_sha256, object_key FROM ranking_snapshots
+            WHERE snapshot_date BETWEEN %s AND %s
+              AND (raw_json IS NOT NULL OR archive_path IS NOT NULL OR object_key IS NOT NULL)
+            ORDER BY snapshot_date
+        """, (start, end))
+        yield from cursor
+
+
+def derive_range(cursor, start, end):
+    """Rebuilds the change tables and miniapp_statistics for [start, end]."""
+    params = {"start": start, "end": end}
+    for table, rows in derive_changes(cursor, start, end).items():
+        print(f"   - {table}: {rows} rows")
+
+    # Statistics use previous - current (positive = climbed), like daily_update_simple.
+    # Aggregates are cumulative up to each date over the same history as
+    # running_aggregates: daily ranks plus the weekly rollups of days that
+    # retention (partition_manager.py) removed. A rolled-up week counts once,
+    # even if its days were just backfilled again.
+    cursor.execute("""
+        WITH history AS (
+            SELECT miniapp_id, ranking_date AS day, rank, rank_72h_change,
+                   1 AS days_ranked, rank AS rank_sum, rank AS best_rank, rank AS worst_rank
+            FROM miniapp_rankings d
+            WHERE ranking_date <= %(end)s AND rank > 0
+              AND NOT EXISTS (
+                  SELECT 1 FROM miniapp_rank_history_weekly w
+                  WHERE w.miniapp_id = d.miniapp_id AND w.week_start = date_trunc('week', d.ranking_date)::date
+              )
+            UNION ALL
+            SELECT miniapp_id, last_seen_date, NULL, NULL, days_ranked, rank_sum, best_rank, worst_rank
+            FROM miniapp_rank_history_weekly
+            WHERE last_seen_date <= %(end)s
+        )
+        INSERT INTO miniapp_statistics (
+            miniapp_id, stat_date, current_rank,
+            rank_24h_change, rank_72h_change, rank_7d_change, rank_30d_change,
+            total_rankings, avg_rank, best_rank, worst_rank,
+            rank_24h_window_days, rank_72h_window_days, rank_7d_window_days, rank_30d_window_days
+        )
+        SELECT
+            r.miniapp_id,
+            r.ranking_date,
+            r.rank,
+            -r24.rank_24h_change,
+            r.rank_72h_change,
+            -rw.rank_7d_change,
+            -r30.rank_30d_change,
+            r.total_rankings,
+            r.avg_rank,
+            r.best_rank,
+            r.worst_rank,
+            r24.window_days,
+            CASE WHEN r.rank_72h_change IS NOT NULL THEN 3 END,
+            rw.window_days,
+            r30.window_days
+        FROM (
+            SELECT
+                miniapp_id, day AS ranking_date, rank, rank_72h_change,
+                SUM(days_ranked) OVER w as total_rankings,
+                (SUM(rank_sum) OVER w)::numeric / SUM(days_ranked) OVER w as avg_rank,
+                MIN(best_rank) OVER w as best_rank,
+                MAX(worst_rank) OVER w as worst_rank
+            FROM history
+            WINDOW w AS (PARTITION BY miniapp_id ORDER BY day)
+        ) r
+        LEFT JOIN miniapp_rankings_24h r24 ON r.miniapp_id = r24.miniapp_id
+            AND r.ranking_date = r24.ranking_date
+        LEFT JOIN miniapp_rankings_weekly rw ON r.miniapp_id = rw.miniapp_id
+            AND r.ranking_date = rw.ranking_date
+        LEFT JOIN miniapp_rankings_30d r30 ON r.miniapp_id = r30.miniapp_id
+            AND r.ranking_date = r30.ranking_date
+        WHERE r.rank IS NOT NULL AND r.ranking_date BETWEEN %(start)s AND %(end)s
+        ON CONFLICT (miniapp_id, stat_date) DO UPDATE SET
+            current_rank = EXCLUDED.current_rank,
+            rank_24h_change = EXCLUDED.rank_24h_change,
+            rank_72h_change = EXCLUDED.rank_72h_change,
+            rank_7d_change = EXCLUDED.rank_7d_change,
+            rank_30d_change = EXCLUDED.rank_30d_change,
+            total_rankings = EXCLUDED.total_rankings,
+            avg_rank = EXCLUDED.avg_rank,
+            best_rank = EXCLUDED.best_rank,
+            worst_rank = EXCLUDED.worst_rank,
+            rank_24h_window_days = EXCLUDED.rank_24h_window_days,
+            rank_72h_window_days = EXCLUDED.rank_72h_window_days,
+            rank_7d_window_days = EXCLUDED.rank_7d_window_days,
+            rank_30d_window_days = EXCLUDED.rank_30d_window_days
+    """, params)
+    print(f"   - miniapp_statistics: {cursor.rowcount} rows")
+
+
+def find_store_days(store_dir, start, end):
+    """Returns the dates in range that the backup store can reconstruct."""
+    return {d for d in map(date.fromisoformat, list_days(store_dir)) if start <= d <= end}
+
+
+def backfill(start, end, json_dir=".", workers=None, use_db_snapshots=True, store_dir=None):
+    """Re-derives the ranking history tables for every day in [start, end]."""
+    conn = None
+    read_conn = None
+    try:
+        conn = connect(statement_timeout_ms=0)
+        cursor = conn.cursor()
+        loader = BulkLoader(cursor)
+        loader.create_staging()
+        files = find_backup_files(json_dir, start, end)
+        store_dir = store_dir or STORE_DIR
+        store_days = find_store_days(store_dir, start, end)
+        loaded_days = []
+
+        print(f"=== BACKFILL {start} .. {end} ===")
+        started = time.perf_counter()
+        def jobs():
+            """(day, [decode_snapshot kwargs, ...]) in source preference order, DB
+            snapshots first; a day's later sources are its fallbacks. Generated lazily."""
+            nonlocal read_conn
+
+            def fallbacks(day):
+                sources = []
+                if day in store_days:
+                    store_days.discard(day)
+                    sources.append({"store_dir": store_dir})
+                if day in files:
+                    sources.append({"path": files.pop(day)})
+                return sources
+
+            if use_db_snapshots:
+                # Separate connection: the named cursor streams while the main one COPYs
+                read_conn = connect(statement_timeout_ms=0)
+                store = open_store()
+                for day, raw, archive_file, archive_sha256, object_key in iter_db_snapshots(read_conn, start, end):
+                    if object_key:
+                        # Fetched from the object store only now (a no-op for the local store)
+                        try:
+                            archive_file = store.local_path(object_key)
+                        except ObjectStoreError as e:
+                            print(f"⚠️  Archive missing for {day}: {e}")
+                            continue
+                    elif raw is None and not os.path.exists(archive_file):
+                        print(f"⚠️  Archive missing for {day}: {archive_file}")
+                        continue
+                    archive = None if raw is not None else (archive_file, archive_sha256)
+                    # The DB snapshot wins over a backup, which stays as its fallback
+                    yield day, [{"raw": raw, "archive": archive}] + fallbacks(day)
+            for day in sorted(store_days | set(files)):
+                yield day, fallbacks(day)
+
+        # At most `window` payloads are held in memory or in flight at once
+        window = (workers or os.cpu_count() or 1) * 2
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = {}
+            queued = jobs()
+            while True:
+                for day, sources in queued:
+                    pending[pool.submit(decode_snapshot, day, **sources[0])] = day, sources[1:]
+                    if len(pending) >= window:
+                        break
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    day, rest = pending.pop(future)
+                    try:
+                        day, meta_rows, ranking_rows = future.result()
+                    except ValueError as e:
+                        if rest:
+                            print(f"⚠️  Unreadable snapshot, trying the next source: {e}")
+                            pending[pool.submit(decode_snapshot, day, **rest[0])] = day, rest[1:]
+                        else:
+                            print(f"⚠️  Skipping unreadable snapshot: {e}")
+                        continue
+                    loader.copy_rows(meta_rows, ranking_rows)
+                    loaded_days.append(day)
+                    print(f"   Decoded {day}: {len(ranking_rows)} rankings")
+
+        if not loaded_days:
+            print("❌ No snapshots found in range")
+            return False
+
+        # Historical metadata must not overwrite what today's run stored
+        loader.merge_miniapps(update_existing=False)
+        loader.merge_rankings()
+        print("Deriving change tables and statistics...")
+        # Later days' 7d/30d changes look back into the backfilled range too
+        derive_end = min(max(loaded_days) + timedelta(days=LOOKBACK_DAYS), max(end, date.today()))
+        derive_range(cursor, min(loaded_days), derive_end)
+        rebuilt = rebuild(cursor)
+        conn.commit()
+
+        print(f"✅ Backfilled {len(loaded_days)} days in {time.perf_counter() - started:.1f}s")
+        print(f"   - Running aggregates rebuilt: {rebuilt} miniapps")
+        loader.print_stats()
+        return True
+    except Exception as e:
+        print(f"❌ Backfill error: {e}")
+        return False
+    finally:
+        release(read_conn)
+        release(conn)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild ranking history tables from stored snapshots")
+    parser.add_argument("start", type=date.fromisoformat, help="first day (YYYY-MM-DD)")
+    parser.add_argument("end", type=date.fromisoformat, nargs="?", default=date.today(), help="last day (default: today)")
+    parser.add_argument("--json-dir", default=".", help="directory with top_miniapps_YYYY-MM-DD.json backups")
+    parser.add_argument("--store-dir", default=None, help="backup store directory (default: BACKUP_STORE_DIR)")
+    parser.add_argument("--workers", type=int, default=None, help="decoder processes (default: CPU count)")
+    parser.add_argument("--files-only", action="store_true", help="ignore snapshots stored in ranking_snapshots")
+    args = parser.parse_args()
+    ok = backfill(args.start, args.end, args.json_dir, args.workers, not args.files_only, args.store_dir)
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
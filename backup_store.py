@@ -0,0 +1,177 @@
+import glob
+import os
+import re
+import sys
+import zlib
+from content_hash import VOLATILE_KEYS, digest
+from json_codec import dumps, loads, read_file
+
+# Content-addressed backup store:
+#   objects/ab/<hash>.z          one zlib-compressed record, shared by every day it appears in
+#   manifests/YYYY-MM-DD.json.z  the day's entries with each miniApp replaced by object hashes
+# App metadata and author profiles are separate records, so a follower count change does not
+# duplicate the app; per-viewer fields stay inline. A day that repeats yesterday's records
+# costs only its manifest.
+STORE_DIR = os.getenv("BACKUP_STORE_DIR", "backup_store")
+
+_DATED_BACKUP_RE = re.compile(r"top_miniapps_(\d{4}-\d{2}-\d{2})\.json$")
+
+
+class BackupStoreError(Exception):
+    """Raised for missing days or corrupt objects."""
+
+
+def _canonical(value):
+    # Unlike content_hash.normalize nothing is dropped: a backup restores the payload as fetched
+    return dumps(value, sort_keys=True)
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _object_path(store_dir, object_hash):
+    return os.path.join(store_dir, "objects", object_hash[:2], f"{object_hash}.z")
+
+
+def _manifest_path(store_dir, day):
+    return os.path.join(store_dir, "manifests", f"{day}.json.z")
+
+
+def put_object(value, store_dir=None):
+    """Stores one record unless an identical one exists; returns (hash, newly written)."""
+    data = _canonical(value)
+    object_hash = digest(data)
+    path = _object_path(store_dir or STORE_DIR, object_hash)
+    if os.path.exists(path):
+        return object_hash, False
+    _write_atomic(path, zlib.compress(data, 9))
+    return object_hash, True
+
+
+def get_object(object_hash, store_dir=None):
+    path = _object_path(store_dir or STORE_DIR, object_hash)
+    try:
+        with open(path, "rb") as f:
+            data = zlib.decompress(f.read())
+    except (OSError, zlib.error) as e:
+        raise BackupStoreError(f"Unreadable object {object_hash}: {e}")
+    if digest(data) != object_hash:
+        raise BackupStoreError(f"Corrupt object {object_hash}")
+    return loads(data)
+
+
+def _split_miniapp(miniapp):
+    """Splits a miniApp into (app record, author record or None, inline volatile fields)."""
+    record = dict(miniapp)
+    inline = {k: record.pop(k) for k in VOLATILE_KEYS if k in record}
+    # Only an author profile is split off; a null author stays in the record so it is restored
+    author = record.pop("author") if isinstance(record.get("author"), dict) else None
+    return record, author, inline
+
+
+def put_snapshot(miniapps_data, day, store_dir=None):
+    """Stores one day's ranking; returns (records written, records deduplicated)."""
+    store_dir = store_dir or STORE_DIR
+    entries = []
+    written = reused = 0
+    for entry in miniapps_data:
+        frame = {k: v for k, v in entry.items() if k != "miniApp"}
+        if isinstance(entry.get("miniApp"), dict):
+            record, author, inline = _split_miniapp(entry["miniApp"])
+            ref = {"record": record, "author": author} if author is not None else {"record": record}
+            for key, value in ref.items():
+                ref[key], is_new = put_object(value, store_dir)
+                written += is_new
+                reused += not is_new
+            frame["miniApp"] = {**ref, **inline}
+        entries.append(frame)
+    manifest = _canonical({"snapshotDate": str(day), "entries": entries})
+    _write_atomic(_manifest_path(store_dir, day), zlib.compress(manifest, 9))
+    return written, reused
+
+
+def get_snapshot(day, store_dir=None):
+    """Reconstructs the ranking list stored for a day."""
+    store_dir = store_dir or STORE_DIR
+    try:
+        with open(_manifest_path(store_dir, day), "rb") as f:
+            manifest = loads(zlib.decompress(f.read()))
+    except FileNotFoundError:
+        raise BackupStoreError(f"No backup for {day}")
+    cache = {}
+
+    def load(object_hash):
+        if object_hash not in cache:
+            cache[object_hash] = get_object(object_hash, store_dir)
+        return cache[object_hash]
+
+    miniapps_data = []
+    for frame in manifest["entries"]:
+        entry = dict(frame)
+        if "miniApp" in entry:
+            ref = dict(entry["miniApp"])
+            miniapp = dict(load(ref.pop("record")))
+            if "author" in ref:
+                miniapp["author"] = load(ref.pop("author"))
+            miniapp.update(ref)
+            entry["miniApp"] = miniapp
+        miniapps_data.append(entry)
+    return miniapps_data
+
+
+def list_days(store_dir=None):
+    """Returns the dates (YYYY-MM-DD strings) that have a stored snapshot."""
+    paths = glob.glob(os.path.join(store_dir or STORE_DIR, "manifests", "*.json.z"))
+    return sorted(os.path.basename(p)[:-len(".json.z")] for p in paths)
+
+
+def disk_usage(store_dir=None):
+    """Returns (manifest bytes, object bytes, object count)."""
+    store_dir = store_dir or STORE_DIR
+    manifests = glob.glob(os.path.join(store_dir, "manifests", "*.json.z"))
+    objects = glob.glob(os.path.join(store_dir, "objects", "*", "*.z"))
+    return (
+        sum(os.path.getsize(p) for p in manifests),
+        sum(os.path.getsize(p) for p in objects),
+        len(objects),
+    )
+
+
+def import_json_backups(json_dir=".", store_dir=None):
+    """Adds every top_miniapps_YYYY-MM-DD.json in json_dir to the store."""
+    imported = 0
+    for path in sorted(glob.glob(os.path.join(json_dir, "top_miniapps_*.json"))):
+        match = _DATED_BACKUP_RE.search(path)
+        if not match:
+            continue
+        payload = read_file(path)
+        if isinstance(payload, dict):
+            payload = payload.get("miniapps", [])
+        written, reused = put_snapshot(payload, match.group(1), store_dir)
+        imported += 1
+        print(f"   {match.group(1)}: {written} new records, {reused} deduplicated")
+    return imported
+
+
+def main():
+    args = sys.argv[1:]
+    if args[:1] == ["--import"]:
+        imported = import_json_backups(args[1] if len(args) > 1 else ".")
+        print(f"✅ Imported {imported} backups")
+    elif args:
+        sys.stdout.buffer.write(dumps(get_snapshot(args[0]), pretty=True) + b"\n")
+        return
+    days = list_days()
+    manifest_bytes, object_bytes, object_count = disk_usage()
+    print(f"{len(days)} days stored" + (f" ({days[0]} .. {days[-1]})" if days else ""))
+    print(f"   - Manifests: {manifest_bytes} bytes")
+    print(f"   - Objects: {object_count} records, {object_bytes} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+import time
+from contextlib import contextmanager
+from content_hash import row_hash
+from miniapp_schema import MiniApp
+
+METADATA_COLUMNS = (
+    "id", "short_id", "name", "domain", "home_url", "icon_url", "image_url",
+    "splash_image_url", "splash_background_color", "button_title",
+    "supports_notifications", "primary_category", "author_fid",
+    "author_username", "author_display_name", "author_follower_count",
+    "author_following_count",
+)
+MINIAPP_COLUMNS = METADATA_COLUMNS + ("meta_hash",)
+
+RANKING_COLUMNS = ("miniapp_id", "ranking_date", "rank", "rank_72h_change")
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _copy_value(value):
+    """Formats one value for COPY ... (FORMAT text)."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return str(value).translate(_COPY_ESCAPES)
+
+
+class _RowStream:
+    """File-like object that renders rows as COPY text lazily, chunk by chunk."""
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._buffer = ""
+        self.count = 0
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._buffer += "\t".join(_copy_value(v) for v in row) + "\n"
+            self.count += 1
+        if size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+
+def miniapp_row(miniapp):
+    """Returns the `miniapps` row for one API miniApp object or MiniApp record."""
+    if not isinstance(miniapp, MiniApp):
+        miniapp = MiniApp.from_api(miniapp, "miniApp")
+    row = miniapp.metadata_row()
+    return row + (row_hash(METADATA_COLUMNS, row),)
+
+
+def _changed(table, columns):
+    """WHERE clause for ON CONFLICT ... DO UPDATE that skips identical rows."""
+    target = ", ".join(f"{table}.{c}" for c in columns)
+    excluded = ", ".join(f"EXCLUDED.{c}" for c in columns)
+    return f"WHERE ({target}) IS DISTINCT FROM ({excluded})"
+
+
+class BulkLoader:
+    """Loads one day of rankings via COPY into temp staging tables, then
+    merges each target table with a single set-based statement.
+
+    `stats` maps every stage that ran to [rows, seconds], summed over
+    repeated runs of the same stage (e.g. one COPY per backfilled day).
+    Merges only write rows that actually changed; `skipped` counts the
+    unchanged rows per merge stage, i.e. the writes avoided.
+    """
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.stats = {}
+        self.skipped = {}
+
+    @contextmanager
+    def _stage(self, name):
+        started = time.perf_counter()
+        entry = [name, 0]
+        yield entry
+        totals = self.stats.setdefault(name, [0, 0.0])
+        totals[0] += entry[1]
+        totals[1] += time.perf_counter() - started
+
+    def _merge(self, name, source_sql, insert_sql, params=None):
+        """Runs `insert_sql` over `source_sql` (exposed as `src`) and counts
+        candidates versus rows actually written, in one round trip."""
+        with self._stage(name) as entry:
+            self.cursor.execute(f"""
+                WITH src AS ({source_sql}),
+                merged AS ({insert_sql} RETURNING 1)
+                SELECT (SELECT COUNT(*) FROM src), (SELECT COUNT(*) FROM merged)
+            """, params)
+            candidates, written = self.cursor.fetchone()
+            entry[1] = written
+            self.skipped[name] = self.skipped.get(name, 0) + candidates - written
+
+    def create_staging(self):
+        with self._stage("create staging"):
+            self.cursor.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS stage_miniapps
+                    (LIKE miniapps INCLUDING DEFAULTS) ON COMMIT DROP;
+                CREATE TEMP TABLE IF NOT EXISTS stage_rankings
+                    (LIKE miniapp_rankings INCLUDING DEFAULTS) ON COMMIT DROP;
+                TRUNCATE stage_miniapps, stage_rankings;
+            """)
+
+    def _copy(self, name, table, columns, rows):
+        with self._stage(name) as entry:
+            stream = _RowStream(rows)
+            self.cursor.copy_expert(
+                f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT text)", stream
+            )
+            entry[1] = stream.count
+
+    def copy_rows(self, miniapp_rows, ranking_rows):
+        """Streams prebuilt `miniapps` and `miniapp_rankings` rows into staging."""
+        self._copy("copy miniapps", "stage_miniapps", MINIAPP_COLUMNS, miniapp_rows)
+        self._copy("copy rankings", "stage_rankings", RANKING_COLUMNS, ranking_rows)
+
+    def copy_rankings(self, miniapps_data, ranking_date):
+        """Streams the metadata and ranking rows of one day into staging."""
+        self.copy_rows(
+            (miniapp_row(item['miniApp']) for item in miniapps_data),
+            ((item['miniApp']['id'], ranking_date, item['rank'], item.get('rank72hChange'))
+             for item in miniapps_data)
+        )
+
+    def merge_miniapps(self, update_existing=True):
+        """Merges staged metadata; with update_existing=False only new apps are added."""
+        columns = ", ".join(MINIAPP_COLUMNS)
+        updates = ",\n                        ".join(f"{c} = EXCLUDED.{c}" for c in MINIAPP_COLUMNS if c not in ("id", "short_id"))
+        if update_existing:
+            conflict = f"""DO UPDATE SET
+                        {updates}
+                    WHERE miniapps.meta_hash IS DISTINCT FROM EXCLUDED.meta_hash"""
+        else:
+            conflict = "DO NOTHING"
+        # DISTINCT ON guards against an app repeated across pages
+        self._merge("merge miniapps", f"""
+                SELECT DISTINCT ON (id) {columns}
+                FROM stage_miniapps
+                ORDER BY id
+            """, f"""
+                INSERT INTO miniapps ({columns})
+                SELECT * FROM src
+                ON CONFLICT (id) {conflict}
+            """)
+
+    def merge_rankings(self):
+        self._merge("merge rankings", """
+                SELECT DISTINCT ON (miniapp_id, ranking_date) miniapp_id, ranking_date, rank, rank_72h_change
+                FROM stage_rankings
+                ORDER BY miniapp_id, ranking_date, rank
+            """, f"""
+                INSERT INTO miniapp_rankings (miniapp_id, ranking_date, rank, rank_72h_change)
+                SELECT * FROM src
+                ON CONFLICT (miniapp_id, ranking_date) DO UPDATE SET
+                    rank = EXCLUDED.rank,
+                    rank_72h_change = EXCLUDED.rank_72h_change
+                {_changed("miniapp_rankings", ("rank", "rank_72h_change"))}
+            """)
+
+    def merge_statistics(self, ranking_date):
+        """Derives miniapp_statistics for the day from rankings, the change
+        tables and the running aggregates (refresh them first).
+
+        The change tables store current - previous; statistics store
+        previous - current (positive = climbed), like daily_update_simple.
+        Rows daily_update.py wrote before that used current - previous;
+        migration 029 flips them.
+        """
+        stat_columns = (
+            "current_rank", "rank_24h_change", "rank_72h_change", "rank_7d_change",
+            "rank_30d_change", "total_rankings", "avg_rank", "best_rank", "worst_rank",
+            "rank_24h_window_days", "rank_72h_window_days", "rank_7d_window_days", "rank_30d_window_days",
+        )
+        self._merge("merge statistics", """
+                SELECT
+                    r.miniapp_id,
+                    r.ranking_date,
+                    r.rank,
+                    -r24.rank_24h_change,
+                    r.rank_72h_change,
+                    -rw.rank_7d_change,
+                    -r30.rank_30d_change,
+                    a.total_rankings,
+                    a.rank_sum::numeric / a.total_rankings as avg_rank,
+                    a.best_rank,
+                    a.worst_rank,
+                    r24.window_days,
+                    -- rank72hChange comes from the API over its own fixed window
+                    CASE WHEN r.rank_72h_change IS NOT NULL THEN 3 END,
+                    rw.window_days,
+                    r30.window_days
+                FROM miniapp_rankings r
+                LEFT JOIN miniapp_rankings_24h r24 ON r.miniapp_id = r24.miniapp_id
+                    AND r.ranking_date = r24.ranking_date
+                LEFT JOIN miniapp_rankings_weekly rw ON r.miniapp_id = rw.miniapp_id
+                    AND r.ranking_date = rw.ranking_date
+                LEFT JOIN miniapp_rankings_30d r30 ON r.miniapp_id = r30.miniapp_id
+                    AND r.ranking_date = r30.ranking_date
+                LEFT JOIN miniapp_rank_aggregates a ON r.miniapp_id = a.miniapp_id
+                WHERE r.ranking_date = %s
+            """, f"""
+                INSERT INTO miniapp_statistics (
+                    miniapp_id, stat_date, current_rank,
+                    rank_24h_change, rank_72h_change, rank_7d_change, rank_30d_change,
+                    total_rankings, avg_rank, best_rank, worst_rank,
+                    rank_24h_window_days, rank_72h_window_days, rank_7d_window_days, rank_30d_window_days
+                )
+                SELECT * FROM src
+                ON CONFLICT (miniapp_id, stat_date) DO UPDATE SET
+                    current_rank = EXCLUDED.current_rank,
+                    rank_24h_change = EXCLUDED.rank_24h_change,
+                    rank_72h_change = EXCLUDED.rank_72h_change,
+                    rank_7d_change = EXCLUDED.rank_7d_change,
+                    rank_30d_change = EXCLUDED.rank_30d_change,
+                    total_rankings = EXCLUDED.total_rankings,
+                    avg_rank = EXCLUDED.avg_rank,
+                    best_rank = EXCLUDED.best_rank,
+                    worst_rank = EXCLUDED.worst_rank,
+                    rank_24h_window_days = EXCLUDED.rank_24h_window_days,
+                    rank_72h_window_days = EXCLUDED.rank_72h_window_days,
+                    rank_7d_window_days = EXCLUDED.rank_7d_window_days,
+                    rank_30d_window_days = EXCLUDED.rank_30d_window_days
+                {_changed("miniapp_statistics", stat_columns)}
+            """, (ranking_date,))
+
+    def load(self, miniapps_data, ranking_date):
+        """Stages and merges metadata and rankings for one day."""
+        self.create_staging()
+        self.copy_rankings(miniapps_data, ranking_date)
+        self.merge_miniapps()
+        self.merge_rankings()
+
+    def print_stats(self):
+        total = sum(seconds for _, seconds in self.stats.values())
+        for stage, (rows, seconds) in self.stats.items():
+            print(f"   - {stage:<18} {rows:>7} rows  {seconds * 1000:8.1f} ms")
+        print(f"   - {'total':<18} {'':>7}       {total * 1000:8.1f} ms")
+        if self.skipped:
+            avoided = ", ".join(f"{stage.replace('merge ', '')} {n}" for stage, n in self.skipped.items())
+            print(f"   - unchanged rows, writes avoided: {avoided}")
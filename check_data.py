@@ -3,14 +3,39 @@ import psycopg2
 import psycopg2.extras
 from datetime import date
 from dotenv import load_dotenv
+from db import connect, release
+from dashboard_snapshot import load_dashboard
+from leaderboard import LeaderboardError, build_leaderboard, load_leaderboard
 
 load_dotenv()
-NEON_DB_URL = os.getenv("NEON_DB_URL")
+
+def _biggest_changes(window):
+    """Emelkedők és esők együtt, abszolút változás szerint"""
+    movers = sorted(window["gainers"] + window["losers"], key=lambda m: -abs(m["change"]))
+    return [(m["name"], m["rank"], m["change"]) for m in movers[:10]]
+
+def leaderboard_rows(board):
+    """A futás leaderboard dokumentumából ugyanazok a sorok, mint a napi lekérdezésekből"""
+    top = board["top_overall"]
+    windows = board["windows"]
+    return {
+        "top_10": [(m["name"], m["domain"], m["rank"], m["changes"]["72h"]) for m in top[:10]],
+        "risers": [(m["name"], m["rank"], m["change"]) for m in windows["72h"]["gainers"][:5]],
+        "fallers": [(m["name"], m["rank"], m["change"]) for m in windows["72h"]["losers"][:5]],
+        "changes_24h": _biggest_changes(windows["24h"]),
+        "changes_7d": _biggest_changes(windows["7d"]),
+        "stats": [
+            (m["name"], m["rank"], m["changes"]["24h"], m["changes"]["72h"], m["changes"]["7d"],
+             m["avg_rank"], m["best_rank"], m["worst_rank"])
+            for m in top[:5]
+        ],
+    }
 
 def check_data():
     """Ellenőrzi az adatbázis tartalmát"""
+    conn = None
     try:
-        conn = psycopg2.connect(NEON_DB_URL)
+        conn = connect()
         cursor = conn.cursor()
         
         print("=== ADATBÁZIS ELLENŐRZÉS ===\n")
@@ -43,124 +68,53 @@ def check_data():
         snapshot_count = cursor.fetchone()[0]
         print(f"📸 Snapshotok száma: {snapshot_count}")
         
-        # 5. Mai top 10
+        # 5-10. A legutóbbi futás leaderboardjából, ha van; különben ugyanígy
+        # felépítve a miniapp_statistics-ből (forrás és előjel ugyanaz, mentés nélkül)
         today = date.today()
-        cursor.execute("""
-            SELECT 
-                m.name,
-                m.domain,
-                r.rank,
-                r.rank_72h_change
-            FROM miniapp_rankings r 
-            JOIN miniapps m ON r.miniapp_id = m.id 
-            WHERE r.ranking_date = %s
-            ORDER BY r.rank 
-            LIMIT 10;
-        """, (today,))
+        try:
+            board = load_leaderboard(cursor, today)
+            print(f"\n🗂️  Leaderboard: {board['run_id']} ({board['apps']} miniapp)")
+        except (LeaderboardError, psycopg2.Error) as e:
+            conn.rollback()
+            print(f"\n⚠️  Nincs leaderboard ({e}), felépítés a miniapp_statistics-ből")
+            board = build_leaderboard(cursor, today)
+        rows = leaderboard_rows(board)
         
-        top_10 = cursor.fetchall()
+        # 5. Mai top 10
+        top_10 = rows["top_10"]
         print(f"\n🏆 Mai top 10 ({today}):")
         for i, (name, domain, rank, change) in enumerate(top_10, 1):
             change_str = f"({change:+d})" if change else ""
             print(f"   {i:2d}. {name} ({domain}) - #{rank} {change_str}")
         
         # 6. Legnagyobb emelkedők
-        cursor.execute("""
-            SELECT 
-                m.name,
-                r.rank,
-                r.rank_72h_change
-            FROM miniapp_rankings r 
-            JOIN miniapps m ON r.miniapp_id = m.id 
-            WHERE r.ranking_date = %s
-              AND r.rank_72h_change > 0
-            ORDER BY r.rank_72h_change DESC 
-            LIMIT 5;
-        """, (today,))
-        
-        risers = cursor.fetchall()
+        risers = rows["risers"]
         print(f"\n📈 Legnagyobb emelkedők:")
         for name, rank, change in risers:
             print(f"   {name} - #{rank} (+{change})")
         
         # 7. Legnagyobb esők (72h)
-        cursor.execute("""
-            SELECT 
-                m.name,
-                r.rank,
-                r.rank_72h_change
-            FROM miniapp_rankings r 
-            JOIN miniapps m ON r.miniapp_id = m.id 
-            WHERE r.ranking_date = %s
-              AND r.rank_72h_change < 0
-            ORDER BY r.rank_72h_change ASC 
-            LIMIT 5;
-        """, (today,))
-        
-        fallers = cursor.fetchall()
+        fallers = rows["fallers"]
         print(f"\n📉 Legnagyobb esők (72h):")
         for name, rank, change in fallers:
             print(f"   {name} - #{rank} ({change})")
         
         # 8. 24h változások
-        cursor.execute("""
-            SELECT 
-                m.name,
-                r24.rank,
-                r24.rank_24h_change
-            FROM miniapp_rankings_24h r24
-            JOIN miniapps m ON r24.miniapp_id = m.id 
-            WHERE r24.ranking_date = %s
-              AND r24.rank_24h_change IS NOT NULL
-            ORDER BY ABS(r24.rank_24h_change) DESC 
-            LIMIT 10;
-        """, (today,))
-        
-        changes_24h = cursor.fetchall()
+        changes_24h = rows["changes_24h"]
         print(f"\n🕐 24h változások:")
         for name, rank, change in changes_24h:
             change_str = f"+{change}" if change > 0 else f"{change}"
             print(f"   {name} - #{rank} ({change_str})")
         
         # 9. Heti változások
-        cursor.execute("""
-            SELECT 
-                m.name,
-                rw.rank,
-                rw.rank_7d_change
-            FROM miniapp_rankings_weekly rw
-            JOIN miniapps m ON rw.miniapp_id = m.id 
-            WHERE rw.ranking_date = %s
-              AND rw.rank_7d_change IS NOT NULL
-            ORDER BY ABS(rw.rank_7d_change) DESC 
-            LIMIT 10;
-        """, (today,))
-        
-        changes_7d = cursor.fetchall()
+        changes_7d = rows["changes_7d"]
         print(f"\n📅 Heti változások:")
         for name, rank, change in changes_7d:
             change_str = f"+{change}" if change > 0 else f"{change}"
             print(f"   {name} - #{rank} ({change_str})")
         
         # 10. Összesített statisztikák
-        cursor.execute("""
-            SELECT 
-                m.name,
-                s.current_rank,
-                s.rank_24h_change,
-                s.rank_72h_change,
-                s.rank_7d_change,
-                s.avg_rank,
-                s.best_rank,
-                s.worst_rank
-            FROM miniapp_statistics s
-            JOIN miniapps m ON s.miniapp_id = m.id 
-            WHERE s.stat_date = %s
-            ORDER BY s.current_rank 
-            LIMIT 5;
-        """, (today,))
-        
-        stats = cursor.fetchall()
+        stats = rows["stats"]
         print(f"\n📊 Összesített statisztikák (top 5):")
         for name, current, h24, h72, d7, avg, best, worst in stats:
             h24_str = f"{h24:+d}" if h24 is not None else "N/A"
@@ -170,14 +124,29 @@ def check_data():
             best_str = str(best) if best is not None else "N/A"
             worst_str = str(worst) if worst is not None else "N/A"
             print(f"   {name} - #{current} | 24h:{h24_str} | 72h:{h72_str} | 7d:{d7_str} | Átlag:{avg_str} | Legjobb:{best_str} | Legrosszabb:{worst_str}")
+
+        # 11. Dashboard snapshot (ugyanaz a dokumentum, mint az e-mailben)
+        try:
+            dashboard = load_dashboard(cursor, today)
+            draw = dashboard["active_draw"]
+            print(f"\n📬 Dashboard snapshot:")
+            print(f"   AppRank kód: {dashboard['apprank']['code']} ({len(dashboard['apprank']['usages'])} beváltás)")
+            print(f"   Lotto kód: {dashboard['lotto']['code']} ({len(dashboard['lotto']['usages'])} beváltás)")
+            for sub in dashboard["subscribers"]:
+                print(f"   Feliratkozók ({sub['app_id']}): {sub['count']}")
+            if draw:
+                print(f"   Aktív kör: #{draw['draw_number']} - {draw['tickets']} jegy, jackpot {draw['jackpot']}")
+            print(f"   Feltörekvők: {len(dashboard['rising_stars'])}")
+        except psycopg2.Error as e:
+            conn.rollback()
+            print(f"\n⚠️  Dashboard snapshot nem elérhető (026-os migráció?): {e}")
         
         print(f"\n✅ Ellenőrzés kész!")
         
     except Exception as e:
         print(f"❌ Hiba történt: {e}")
     finally:
-        if conn:
-            conn.close()
+        release(conn)
 
 if __name__ == "__main__":
     check_data() 
\ No newline at end of file
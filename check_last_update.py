@@ -1,6 +1,6 @@
 import os
-import psycopg2
 from dotenv import load_dotenv
+from db import connect, release
 
 load_dotenv()
 db_url = os.getenv("DATABASE_URL") or os.getenv("NEON_DB_URL")
@@ -9,11 +9,9 @@ if not db_url:
     print("❌ No database URL found!")
     exit(1)
 
+conn = None
 try:
-    if "neon.tech" in db_url and "sslmode=" not in db_url:
-        db_url += ("&" if "?" in db_url else "?") + "sslmode=require"
-    
-    conn = psycopg2.connect(db_url)
+    conn = connect()
     cursor = conn.cursor()
     
     cursor.execute("SELECT MAX(stat_date) FROM miniapp_statistics")
@@ -25,6 +23,7 @@ try:
     count = cursor.fetchone()[0]
     print(f"Record count for {last_date}: {count}")
     
-    conn.close()
 except Exception as e:
     print(f"Error: {e}")
+finally:
+    release(conn)
@@ -1,15 +1,15 @@
 import os
-import psycopg2
 from datetime import date
 from dotenv import load_dotenv
+from db import connect, release
 
 load_dotenv()
-NEON_DB_URL = os.getenv("NEON_DB_URL")
 
 def check_snapshot():
     """Ellenőrzi a legutolsó snapshot dátumát"""
+    conn = None
     try:
-        conn = psycopg2.connect(NEON_DB_URL)
+        conn = connect()
         cursor = conn.cursor()
         
         print("=== SNAPSHOT ELLENŐRZÉS ===")
@@ -38,6 +38,15 @@ def check_snapshot():
         today_count = cursor.fetchone()[0]
         print(f"\n📅 Mai snapshot ({today}): {'✅ LÉTEZIK' if today_count > 0 else '❌ NEM LÉTEZIK'}")
         
+        # Az object store-ba még át nem költöztetett snapshotok (raw_json vagy helyi archívum fájl)
+        cursor.execute("""
+            SELECT COUNT(*) FROM ranking_snapshots
+            WHERE object_key IS NULL AND (raw_json IS NOT NULL OR archive_path IS NOT NULL)
+        """)
+        legacy_count = cursor.fetchone()[0]
+        if legacy_count:
+            print(f"⚠️  {legacy_count} snapshot még nincs az object store-ban (python snapshot_archive.py --migrate)")
+        
         # Legutolsó ranking dátum
         cursor.execute("""
             SELECT MAX(ranking_date) FROM miniapp_rankings
@@ -57,8 +66,7 @@ def check_snapshot():
     except Exception as e:
         print(f"❌ Hiba történt: {e}")
     finally:
-        if conn:
-            conn.close()
+        release(conn)
 
 if __name__ == "__main__":
     check_snapshot() 
\ No newline at end of file
@@ -1,15 +1,15 @@
 import os
-import psycopg2
 from datetime import date, datetime
 from dotenv import load_dotenv
+from db import connect, release
 
 load_dotenv()
-NEON_DB_URL = os.getenv("NEON_DB_URL")
 
 def check_snapshot_detailed():
     """Részletes snapshot ellenőrzés"""
+    conn = None
     try:
-        conn = psycopg2.connect(NEON_DB_URL)
+        conn = connect()
         cursor = conn.cursor()
         
         print("=== RÉSZLETES SNAPSHOT ELLENŐRZÉS ===")
@@ -82,8 +82,7 @@ def check_snapshot_detailed():
     except Exception as e:
         print(f"❌ Hiba történt: {e}")
     finally:
-        if conn:
-            conn.close()
+        release(conn)
 
 if __name__ == "__main__":
     check_snapshot_detailed() 
\ No newline at end of file
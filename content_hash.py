@@ -0,0 +1,48 @@
+import hashlib
+from json_codec import dumps
+
+# Per-viewer fields that differ between API calls without any real change
+VOLATILE_KEYS = frozenset({"viewerContext"})
+
+
+def _strip_volatile(value):
+    if isinstance(value, dict):
+        return {k: _strip_volatile(v) for k, v in value.items() if k not in VOLATILE_KEYS}
+    if isinstance(value, list):
+        return [_strip_volatile(v) for v in value]
+    return value
+
+
+def normalize(value):
+    """Canonical JSON bytes: sorted keys, compact separators, volatile keys dropped."""
+    return dumps(_strip_volatile(value), sort_keys=True)
+
+
+def digest(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def encode_payload(miniapps_data):
+    """Serializes a payload once; returns (JSON bytes, per-entry JSON bytes, hash).
+
+    One encoding with sorted keys serves as raw_json, as the records of the
+    indexed snapshot and as the hash input. The hash keeps viewer state: it
+    is stored in raw_json too, so a changed viewerContext rewrites the day.
+    """
+    records = [dumps(entry, sort_keys=True) for entry in miniapps_data]
+    payload = b"[" + b",".join(records) + b"]"
+    return payload, records, digest(payload)
+
+
+def payload_hash(miniapps_data):
+    """Hash of a whole API payload, independent of key order."""
+    return encode_payload(miniapps_data)[2]
+
+
+def row_hash(columns, row):
+    """Hash of the persisted values of one row, keyed by column name.
+
+    Including the column names keeps hashes from scripts that persist
+    different column sets from ever matching each other by accident.
+    """
+    return digest(normalize(dict(zip(columns, row))))
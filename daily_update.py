@@ -1,246 +1,118 @@
-import json
 import os
-import requests
-import psycopg2
-import psycopg2.extras
 from datetime import date
 from dotenv import load_dotenv
-from config import get_api_headers, FARCASTER_API_URL, DEFAULT_LIMIT
+from db import connect, release, warm_up, DB_ERRORS
+from miniapp_fetcher import download_miniapps
+from bulk_loader import BulkLoader
+from running_aggregates import refresh_day, RANKINGS_SOURCE
+from content_hash import encode_payload
+from snapshot_archive import archive_snapshot
+from backup_store import put_snapshot
+from snapshot_index import write_snapshot
+from rank_derivation import derive_changes
+from partition_manager import ensure_partitions, run_maintenance
+from rank_store import RankStoreError, append_from_db
+from leaderboard import publish_leaderboard
 
 load_dotenv()
-NEON_DB_URL = os.getenv("NEON_DB_URL")
 
 def download_latest_rankings():
     """Letölti a legfrissebb miniapp rangsort"""
-    url = f"{FARCASTER_API_URL}?limit={DEFAULT_LIMIT}"
-    headers = get_api_headers()
-    
-    all_miniapps = []
-    cursor = None
-    
-    print("📥 Miniapp rangsor letöltése...")
-    
-    while True:
-        full_url = url if not cursor else url + f"&cursor={cursor}"
-        response = requests.get(full_url, headers=headers)
-        
-        if response.status_code != 200:
-            print(f"❌ Hiba: {response.status_code}")
-            print(f"Válasz: {response.text}")
-            return None
-        
-        data = response.json()
-        
-        # Kezeljük a 'result' objektumot
-        if 'result' in data and 'miniApps' in data['result']:
-            miniapps = data['result']['miniApps']
-        elif 'miniApps' in data:
-            miniapps = data['miniApps']
-        else:
-            print(f"❌ Váratlan API válasz struktúra")
-            print(f"Válasz kulcsok: {list(data.keys())}")
-            return None
-        
-        all_miniapps.extend(miniapps)
-        
-        print(f"   Letöltve: {len(miniapps)} miniapp")
-        
-        # Következő oldal
-        next_cursor = data.get('next', {}).get('cursor')
-        if next_cursor:
-            cursor = next_cursor
-            print(f"   Lapozás, következő cursor: {cursor}")
-        else:
-            break
-    
-    print(f"✅ Összesen letöltve: {len(all_miniapps)} miniapp")
-    return all_miniapps
+    return download_miniapps()
 
-def update_database(miniapps_data):
-    """Frissíti az adatbázist az új adatokkal"""
+def update_database(miniapps_data, payload, snapshot_hash):
+    """Frissíti az adatbázist az új adatokkal (payload: az egyszer kódolt JSON és hash-e)"""
+    conn = None
     try:
-        conn = psycopg2.connect(NEON_DB_URL)
+        conn = connect()
         cursor = conn.cursor()
         
         today = date.today()
-        inserted_miniapps = 0
-        inserted_rankings = 0
+        loader = BulkLoader(cursor)
         
         print("💾 Adatbázis frissítése...")
         
-        # Adatok feldolgozása
-        for item in miniapps_data:
-            miniapp = item['miniApp']
-            rank = item['rank']
-            rank_72h_change = item.get('rank72hChange')
-            
-            # 1. Miniapp metaadatok beszúrása/frissítése
-            cursor.execute("""
-                INSERT INTO miniapps (
-                    id, short_id, name, domain, home_url, icon_url, image_url,
-                    splash_image_url, splash_background_color, button_title,
-                    supports_notifications, primary_category, author_fid,
-                    author_username, author_display_name, author_follower_count,
-                    author_following_count
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                ) ON CONFLICT (id) DO UPDATE SET
-                    name = EXCLUDED.name,
-                    domain = EXCLUDED.domain,
-                    home_url = EXCLUDED.home_url,
-                    icon_url = EXCLUDED.icon_url,
-                    image_url = EXCLUDED.image_url,
-                    splash_image_url = EXCLUDED.splash_image_url,
-                    splash_background_color = EXCLUDED.splash_background_color,
-                    button_title = EXCLUDED.button_title,
-                    supports_notifications = EXCLUDED.supports_notifications,
-                    primary_category = EXCLUDED.primary_category,
-                    author_fid = EXCLUDED.author_fid,
-                    author_username = EXCLUDED.author_username,
-                    author_display_name = EXCLUDED.author_display_name,
-                    author_follower_count = EXCLUDED.author_follower_count,
-                    author_following_count = EXCLUDED.author_following_count
-            """, (
-                miniapp['id'],
-                miniapp.get('shortId'),
-                miniapp['name'],
-                miniapp['domain'],
-                miniapp.get('homeUrl'),
-                miniapp.get('iconUrl'),
-                miniapp.get('imageUrl'),
-                miniapp.get('splashImageUrl'),
-                miniapp.get('splashBackgroundColor'),
-                miniapp.get('buttonTitle'),
-                miniapp.get('supportsNotifications', False),
-                miniapp.get('primaryCategory'),
-                miniapp.get('author', {}).get('fid'),
-                miniapp.get('author', {}).get('username'),
-                miniapp.get('author', {}).get('displayName'),
-                miniapp.get('author', {}).get('followerCount'),
-                miniapp.get('author', {}).get('followingCount')
-            ))
-            inserted_miniapps += 1
-            
-            # 2. Napi ranking beszúrása
+        # A mai havi partíció az első sor előtt; ha nem jön létre, a sorok a DEFAULT partícióba kerülnek
+        try:
+            ensure_partitions(cursor, today)
+            conn.commit()
+        except DB_ERRORS as e:
+            conn.rollback()
+            print(f"⚠️  Partíciók nem jöttek létre, a DEFAULT partíció fogadja a sorokat: {e}")
+        
+        # 1-2. Miniapp metaadatok és napi ranking: COPY staging táblákba, majd egy-egy merge
+        loader.load(miniapps_data, today)
+        
+        # 3. Teljes snapshot mentése (csak ha a tartalom hash-e változott)
+        cursor.execute("SELECT payload_hash FROM ranking_snapshots WHERE snapshot_date = %s", (today,))
+        row = cursor.fetchone()
+        snapshot_written = not row or row[0] != snapshot_hash
+        if snapshot_written:
+            # Oszlopos tömörített archívum az object store-ba; a raw_json csak tartós,
+            # visszaolvasással ellenőrzött archívum mellett marad el
+            object_key, archive_sha256, raw_json = archive_snapshot(miniapps_data, today, payload=payload)
             cursor.execute("""
-                INSERT INTO miniapp_rankings (
-                    miniapp_id, ranking_date, rank, rank_72h_change
-                ) VALUES (%s, %s, %s, %s)
-                ON CONFLICT (miniapp_id, ranking_date) DO UPDATE SET
-                    rank = EXCLUDED.rank,
-                    rank_72h_change = EXCLUDED.rank_72h_change
+                INSERT INTO ranking_snapshots (
+                    snapshot_date, total_miniapps, raw_json, payload_hash, archive_path, archive_sha256, object_key
+                ) VALUES (%s, %s, %s, %s, NULL, %s, %s)
+                ON CONFLICT (snapshot_date) DO UPDATE SET
+                    total_miniapps = EXCLUDED.total_miniapps,
+                    raw_json = EXCLUDED.raw_json,
+                    payload_hash = EXCLUDED.payload_hash,
+                    archive_path = NULL,
+                    archive_sha256 = EXCLUDED.archive_sha256,
+                    object_key = EXCLUDED.object_key
             """, (
-                miniapp['id'],
                 today,
-                rank,
-                rank_72h_change
+                len(miniapps_data),
+                raw_json,
+                snapshot_hash,
+                archive_sha256,
+                object_key
             ))
-            inserted_rankings += 1
         
-        # 3. Teljes snapshot mentése
-        cursor.execute("""
-            INSERT INTO ranking_snapshots (
-                snapshot_date, total_miniapps, raw_json
-            ) VALUES (%s, %s, %s)
-            ON CONFLICT (snapshot_date) DO UPDATE SET
-                total_miniapps = EXCLUDED.total_miniapps,
-                raw_json = EXCLUDED.raw_json
-        """, (
-            today,
-            len(miniapps_data),
-            json.dumps(miniapps_data)
-        ))
+        # 4-5. 24h, heti és 30 napos változások egyetlen window-function scanből
+        changes = derive_changes(cursor, today, today)
         
-        # 4. 24h változások frissítése
-        cursor.execute("""
-            INSERT INTO miniapp_rankings_24h (miniapp_id, ranking_date, rank, rank_24h_change)
-            SELECT 
-                r1.miniapp_id,
-                r1.ranking_date,
-                r1.rank,
-                (r1.rank - r2.rank) as rank_24h_change
-            FROM miniapp_rankings r1
-            LEFT JOIN miniapp_rankings r2 ON r1.miniapp_id = r2.miniapp_id 
-                AND r2.ranking_date = r1.ranking_date - INTERVAL '1 day'
-            WHERE r1.ranking_date = %s
-            ON CONFLICT (miniapp_id, ranking_date) DO UPDATE SET
-                rank = EXCLUDED.rank,
-                rank_24h_change = EXCLUDED.rank_24h_change
-        """, (today,))
-        
-        # 5. Heti változások frissítése
-        cursor.execute("""
-            INSERT INTO miniapp_rankings_weekly (miniapp_id, ranking_date, rank, rank_7d_change)
-            SELECT 
-                r1.miniapp_id,
-                r1.ranking_date,
-                r1.rank,
-                (r1.rank - r2.rank) as rank_7d_change
-            FROM miniapp_rankings r1
-            LEFT JOIN miniapp_rankings r2 ON r1.miniapp_id = r2.miniapp_id 
-                AND r2.ranking_date = r1.ranking_date - INTERVAL '7 days'
-            WHERE r1.ranking_date = %s
-            ON CONFLICT (miniapp_id, ranking_date) DO UPDATE SET
-                rank = EXCLUDED.rank,
-                rank_7d_change = EXCLUDED.rank_7d_change
-        """, (today,))
-        
-        # 6. Összesített statisztikák frissítése
-        cursor.execute("""
-            INSERT INTO miniapp_statistics (
-                miniapp_id, stat_date, current_rank, 
-                rank_24h_change, rank_72h_change, rank_7d_change,
-                total_rankings, avg_rank, best_rank, worst_rank
-            )
-            SELECT 
-                r.miniapp_id,
-                r.ranking_date,
-                r.rank,
-                r24.rank_24h_change,
-                r.rank_72h_change,
-                rw.rank_7d_change,
-                COUNT(*) OVER (PARTITION BY r.miniapp_id) as total_rankings,
-                AVG(r.rank) OVER (PARTITION BY r.miniapp_id) as avg_rank,
-                MIN(r.rank) OVER (PARTITION BY r.miniapp_id) as best_rank,
-                MAX(r.rank) OVER (PARTITION BY r.miniapp_id) as worst_rank
-            FROM miniapp_rankings r
-            LEFT JOIN miniapp_rankings_24h r24 ON r.miniapp_id = r24.miniapp_id 
-                AND r.ranking_date = r24.ranking_date
-            LEFT JOIN miniapp_rankings_weekly rw ON r.miniapp_id = rw.miniapp_id 
-                AND r.ranking_date = rw.ranking_date
-            WHERE r.ranking_date = %s
-            ON CONFLICT (miniapp_id, stat_date) DO UPDATE SET
-                current_rank = EXCLUDED.current_rank,
-                rank_24h_change = EXCLUDED.rank_24h_change,
-                rank_72h_change = EXCLUDED.rank_72h_change,
-                rank_7d_change = EXCLUDED.rank_7d_change,
-                total_rankings = EXCLUDED.total_rankings,
-                avg_rank = EXCLUDED.avg_rank,
-                best_rank = EXCLUDED.best_rank,
-                worst_rank = EXCLUDED.worst_rank
-        """, (today,))
+        # 6. Futó aggregátumok (napi O(appok)), majd összesített statisztikák
+        folded, recomputed = refresh_day(cursor, today, RANKINGS_SOURCE)
+        print(f"   - Aggregátumok: {folded} miniapp ({recomputed} újraszámolva)")
+        loader.merge_statistics(today)
         
         conn.commit()
         print(f"✅ Adatbázis frissítve!")
-        print(f"   - Miniappok: {inserted_miniapps}")
-        print(f"   - Rangsorok: {inserted_rankings}")
-        print(f"   - Snapshot: {today}")
+        print(f"   - Snapshot: {today}" + ("" if snapshot_written else " (változatlan, nem írtuk újra)"))
+        print("   - Változás táblák: " + ", ".join(f"{t} {n}" for t, n in changes.items()))
+        loader.print_stats()
+        
+        # Napi oszlop a rang mátrixba (rank_store.py); hiba esetén --rebuild pótolja
+        try:
+            ranked, new_apps = append_from_db(cursor, today, RANKINGS_SOURCE)
+            print(f"   - Rang mátrix: {ranked} miniapp ({new_apps} új)")
+        except (OSError, ValueError, RankStoreError) as e:
+            print(f"⚠️  Rang mátrix nem frissült: {e}")
+        # A futás leaderboard dokumentuma (leaderboard.py); hiba esetén --build pótolja
+        try:
+            board, path = publish_leaderboard(conn, today)
+            print(f"   - Leaderboard: {board['run_id']} ({path})")
+        except (OSError,) + DB_ERRORS as e:
+            conn.rollback()
+            print(f"⚠️  Leaderboard nem mentve: {e}")
+        run_maintenance(conn, today)
         
     except Exception as e:
         print(f"❌ Adatbázis hiba: {e}")
     finally:
-        if conn:
-            conn.close()
+        release(conn)
 
-def save_json_backup(miniapps_data):
-    """Menti a JSON-t backup-ként"""
+def save_json_backup(miniapps_data, records):
+    """Menti a JSON-t a deduplikált backup store-ba (records: a már kódolt bejegyzések)"""
     today = date.today()
-    filename = f"top_miniapps_{today}.json"
+    written, reused = put_snapshot(miniapps_data, today)
     
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(miniapps_data, f, ensure_ascii=False, indent=2)
-    
-    print(f"💾 JSON backup mentve: {filename}")
+    print(f"💾 JSON backup mentve: {today} ({written} új rekord, {reused} már tárolt)")
+    # Indexelt snapshot fájl: egy app napi rangja a teljes JSON feldolgozása nélkül
+    print(f"   - Indexelt snapshot: {write_snapshot(miniapps_data, today, records=records)}")
 
 def main():
     """Fő függvény - teljes napi frissítés"""
@@ -248,17 +120,21 @@ def main():
     print(f"Dátum: {date.today()}")
     print()
     
-    # 1. Letöltés
+    # 1. Letöltés (közben az adatbázis compute felébred)
+    warm_up()
     miniapps_data = download_latest_rankings()
     if not miniapps_data:
         print("❌ Letöltés sikertelen!")
         return
     
+    # A payload egyszeri JSON kódolása: raw_json, indexelt snapshot és hash is ebből készül
+    payload, records, snapshot_hash = encode_payload(miniapps_data)
+    
     # 2. JSON backup
-    save_json_backup(miniapps_data)
+    save_json_backup(miniapps_data, records)
     
     # 3. Adatbázis frissítés
-    update_database(miniapps_data)
+    update_database(miniapps_data, payload, snapshot_hash)
     
     print("\n✅ Napi frissítés kész!")
 
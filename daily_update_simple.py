@@ -1,178 +1,293 @@
-import os
-import requests
-import psycopg2
-import json
+import asyncio
+import contextlib
+from psycopg2.extras import execute_values
 from datetime import date, timedelta
 from dotenv import load_dotenv
-from config import get_api_headers, FARCASTER_API_URL, DEFAULT_LIMIT
+from db import connect, connect_pipeline, pipeline_supported, prepared_cursor, release, warm_up, DB_ERRORS
+from miniapp_fetcher import FetchError
+from ingest_pipeline import run_pipeline
+from rank_engine import RankMatrix
+from rank_derivation import ASOF_TOLERANCE_DAYS
+from partition_manager import ensure_partitions, run_maintenance
+from running_aggregates import refresh_day, fetch_aggregates, STATISTICS_SOURCE
+from rank_store import RankStoreError, append_from_db
+from leaderboard import publish_leaderboard
+from content_hash import row_hash
 from email_notifications import send_success_notification, send_error_notification
+from report_queries import TOP_GAINERS, TOP_OVERALL
 
 load_dotenv()
-NEON_DB_URL = os.getenv("NEON_DB_URL")
-
-def download_latest_rankings():
-    """Downloads the latest miniapp rankings from Farcaster API."""
-    url = f"{FARCASTER_API_URL}?limit={DEFAULT_LIMIT}"
-    headers = get_api_headers()
-    all_miniapps = []
-    cursor = None
-    print("Downloading miniapp rankings...")
-    while True:
-        full_url = url if not cursor else f"{url}&cursor={cursor}"
-        response = requests.get(full_url, headers=headers)
-        if response.status_code != 200:
-            print(f"API Error: {response.status_code} - {response.text}")
-            return None
-        data = response.json()
-        miniapps = data.get('result', {}).get('miniApps', data.get('miniApps'))
-        if miniapps is None:
-            print(f"Unexpected API response structure: {data}")
-            return None
-        all_miniapps.extend(miniapps)
-        print(f"   Downloaded: {len(miniapps)} miniapps")
-        next_cursor = data.get('next', {}).get('cursor')
-        if not next_cursor:
-            break
-        cursor = next_cursor
-    print(f"Total downloaded: {len(all_miniapps)} miniapps")
-    return all_miniapps
-
-def get_past_rank(cursor, miniapp_id, target_date):
-    """Fetches the rank of a miniapp from the statistics table for a specific past date."""
-    cursor.execute("SELECT current_rank FROM miniapp_statistics WHERE miniapp_id = %s AND stat_date = %s", (miniapp_id, target_date))
-    result = cursor.fetchone()
-    return result[0] if result else None
-
-def get_aggregate_stats(cursor, miniapp_id):
-    """Fetches aggregate stats (avg, best rank) for a miniapp."""
-    cursor.execute("SELECT AVG(current_rank), MIN(current_rank) FROM miniapp_statistics WHERE miniapp_id = %s AND current_rank > 0", (miniapp_id,))
-    result = cursor.fetchone()
-    return result if result else (None, None)
-
-def update_database(miniapps_data):
-    """Updates the database with the latest ranking data."""
+
+# Day offsets for the 24h, 72h, 7d and 30d change columns
+RANK_WINDOWS = (1, 3, 7, 30)
+
+# Metadata columns persisted by this script, hashed into miniapps.meta_hash
+META_COLUMNS = (
+    "id", "name", "domain", "home_url", "icon_url", "primary_category",
+    "author_fid", "author_username", "author_display_name", "author_follower_count",
+)
+
+def history_dates(today):
+    """Days around 1, 3, 7 and 30 days ago; each window may fall back up to
+    ASOF_TOLERANCE_DAYS to the nearest earlier run."""
+    return sorted({
+        today - timedelta(days=d + extra)
+        for d in RANK_WINDOWS for extra in range(ASOF_TOLERANCE_DAYS + 1)
+    })
+
+def fetch_run_days(cursor, today):
+    """The history dates on which any app has statistics, i.e. a run happened.
+
+    The as-of fallback must see the same run days as rank_derivation, not only
+    the days on which one page's apps were ranked.
+    """
+    cursor.execute("""
+        SELECT d FROM unnest(%s::date[]) AS d
+        WHERE EXISTS (SELECT 1 FROM miniapp_statistics s WHERE s.stat_date = d)
+    """, (history_dates(today),))
+    return [r[0] for r in cursor.fetchall()]
+
+def transform_page(cursor, miniapps, today, run_days=None):
+    """Builds the metadata and statistics rows for one page of RankEntry records.
+
+    run_days: fetch_run_days() result, fetched once per run; queried when None.
+    """
+    ids = [item.miniapp.id for item in miniapps]
+    if run_days is None:
+        run_days = fetch_run_days(cursor, today)
+
+    # Historical ranks around 1, 3, 7 and 30 days ago, only for this page's apps
+    past_dates = history_dates(today)
+    cursor.execute("""
+        SELECT miniapp_id, stat_date, current_rank 
+        FROM miniapp_statistics 
+        WHERE miniapp_id = ANY(%s) AND stat_date IN %s
+    """, (ids, tuple(past_dates)))
+    history = RankMatrix.from_rows(
+        cursor.fetchall(), app_ids=ids, start_date=past_dates[0], end_date=today,
+        snapshot_days=list(run_days) + [today]
+    )
+    history.set_column(today, ids, [item.rank for item in miniapps])
+    changes = history.rank_changes(today, RANK_WINDOWS, tolerance=ASOF_TOLERANCE_DAYS)
+    lengths = history.window_lengths(today, RANK_WINDOWS, tolerance=ASOF_TOLERANCE_DAYS)
+    c24h, c72h, c7d, c30d = (changes[w].tolist() for w in RANK_WINDOWS)
+    # Effective window length per app; None where there is no change
+    w24h, w72h, w7d, w30d = (
+        [None if c is None else lengths[w] for c in changes[w].tolist()] for w in RANK_WINDOWS
+    )
+
+    # Average and best rank from the running aggregates (no history scan)
+    agg_stats = fetch_aggregates(cursor, ids)
+
+    miniapp_meta_data = []
+    stats_batch_data = []
+    for i, item in enumerate(miniapps):
+        m = item.miniapp
+        meta = (
+            m.id, m.name, m.domain, m.home_url, m.icon_url, m.primary_category,
+            m.author.fid, m.author.username, m.author.display_name, m.author.follower_count
+        )
+        miniapp_meta_data.append(meta + (row_hash(META_COLUMNS, meta),))
+
+        mid = m.id
+        curr = item.rank
+        avg_r, best_r = agg_stats.get(mid, (None, None))
+
+        stats_batch_data.append((
+            mid, today, curr, c24h[i], c72h[i], c7d[i], c30d[i], avg_r, best_r,
+            w24h[i], w72h[i], w7d[i], w30d[i]
+        ))
+    return miniapp_meta_data, stats_batch_data
+
+META_UPSERT = """
+    INSERT INTO miniapps (id, name, domain, home_url, icon_url, primary_category, author_fid, author_username, author_display_name, author_follower_count, meta_hash)
+    {rows}
+    ON CONFLICT (id) DO UPDATE SET
+        name = EXCLUDED.name, domain = EXCLUDED.domain, home_url = EXCLUDED.home_url,
+        icon_url = EXCLUDED.icon_url, primary_category = EXCLUDED.primary_category,
+        author_fid = EXCLUDED.author_fid, author_username = EXCLUDED.author_username,
+        author_display_name = EXCLUDED.author_display_name,
+        author_follower_count = EXCLUDED.author_follower_count,
+        meta_hash = EXCLUDED.meta_hash
+    WHERE miniapps.meta_hash IS DISTINCT FROM EXCLUDED.meta_hash
+"""
+
+STATS_UPSERT = """
+    INSERT INTO miniapp_statistics (
+        miniapp_id, stat_date, current_rank, 
+        rank_24h_change, rank_72h_change, rank_7d_change, rank_30d_change,
+        avg_rank, best_rank,
+        rank_24h_window_days, rank_72h_window_days, rank_7d_window_days, rank_30d_window_days
+    ) {rows}
+    ON CONFLICT (miniapp_id, stat_date) DO UPDATE SET
+        current_rank = EXCLUDED.current_rank,
+        rank_24h_change = EXCLUDED.rank_24h_change,
+        rank_72h_change = EXCLUDED.rank_72h_change,
+        rank_7d_change = EXCLUDED.rank_7d_change,
+        rank_30d_change = EXCLUDED.rank_30d_change,
+        avg_rank = EXCLUDED.avg_rank,
+        best_rank = EXCLUDED.best_rank,
+        rank_24h_window_days = EXCLUDED.rank_24h_window_days,
+        rank_72h_window_days = EXCLUDED.rank_72h_window_days,
+        rank_7d_window_days = EXCLUDED.rank_7d_window_days,
+        rank_30d_window_days = EXCLUDED.rank_30d_window_days
+    WHERE (miniapp_statistics.current_rank, miniapp_statistics.rank_24h_change,
+           miniapp_statistics.rank_72h_change, miniapp_statistics.rank_7d_change,
+           miniapp_statistics.rank_30d_change, miniapp_statistics.avg_rank,
+           miniapp_statistics.best_rank, miniapp_statistics.rank_24h_window_days,
+           miniapp_statistics.rank_72h_window_days, miniapp_statistics.rank_7d_window_days,
+           miniapp_statistics.rank_30d_window_days)
+        IS DISTINCT FROM
+          (EXCLUDED.current_rank, EXCLUDED.rank_24h_change, EXCLUDED.rank_72h_change,
+           EXCLUDED.rank_7d_change, EXCLUDED.rank_30d_change, EXCLUDED.avg_rank,
+           EXCLUDED.best_rank, EXCLUDED.rank_24h_window_days,
+           EXCLUDED.rank_72h_window_days, EXCLUDED.rank_7d_window_days,
+           EXCLUDED.rank_30d_window_days)
+"""
+
+# Column types of META_UPSERT and STATS_UPSERT, for the pipelined path's unnest()
+META_TYPES = ("text", "text", "text", "text", "text", "text", "bigint", "text", "text", "integer", "text")
+STATS_TYPES = (
+    "text", "date", "integer", "integer", "integer", "integer", "integer", "numeric", "integer",
+    "smallint", "smallint", "smallint", "smallint"
+)
+
+def _unnest_rows(types):
+    """Row source taking one array per column, so the statement text never changes."""
+    return "SELECT * FROM unnest(" + ", ".join(f"%s::{t}[]" for t in types) + ")"
+
+META_UPSERT_ARRAYS = META_UPSERT.format(rows=_unnest_rows(META_TYPES))
+STATS_UPSERT_ARRAYS = STATS_UPSERT.format(rows=_unnest_rows(STATS_TYPES))
+
+def _columns(rows):
+    return [list(column) for column in zip(*rows)]
+
+def load_page(cursor, rows, writes):
+    """Upserts one page of metadata and statistics rows.
+
+    Rows identical to what is stored are skipped; `writes` accumulates
+    [written, candidates] per table.
+    """
+    miniapp_meta_data, stats_batch_data = rows
+
+    # Bulk insert/update miniapps metadata (only when the metadata hash changed)
+    written = execute_values(cursor, META_UPSERT.format(rows="VALUES %s") + " RETURNING 1;", miniapp_meta_data, fetch=True)
+    writes['miniapps'][0] += len(written)
+    writes['miniapps'][1] += len(miniapp_meta_data)
+
+    # Bulk insert/update statistics (only rows whose values changed)
+    written = execute_values(cursor, STATS_UPSERT.format(rows="VALUES %s") + " RETURNING 1;", stats_batch_data, fetch=True)
+    writes['statistics'][0] += len(written)
+    writes['statistics'][1] += len(stats_batch_data)
+    print(f"   Loaded: {len(stats_batch_data)} miniapps")
+    return len(stats_batch_data)
+
+def load_page_pipelined(conn, rows, writes):
+    """load_page() over a pipeline connection (db.connect_pipeline()).
+
+    Both tables' upserts are sent without waiting for a reply in between, so
+    the page costs one round trip to the server instead of two. Rows travel
+    as one array per column: the statement text is the same for every page,
+    so the server prepares it once instead of parsing a fresh VALUES list.
+    """
+    miniapp_meta_data, stats_batch_data = rows
+    meta_cursor = prepared_cursor(conn)
+    stats_cursor = prepared_cursor(conn)
+    with conn.pipeline():
+        if miniapp_meta_data:
+            meta_cursor.execute(META_UPSERT_ARRAYS, _columns(miniapp_meta_data))
+        if stats_batch_data:
+            stats_cursor.execute(STATS_UPSERT_ARRAYS, _columns(stats_batch_data))
+    # rowcount is only known once the pipeline has synced; rows left unchanged don't count
+    writes['miniapps'][0] += max(meta_cursor.rowcount, 0)
+    writes['miniapps'][1] += len(miniapp_meta_data)
+    writes['statistics'][0] += max(stats_cursor.rowcount, 0)
+    writes['statistics'][1] += len(stats_batch_data)
+    print(f"   Loaded: {len(stats_batch_data)} miniapps")
+    return len(stats_batch_data)
+
+def fetch_notification_lists(conn, today):
+    """Fetches top 10 gainers and current top 5 for the notification."""
+    gainers_cursor = conn.cursor()
+    overall_cursor = conn.cursor()
+    # On a pipeline connection both queries go out before either reply is awaited
+    with conn.pipeline() if hasattr(conn, "pipeline") else contextlib.nullcontext():
+        gainers_cursor.execute(TOP_GAINERS, (today, 10))
+        overall_cursor.execute(TOP_OVERALL, (today, 5))
+    top_gainers = [
+        {"name": r[0], "username": r[1], "rank": r[2], "change": r[3], "domain": r[4]} 
+        for r in gainers_cursor.fetchall()
+    ]
+    top_overall = [
+        {"name": r[0], "username": r[1], "rank": r[2], "domain": r[3]} 
+        for r in overall_cursor.fetchall()
+    ]
+    return top_gainers, top_overall
+
+def update_database():
+    """Streams the latest ranking from the API into the database page by page."""
     conn = None
+    read_conn = None
     try:
-        conn = psycopg2.connect(NEON_DB_URL)
+        # Pipeline mode (psycopg 3) when available, otherwise execute_values on psycopg2
+        pipelined = pipeline_supported()
+        conn = connect_pipeline() if pipelined else connect()
+        # Separate connection so history lookups for page N+1 overlap the upsert of page N
+        read_conn = connect(autocommit=True)
         cursor = conn.cursor()
+        read_cursor = read_conn.cursor()
         today = date.today()
-        
-        print("Updating database...")
-
-        print(f"Updating database for {len(miniapps_data)} miniapps...")
-        
-        # 1. Prepare batch data for miniapps metadata
-        miniapp_meta_data = []
-        for item in miniapps_data:
-            m = item['miniApp']
-            miniapp_meta_data.append((
-                m['id'], m['name'], m['domain'], m.get('homeUrl'),
-                m.get('iconUrl'), m.get('primaryCategory'),
-                m.get('author', {}).get('fid'), m.get('author', {}).get('username'),
-                m.get('author', {}).get('displayName'), m.get('author', {}).get('followerCount')
-            ))
-
-        # Bulk insert/update miniapps metadata
-        from psycopg2.extras import execute_values
-        execute_values(cursor, """
-            INSERT INTO miniapps (id, name, domain, home_url, icon_url, primary_category, author_fid, author_username, author_display_name, author_follower_count)
-            VALUES %s
-            ON CONFLICT (id) DO UPDATE SET
-                name = EXCLUDED.name, domain = EXCLUDED.domain, home_url = EXCLUDED.home_url,
-                icon_url = EXCLUDED.icon_url, primary_category = EXCLUDED.primary_category,
-                author_fid = EXCLUDED.author_fid, author_username = EXCLUDED.author_username,
-                author_display_name = EXCLUDED.author_display_name,
-                author_follower_count = EXCLUDED.author_follower_count;
-        """, miniapp_meta_data)
-
-        # 2. Pre-fetch historical ranks to avoid N+1 queries
-        # We need ranks for 1, 3, 7, and 30 days ago
-        past_dates = [today - timedelta(days=d) for d in [1, 3, 7, 30]]
-        cursor.execute("""
-            SELECT miniapp_id, stat_date, current_rank 
-            FROM miniapp_statistics 
-            WHERE stat_date IN %s
-        """, (tuple(past_dates),))
-        
-        hist_ranks = {} # (miniapp_id, date) -> rank
-        for mid, d, r in cursor.fetchall():
-            hist_ranks[(mid, d)] = r
-
-        # Pre-fetch aggregate stats
-        cursor.execute("""
-            SELECT miniapp_id, AVG(current_rank), MIN(current_rank) 
-            FROM miniapp_statistics 
-            WHERE current_rank > 0 
-            GROUP BY miniapp_id
-        """)
-        agg_stats = {r[0]: (r[1], r[2]) for r in cursor.fetchall()}
-
-        # 3. Prepare batch data for miniapp_statistics
-        stats_batch_data = []
-        for item in miniapps_data:
-            mid = item['miniApp']['id']
-            curr = item['rank']
-            
-            # Calculate changes using pre-fetched data
-            r1 = hist_ranks.get((mid, today - timedelta(days=1)))
-            r3 = hist_ranks.get((mid, today - timedelta(days=3)))
-            r7 = hist_ranks.get((mid, today - timedelta(days=7)))
-            r30 = hist_ranks.get((mid, today - timedelta(days=30)))
-            
-            c24h = (r1 - curr) if r1 is not None else None
-            c72h = (r3 - curr) if r3 is not None else None
-            c7d = (r7 - curr) if r7 is not None else None
-            c30d = (r30 - curr) if r30 is not None else None
-            
-            avg_r, best_r = agg_stats.get(mid, (None, None))
-            
-            stats_batch_data.append((
-                mid, today, curr, c24h, c72h, c7d, c30d, avg_r, best_r
-            ))
-
-        # Bulk insert/update statistics
-        execute_values(cursor, """
-            INSERT INTO miniapp_statistics (
-                miniapp_id, stat_date, current_rank, 
-                rank_24h_change, rank_72h_change, rank_7d_change, rank_30d_change,
-                avg_rank, best_rank
-            ) VALUES %s
-            ON CONFLICT (miniapp_id, stat_date) DO UPDATE SET
-                current_rank = EXCLUDED.current_rank,
-                rank_24h_change = EXCLUDED.rank_24h_change,
-                rank_72h_change = EXCLUDED.rank_72h_change,
-                rank_7d_change = EXCLUDED.rank_7d_change,
-                rank_30d_change = EXCLUDED.rank_30d_change,
-                avg_rank = EXCLUDED.avg_rank,
-                best_rank = EXCLUDED.best_rank;
-        """, stats_batch_data)
-        
-        # 6. Fetch top 5 gainers and current top 5 for the notification
-        cursor.execute("""
-            SELECT m.name, m.author_username, s.current_rank, s.rank_24h_change, m.domain
-            FROM miniapp_statistics s
-            JOIN miniapps m ON s.miniapp_id = m.id
-            WHERE s.stat_date = %s AND s.rank_24h_change IS NOT NULL
-            ORDER BY s.rank_24h_change DESC
-            LIMIT 10
-        """, (today,))
-        top_gainers = [
-            {"name": r[0], "username": r[1], "rank": r[2], "change": r[3], "domain": r[4]} 
-            for r in cursor.fetchall()
-        ]
-
-        cursor.execute("""
-            SELECT m.name, m.author_username, s.current_rank, m.domain
-            FROM miniapp_statistics s
-            JOIN miniapps m ON s.miniapp_id = m.id
-            WHERE s.stat_date = %s
-            ORDER BY s.current_rank ASC
-            LIMIT 5
-        """, (today,))
-        top_overall = [
-            {"name": r[0], "username": r[1], "rank": r[2], "domain": r[3]} 
-            for r in cursor.fetchall()
-        ]
+
+        # Today's monthly partition before the first row arrives; if it cannot
+        # be created, the rows land in the DEFAULT partition instead
+        try:
+            ensure_partitions(cursor, today)
+            conn.commit()
+        except DB_ERRORS as e:
+            conn.rollback()
+            print(f"⚠️  Partitions not created, the DEFAULT partition takes today's rows: {e}")
+
+        print(f"Streaming miniapp rankings into the database ({'pipeline mode' if pipelined else 'execute_values'})...")
+        writes = {'miniapps': [0, 0], 'statistics': [0, 0]}
+        if pipelined:
+            load = lambda rows: load_page_pipelined(conn, rows, writes)
+        else:
+            load = lambda rows: load_page(cursor, rows, writes)
+        run_days = fetch_run_days(read_cursor, today)
+        miniapps_count = asyncio.run(run_pipeline(
+            lambda miniapps: transform_page(read_cursor, miniapps, today, run_days),
+            load
+        ))
+        if not miniapps_count:
+            raise FetchError("API returned no miniapps")
+
+        for table, (written, candidates) in writes.items():
+            print(f"   {table}: {written} written, {candidates - written} unchanged (writes avoided)")
+
+        folded, recomputed = refresh_day(cursor, today, STATISTICS_SOURCE)
+        print(f"Running aggregates updated: {folded} miniapps ({recomputed} recomputed)")
+
+        conn.commit()
+        print(f"Database update successful for {miniapps_count} miniapps.")
+        # Today's column of the on-disk rank matrix; `rank_store.py --rebuild` repairs a miss
+        try:
+            ranked, new_apps = append_from_db(cursor, today, STATISTICS_SOURCE)
+            print(f"Rank store updated: {ranked} miniapps ({new_apps} new)")
+        except (OSError, ValueError, RankStoreError) as e:
+            print(f"⚠️  Rank store not updated: {e}")
+
+        # This run's leaderboard feeds the notification; `leaderboard.py --build` repairs a miss
+        rising_stars = None
+        try:
+            board, path = publish_leaderboard(conn, today)
+            print(f"Leaderboard {board['run_id']} saved ({path})")
+            top_gainers = board["windows"]["24h"]["gainers"]
+            top_overall = board["top_overall"][:5]
+            rising_stars = [(r["name"], r["username"], r["change"]) for r in board["rising_stars"]]
+        except (OSError,) + DB_ERRORS as e:
+            conn.rollback()
+            print(f"⚠️  Leaderboard not saved, querying the notification lists: {e}")
+            top_gainers, top_overall = fetch_notification_lists(conn, today)
 
         # DEBUG: Check lists
         print(f"DEBUG: Found {len(top_gainers)} top gainers")
@@ -181,25 +296,22 @@ def update_database(miniapps_data):
             print(f"DEBUG: Today is {today}")
             cursor.execute("SELECT COUNT(*) FROM miniapp_statistics WHERE stat_date = %s", (today,))
             print(f"DEBUG: Stats count for today: {cursor.fetchone()[0]}")
-
-        conn.commit()
-        print(f"Database update successful for {len(miniapps_data)} miniapps.")
-        send_success_notification(len(miniapps_data), top_gainers, top_overall)
+        run_maintenance(conn, today)
+        send_success_notification(miniapps_count, top_gainers, top_overall, rising_stars)
+    except (FetchError, TimeoutError) as e:
+        print(f"Download failed, aborting update: {e}")
+        send_error_notification("Download Failed", f"Could not download miniapp data from Farcaster API: {e}")
     except Exception as e:
         print(f"Database error: {e}")
         send_error_notification("Database Update Failed", str(e))
     finally:
-        if conn:
-            conn.close()
+        release(read_conn)
+        release(conn)
 
 def main():
     print(f"=== Starting Daily Miniapp Update: {date.today()} ===")
-    miniapps_data = download_latest_rankings()
-    if miniapps_data:
-        update_database(miniapps_data)
-    else:
-        print("Download failed, aborting update.")
-        send_error_notification("Download Failed", "Could not download miniapp data from Farcaster API.")
+    warm_up()
+    update_database()
     print("\nDaily update completed!")
 
 if __name__ == "__main__":
@@ -0,0 +1,51 @@
+import sys
+from datetime import date, datetime
+from db import connect, release
+from json_codec import dumps, loads
+
+
+# dashboard_snapshot() is created by migration 026
+DASHBOARD_SQL = "SELECT dashboard_snapshot(%s)"
+
+
+def load_dashboard(cursor, day=None):
+    """Returns the dashboard document for `day` (default today) in one round trip."""
+    cursor.execute(DASHBOARD_SQL, (day or date.today(),))
+    doc = cursor.fetchone()[0]
+    # psycopg2 decodes json columns already; other drivers hand back text
+    return loads(doc) if isinstance(doc, (str, bytes)) else doc
+
+
+def _usages(section):
+    return section["code"], [(u["fid"], datetime.fromisoformat(u["used_at"])) for u in section["usages"]]
+
+
+def to_sections(doc):
+    """Maps a dashboard document onto notification_stats.gather_statistics() sections."""
+    draw = doc["active_draw"]
+    winner = doc["latest_winner"]
+    return {
+        "apprank": _usages(doc["apprank"]),
+        "lotto": _usages(doc["lotto"]),
+        "subscribers": [(s["app_id"], s["count"]) for s in doc["subscribers"]],
+        "active_draw": (draw["draw_number"], draw["jackpot"], draw["tickets"]) if draw else (),
+        "rising_stars": [(r["name"], r["username"], r["change"]) for r in doc["rising_stars"]],
+        "latest_winner": (
+            winner["draw_id"], winner["draw_number"], winner["jackpot"],
+            winner["player_fid"], winner["player_name"]
+        ) if winner else (),
+    }
+
+
+def main():
+    day = date.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else None
+    conn = None
+    try:
+        conn = connect()
+        print(dumps(load_dashboard(conn.cursor(), day), pretty=True).decode("utf-8"))
+    finally:
+        release(conn)
+
+
+if __name__ == "__main__":
+    main()
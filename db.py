@@ -0,0 +1,219 @@
+import atexit
+import contextlib
+import os
+import threading
+import time
+from urllib.parse import urlparse
+import psycopg2
+from dotenv import load_dotenv
+
+# psycopg 3 is only needed for pipeline mode (connect_pipeline) and the
+# async e-mail statistics (notification_stats.py); everything else runs on
+# psycopg2.
+try:
+    import psycopg
+except ImportError:
+    psycopg = None
+
+load_dotenv()
+NEON_DB_URL = os.getenv("NEON_DB_URL") or os.getenv("DATABASE_URL")
+
+# Guards against runaway queries; long rebuilds ask for their own limit (0 = none)
+STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "300000"))
+CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "15"))
+# Idle connections kept open for reuse within a script run
+POOL_MAX = int(os.getenv("DB_POOL_MAX", "4"))
+
+# A suspended Neon compute refuses or stalls the first connection while it
+# starts; retried with a growing delay before giving up.
+WAKE_RETRIES = int(os.getenv("DB_WAKE_RETRIES", "4"))
+WAKE_BACKOFF = 2.0
+# A connect slower than this means the compute was woken from suspend
+COLD_START_SECONDS = 1.0
+
+# Dead peers (a compute suspended mid-run, NAT drops) are detected in ~80 s
+# instead of hanging until the OS default of two hours.
+KEEPALIVES = {"keepalives": 1, "keepalives_idle": 30, "keepalives_interval": 10, "keepalives_count": 5}
+
+# Errors of either driver, for code that may be handed a pipeline connection
+DB_ERRORS = (psycopg2.Error,) + ((psycopg.Error,) if psycopg else ())
+
+# Idle connections kept for reuse (at most POOL_MAX), most recently used last
+_idle = []
+_idle_lock = threading.Lock()
+_warm_up = None
+# Statement timeout currently set on each connection
+_timeouts = {}
+# Connections to another database than NEON_DB_URL (connect(url=...)); never pooled
+_dedicated = set()
+
+
+def database_url(url=None):
+    """Returns the database URL with sslmode=require added for Neon hosts."""
+    url = url or NEON_DB_URL
+    if not url:
+        raise RuntimeError("NEON_DB_URL/DATABASE_URL missing from environment")
+    if "neon.tech" in (urlparse(url).hostname or "") and "sslmode=" not in url:
+        url += ("&" if "?" in url else "?") + "sslmode=require"
+    return url
+
+
+def _open(driver=psycopg2, url=None, **kwargs):
+    """Opens a new connection, retrying while a suspended compute wakes up."""
+    for attempt in range(WAKE_RETRIES + 1):
+        started = time.perf_counter()
+        try:
+            conn = driver.connect(
+                database_url(url), connect_timeout=CONNECT_TIMEOUT,
+                application_name="apprank-scripts", **KEEPALIVES, **kwargs
+            )
+            break
+        except driver.OperationalError as e:
+            if attempt == WAKE_RETRIES:
+                raise
+            delay = WAKE_BACKOFF * 2 ** attempt
+            print(f"⏳ Database not reachable yet (compute waking up?), retrying in {delay:.0f}s: {str(e).strip()}")
+            time.sleep(delay)
+    elapsed = time.perf_counter() - started
+    if elapsed > COLD_START_SECONDS:
+        print(f"🔌 Database compute woke up in {elapsed:.1f}s")
+    return conn
+
+
+def _set_statement_timeout(conn, statement_timeout_ms):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT set_config('statement_timeout', %s, false)", (str(statement_timeout_ms),))
+    conn.commit()
+
+
+def _checkout():
+    with _idle_lock:
+        while _idle:
+            conn = _idle.pop()
+            if not conn.closed:
+                return conn
+            _timeouts.pop(id(conn), None)
+    return _open()
+
+
+def _warm_up_target():
+    try:
+        conn = _checkout()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+        finally:
+            release(conn)
+    except (psycopg2.Error, RuntimeError) as e:
+        # The caller's own connect() retries and reports properly
+        print(f"⚠️  Database warm-up failed: {e}")
+
+
+def warm_up():
+    """Opens the first connection in the background.
+
+    Call it before slow non-database work (e.g. the API download) so a
+    suspended compute starts meanwhile instead of on the critical path.
+    """
+    global _warm_up
+    if _warm_up is None:
+        _warm_up = threading.Thread(target=_warm_up_target, name="db-warm-up", daemon=True)
+        _warm_up.start()
+
+
+def connect(autocommit=False, statement_timeout_ms=STATEMENT_TIMEOUT_MS, url=None):
+    """Returns a ready connection (reused when one is idle); hand it back with release().
+
+    Waits for a running warm_up() first, so a cold compute is only woken once.
+    `url` connects to another database (scratch/benchmark); such connections
+    are opened fresh and closed on release().
+    """
+    if url:
+        conn = _open(url=url)
+        _dedicated.add(id(conn))
+    else:
+        if _warm_up is not None:
+            _warm_up.join()
+        conn = _checkout()
+    try:
+        if _timeouts.get(id(conn)) != statement_timeout_ms:
+            _set_statement_timeout(conn, statement_timeout_ms)
+            _timeouts[id(conn)] = statement_timeout_ms
+        conn.autocommit = autocommit
+    except psycopg2.Error:
+        release(conn)
+        raise
+    return conn
+
+
+def release(conn):
+    """Returns a connection for reuse; an open transaction is rolled back. None is ignored."""
+    if conn is None:
+        return
+    # Pipeline (psycopg 3) and other-database connections are never reused
+    keep = isinstance(conn, psycopg2.extensions.connection) and not conn.closed and id(conn) not in _dedicated
+    if keep:
+        try:
+            conn.rollback()
+            conn.autocommit = False
+        except psycopg2.Error:
+            keep = False
+    with _idle_lock:
+        if keep and len(_idle) < POOL_MAX:
+            _idle.append(conn)
+            return
+        _timeouts.pop(id(conn), None)
+        _dedicated.discard(id(conn))
+    conn.close()
+
+
+def pipeline_supported():
+    """True when psycopg 3 is installed and its libpq (14+) has pipeline mode."""
+    return psycopg is not None and psycopg.Pipeline.is_supported()
+
+
+def connect_pipeline(statement_timeout_ms=STATEMENT_TIMEOUT_MS, url=None):
+    """Opens a psycopg 3 connection for pipeline-mode writes; hand it back with release().
+
+    Its default cursor binds parameters client-side like psycopg2, so the
+    shared helpers (DDL with parameters, CREATE TABLE AS) run on it unchanged.
+    """
+    if _warm_up is not None and not url:
+        _warm_up.join()
+    conn = _open(psycopg, url=url, cursor_factory=psycopg.ClientCursor)
+    try:
+        _set_statement_timeout(conn, statement_timeout_ms)
+    except psycopg.Error:
+        conn.close()
+        raise
+    return conn
+
+
+def prepared_cursor(conn):
+    """A cursor on a connect_pipeline() connection that binds parameters server-side.
+
+    Statements run through it repeatedly are prepared once per connection.
+    """
+    return psycopg.Cursor(conn)
+
+
+@contextlib.contextmanager
+def connection(autocommit=False, statement_timeout_ms=STATEMENT_TIMEOUT_MS, url=None):
+    """`with connection() as conn:` — connect() and release() around a block."""
+    conn = connect(autocommit, statement_timeout_ms, url)
+    try:
+        yield conn
+    finally:
+        release(conn)
+
+
+def close_all():
+    with _idle_lock:
+        for conn in _idle:
+            conn.close()
+        _idle.clear()
+        _timeouts.clear()
+
+
+atexit.register(close_all)
@@ -3,9 +3,10 @@ import os
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime, date
-import psycopg2
 from dotenv import load_dotenv
 from config import get_email_config
+from db import database_url
+from notification_stats import fetch_statistics
 
 load_dotenv()
 
@@ -197,8 +198,12 @@ def get_lambo_winner_block(fid, name, prize_formatted, round_number):
     """
 
 
-def send_success_notification(miniapps_count, top_gainers, top_overall):
-    """Successful update notification with enhanced template"""
+def send_success_notification(miniapps_count, top_gainers, top_overall, rising_stars=None):
+    """Successful update notification with enhanced template
+
+    rising_stars: (name, username, change) tuples from the run's leaderboard;
+    None falls back to the statistics query.
+    """
     
     subject = f"✅ AppRank Update: {miniapps_count} miniapps updated! - {date.today()}"
     
@@ -224,6 +229,7 @@ def send_success_notification(miniapps_count, top_gainers, top_overall):
     apprank_usages_html = "<ul><li>No data available</li></ul>"
     lotto_usages_html = "<ul><li>No data available</li></ul>"
     lotto_info_html = "No active round info"
+    rising_stars_all, rising_stars = rising_stars, []
     
     db_url = os.getenv("DATABASE_URL") or os.getenv("NEON_DB_URL")
     
@@ -231,104 +237,56 @@ def send_success_notification(miniapps_count, top_gainers, top_overall):
         print("❌ DATABASE_URL/NEON_DB_URL missing from environment!")
         sub_stats_html = "<p style='color:red;'>Error: Database URL missing</p>"
     else:
-        try:
-            # Force SSL for Neon
-            if "neon.tech" in db_url and "sslmode=" not in db_url:
-                db_url += ("&" if "?" in db_url else "?") + "sslmode=require"
-                
-            conn = psycopg2.connect(db_url)
-            cursor = conn.cursor()
-        
-            # Get AppRank code
-            cursor.execute("SELECT code FROM daily_codes WHERE is_active = TRUE LIMIT 1")
-            row = cursor.fetchone()
-            if row: apprank_code = row[0]
-            
-            # Get Lambo Lotto code
-            cursor.execute("SELECT code FROM lotto_daily_codes WHERE is_active = TRUE LIMIT 1")
-            row = cursor.fetchone()
-            if row: lotto_code = row[0]
-
-            # GET DETAILED STATISTICS
-            
-            # 1. Number of subscribers
-            cursor.execute("SELECT app_id, COUNT(*) FROM notification_tokens GROUP BY app_id")
-            sub_stats = cursor.fetchall()
-            sub_stats_html = "<ul>"
-            for app, count in sub_stats:
-                sub_stats_html += f"<li><strong>{app}:</strong> {count} subscribers</li>"
-            sub_stats_html += "</ul>"
+        # Sections run concurrently; one that fails or times out keeps its default
+        stats = fetch_statistics(database_url(db_url))
 
-            # 2. AppRank code usage (Today)
-            cursor.execute("SELECT fid, used_at FROM daily_code_usages WHERE code = %s ORDER BY used_at DESC", (apprank_code,))
-            apprank_usages = cursor.fetchall()
+        if stats["apprank"] is not None:
+            apprank_code, apprank_usages = stats["apprank"]
             apprank_usages_html = "<ul>"
             for fid, used_at in apprank_usages:
                 apprank_usages_html += f"<li>FID: {fid} - {used_at.strftime('%H:%M')}</li>"
             if not apprank_usages: apprank_usages_html += "<li>No usage yet</li>"
             apprank_usages_html += "</ul>"
 
-            # 3. Lambo Lotto code usage (Today)
-            cursor.execute("SELECT fid, used_at FROM lotto_daily_code_usages WHERE code = %s ORDER BY used_at DESC", (lotto_code,))
-            lotto_usages = cursor.fetchall()
+        if stats["lotto"] is not None:
+            lotto_code, lotto_usages = stats["lotto"]
             lotto_usages_html = "<ul>"
             for fid, used_at in lotto_usages:
                 lotto_usages_html += f"<li>FID: {fid} - {used_at.strftime('%H:%M')}</li>"
             if not lotto_usages: lotto_usages_html += "<li>No usage yet</li>"
             lotto_usages_html += "</ul>"
 
-            # 4. Current Lotto Round & Jackpot
-            cursor.execute("SELECT id, draw_number, jackpot FROM lottery_draws WHERE status = 'active' ORDER BY draw_number DESC LIMIT 1")
-            active_draw = cursor.fetchone()
+        # 1. Number of subscribers
+        if stats["subscribers"] is not None:
+            sub_stats_html = "<ul>"
+            for app, count in stats["subscribers"]:
+                sub_stats_html += f"<li><strong>{app}:</strong> {count} subscribers</li>"
+            sub_stats_html += "</ul>"
+
+        # 4. Current Lotto Round & Jackpot
+        if stats["active_draw"] is not None:
             lotto_info_html = "No active round"
             jackpot_amount = 0
-            if active_draw:
-                draw_id = active_draw[0]
-                jackpot_amount = int(active_draw[2])
-                cursor.execute("SELECT COUNT(*) FROM lottery_tickets WHERE draw_id = %s", (draw_id,))
-                ticket_count = cursor.fetchone()[0]
-                lotto_info_html = f"Active Round (#{active_draw[1]}): <strong>{ticket_count} tickets sold</strong>"
-            
-            # Format jackpot
+            if stats["active_draw"]:
+                draw_number, jackpot, ticket_count = stats["active_draw"]
+                jackpot_amount = int(jackpot)
+                lotto_info_html = f"Active Round (#{draw_number}): <strong>{ticket_count} tickets sold</strong>"
             jackpot_formatted = format_jackpot(jackpot_amount)
 
-            # 5. Rising Stars (apps with positive change, not in top 10)
-            cursor.execute("""
-                SELECT m.name, m.author_username, s.rank_24h_change 
-                FROM miniapp_statistics s
-                JOIN miniapps m ON s.miniapp_id = m.id
-                WHERE s.stat_date = %s 
-                AND s.rank_24h_change > 0
-                AND s.current_rank > 10
-                ORDER BY s.rank_24h_change DESC
-                LIMIT 20
-            """, (date.today(),))
-            rising_stars_all = cursor.fetchall()
-            
-            # Randomize and pick 5-8
-            import random
-            num_stars = random.randint(min(5, len(rising_stars_all)), min(8, len(rising_stars_all))) if rising_stars_all else 0
-            rising_stars = random.sample(rising_stars_all, num_stars) if num_stars > 0 else []
-
-            # 6. Fetch Latest Winners for Winner Block
-            cursor.execute("""
-                SELECT ld.id, ld.draw_number, ld.jackpot, lt.player_fid, lt.player_name
-                FROM lottery_draws ld
-                JOIN lottery_tickets lt ON ld.id = lt.draw_id AND ld.winning_number = lt.number
-                WHERE ld.status = 'completed'
-                ORDER BY ld.draw_number DESC
-                LIMIT 1
-            """)
-            winner_row = cursor.fetchone()
-            winner_block_html = ""
-            if winner_row:
-                draw_id, win_draw_num, win_jackpot, win_fid, win_name = winner_row
-                winner_block_html = get_lambo_winner_block(win_fid, win_name, format_jackpot(int(win_jackpot)), win_draw_num)
-
-            conn.close()
-        except Exception as e:
-            print(f"❌ Error fetching statistics: {e}")
-            # Keep existing default values on error
+        # 5. Rising stars come from the run's leaderboard when the caller has it
+        if rising_stars_all is None:
+            rising_stars_all = stats["rising_stars"]
+
+        # 6. Latest winner block
+        if stats["latest_winner"]:
+            draw_id, win_draw_num, win_jackpot, win_fid, win_name = stats["latest_winner"]
+            winner_block_html = get_lambo_winner_block(win_fid, win_name, format_jackpot(int(win_jackpot)), win_draw_num)
+
+    # 5. Rising Stars (apps with positive change, not in top 10), randomized 5-8
+    if rising_stars_all:
+        import random
+        num_stars = random.randint(min(5, len(rising_stars_all)), min(8, len(rising_stars_all)))
+        rising_stars = random.sample(rising_stars_all, num_stars)
     
     
     # 1. HTML list of changes (Clickable names)
@@ -392,7 +350,7 @@ def send_success_notification(miniapps_count, top_gainers, top_overall):
     # 4. Rising Stars HTML
     import random
     rising_stars_html = "<ul>"
-    if 'rising_stars' in locals() and rising_stars:
+    if rising_stars:
         for star in rising_stars:
             mention = f"@{star[1]}" if star[1] else star[0]
             rising_stars_html += f"<li><strong>{star[0]}</strong> {mention} <span style='color:green;'>+{star[2]} 📈</span></li>"
@@ -1,16 +1,19 @@
 import os
-import psycopg2
-import json
 from datetime import date
 from dotenv import load_dotenv
+from db import connect, release
+from content_hash import encode_payload
+from snapshot_archive import archive_snapshot
+from miniapp_schema import snapshot_entries
+from json_codec import read_file
 
 load_dotenv()
-NEON_DB_URL = os.getenv("NEON_DB_URL")
 
 def force_snapshot_update():
     """Kényszeríti a snapshot frissítését"""
+    conn = None
     try:
-        conn = psycopg2.connect(NEON_DB_URL)
+        conn = connect()
         cursor = conn.cursor()
         
         today = date.today()
@@ -19,37 +22,47 @@ def force_snapshot_update():
         print(f"Dátum: {today}")
         print()
         
-        # JSON fájl beolvasása
-        with open("top_miniapps.json", "r", encoding="utf-8") as f:
-            miniapps_data = json.load(f)
+        # JSON fájl beolvasása (a {snapshotDate, miniapps} burkolót is kibontja)
+        miniapps_data = snapshot_entries(read_file("top_miniapps.json"))
         
         print(f"JSON adatok beolvasva: {len(miniapps_data)} miniapp")
         
-        # Snapshot törlése és újra beszúrása
-        cursor.execute("DELETE FROM ranking_snapshots WHERE snapshot_date = %s", (today,))
-        print(f"Mai snapshot törölve")
-        
-        # Új snapshot beszúrása
+        # Archívum feltöltése az object store-ba; a raw_json csak ellenőrzött, tartós archívum mellett marad el
+        payload, _, snapshot_hash = encode_payload(miniapps_data)
+        object_key, archive_sha256, raw_json = archive_snapshot(miniapps_data, today, payload=payload)
         cursor.execute("""
             INSERT INTO ranking_snapshots (
-                snapshot_date, total_miniapps, raw_json
-            ) VALUES (%s, %s, %s)
+                snapshot_date, total_miniapps, raw_json, payload_hash, archive_sha256, object_key
+            ) VALUES (%s, %s, %s, %s, %s, %s)
+            ON CONFLICT (snapshot_date) DO UPDATE SET
+                total_miniapps = EXCLUDED.total_miniapps,
+                raw_json = EXCLUDED.raw_json,
+                payload_hash = EXCLUDED.payload_hash,
+                archive_path = NULL,
+                archive_sha256 = EXCLUDED.archive_sha256,
+                object_key = EXCLUDED.object_key,
+                created_at = NOW()
+            RETURNING created_at
         """, (
             today,
             len(miniapps_data),
-            json.dumps(miniapps_data)
+            raw_json,
+            snapshot_hash,
+            archive_sha256,
+            object_key
         ))
+        created_at = cursor.fetchone()[0]
         
         conn.commit()
-        print(f"✅ Új snapshot beszúrva: {today}")
+        print(f"✅ Snapshot frissítve: {today}")
         print(f"   - Miniappok: {len(miniapps_data)}")
-        print(f"   - Időpont: {cursor.execute('SELECT NOW()').fetchone()[0]}")
+        print(f"   - Objektum: {object_key}")
+        print(f"   - Időpont: {created_at}")
         
     except Exception as e:
         print(f"❌ Hiba történt: {e}")
     finally:
-        if conn:
-            conn.close()
+        release(conn)
 
 if __name__ == "__main__":
     force_snapshot_update() 
\ No newline at end of file
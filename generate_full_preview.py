@@ -1,6 +1,6 @@
 import os
 import sys
-from datetime import date
+from datetime import date, datetime
 
 # Add current directory to path so we can import email_notifications
 sys.path.append(os.getcwd())
@@ -26,7 +26,6 @@ top_overall = [
 
 # Monkey patch send_email_notification to just save the HTML
 import email_notifications
-import psycopg2
 from unittest.mock import MagicMock
 
 def mock_send(subject, html_body):
@@ -38,33 +37,15 @@ def mock_send(subject, html_body):
 
 email_notifications.send_email_notification = mock_send
 
-# Mock database connection and cursor to return a winner
-mock_conn = MagicMock()
-mock_cursor = MagicMock()
-
-# Configure cursor to return data for various queries
-def mock_execute(query, params=None):
-    pass
-
-mock_cursor.execute = mock_execute
-# Mock return for winner query sequence
-mock_cursor.fetchone.side_effect = [
-    ("APRANK123",), # 1. AppRank code
-    ("LOTTO888",),  # 2. Lotto code
-    (1, 155, 8630000), # 3. Active draw
-    (42,),          # 4. Ticket count (MISSING BEFORE!)
-    (1, 154, 8630000, 815252, "WinnerName") # 5. Winner row
-]
-
-mock_cursor.fetchall.side_effect = [
-    [("apprank", 581), ("lambo-lotto", 44)], # 1. Subscribers
-    [(202051, date.today())], # 2. AppRank usage
-    [], # 3. Lotto usage
-    [( "RisingApp", "author", 10)] # 4. Rising stars
-]
-
-email_notifications.psycopg2.connect = MagicMock(return_value=mock_conn)
-mock_conn.cursor.return_value = mock_cursor
+# Mock the statistics sections to return a winner
+email_notifications.fetch_statistics = MagicMock(return_value={
+    "apprank": ("APRANK123", [(202051, datetime.now())]),
+    "lotto": ("LOTTO888", []),
+    "subscribers": [("apprank", 581), ("lambo-lotto", 44)],
+    "active_draw": (155, 8630000, 42),
+    "rising_stars": [("RisingApp", "author", 10)],
+    "latest_winner": (1, 154, 8630000, 815252, "WinnerName"),
+})
 
 if __name__ == "__main__":
     print("Generating full email preview with winner...")
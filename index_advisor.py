@@ -0,0 +1,308 @@
+import argparse
+import os
+import re
+import sys
+from datetime import date, timedelta
+from dotenv import load_dotenv
+from db import connect, release
+from report_queries import REPORT_QUERIES
+
+load_dotenv()
+# A scratch/dev database with the production schema; required, so the
+# scratch tables are never created on production. Everything runs in one
+# rolled-back transaction.
+ADVISOR_DB_URL = os.getenv("INDEX_ADVISOR_DB_URL")
+
+SCHEMA = "index_advisor"
+
+# Tables copied (with their current indexes) into the scratch schema
+TABLES = (
+    "miniapps",
+    "miniapp_rankings",
+    "miniapp_statistics",
+    "miniapp_rankings_24h",
+    "miniapp_rankings_weekly",
+)
+
+# Date-filtered history tables: a Seq Scan on any of them fails the check
+HISTORY_TABLES = TABLES[1:]
+
+# Covering indexes tried against the report queries: (name, table, definition)
+CANDIDATE_INDEXES = (
+    ("idx_miniapp_statistics_day_change_24h", "miniapp_statistics",
+     "(stat_date, rank_24h_change DESC) INCLUDE (miniapp_id, current_rank)"),
+    ("idx_miniapp_statistics_day_rank", "miniapp_statistics",
+     "(stat_date, current_rank) INCLUDE (miniapp_id)"),
+    ("idx_miniapp_rankings_day_rank", "miniapp_rankings",
+     "(ranking_date, rank) INCLUDE (miniapp_id, rank_72h_change)"),
+    ("idx_miniapp_rankings_day_change_72h", "miniapp_rankings",
+     "(ranking_date, rank_72h_change) INCLUDE (miniapp_id, rank)"),
+)
+
+# A candidate is kept when it cuts the history rows a query reads by at least
+# this much. Row counts are stable across runs, unlike timings, and unlike
+# buffer counts they are not skewed by the scratch tables never being vacuumed.
+MIN_ROWS_SAVING = 0.5
+
+
+# Scratch partitions are named like partition_manager's: <table>_p<YYYYMM> and <table>_default
+_PARTITION_RE = re.compile(r"_(p\d{6}|default)$")
+
+
+def _parent_table(relation):
+    return _PARTITION_RE.sub("", relation)
+
+
+def _months(start, end):
+    month = start.replace(day=1)
+    while month <= end:
+        following = (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+        yield month, following
+        month = following
+
+
+def create_scratch_schema(cursor, start, end):
+    """Copies the report tables' structure and indexes into the scratch schema.
+
+    Tables partitioned in public are partitioned the same way here, with
+    monthly partitions covering [start, end], so the plans match production.
+    """
+    cursor.execute(f"CREATE SCHEMA {SCHEMA}")
+    for table in TABLES:
+        cursor.execute("""
+            SELECT pg_get_partkeydef(c.oid) FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = 'public' AND c.relname = %s
+        """, (table,))
+        row = cursor.fetchone()
+        partition_key = row[0] if row else None
+        cursor.execute(
+            f"CREATE TABLE {SCHEMA}.{table} (LIKE public.{table} INCLUDING ALL)"
+            + (f" PARTITION BY {partition_key}" if partition_key else "")
+        )
+        if partition_key:
+            for month, following in _months(start, end):
+                cursor.execute(
+                    f"CREATE TABLE {SCHEMA}.{table}_p{month:%Y%m} PARTITION OF {SCHEMA}.{table} "
+                    "FOR VALUES FROM (%s) TO (%s)", (month, following)
+                )
+            cursor.execute(f"CREATE TABLE {SCHEMA}.{table}_default PARTITION OF {SCHEMA}.{table} DEFAULT")
+    # SERIAL defaults would draw from the production sequences
+    cursor.execute("""
+        SELECT c.table_name, c.column_name FROM information_schema.columns c
+        JOIN pg_class t ON t.relname = c.table_name AND t.relnamespace = %s::regnamespace
+        WHERE c.table_schema = %s AND c.column_default LIKE 'nextval(%%' AND NOT t.relispartition
+    """, (SCHEMA, SCHEMA))
+    for table, column in cursor.fetchall():
+        cursor.execute(f"CREATE SEQUENCE {SCHEMA}.{table}_{column}_seq")
+        cursor.execute(f"ALTER TABLE {SCHEMA}.{table} ALTER COLUMN {column} SET DEFAULT nextval('{SCHEMA}.{table}_{column}_seq')")
+    cursor.execute(f"SET LOCAL search_path TO {SCHEMA}")
+
+
+def index_parents(cursor):
+    """Maps each partition's index name to its index on the partitioned table."""
+    cursor.execute("""
+        SELECT c.relname, p.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE c.relkind = 'i' AND c.relnamespace = %s::regnamespace
+    """, (SCHEMA,))
+    return dict(cursor.fetchall())
+
+
+def load_synthetic(cursor, apps, days, end):
+    """Fills the scratch tables with `days` daily rankings of `apps` mini apps.
+
+    Roughly one app in ten is missing from a given day, every day is a fresh
+    shuffle, and change columns follow the production value ranges.
+    """
+    cursor.execute("""
+        INSERT INTO miniapps (id, name, domain, author_username)
+        SELECT 'app' || i, 'App ' || i, 'app' || i || '.example.com', 'user' || i
+        FROM generate_series(1, %s) i
+    """, (apps,))
+    cursor.execute("""
+        CREATE TEMP TABLE synthetic ON COMMIT DROP AS
+        SELECT
+            'app' || i AS miniapp_id,
+            d::date AS day,
+            ROW_NUMBER() OVER (PARTITION BY d ORDER BY random())::int AS rank,
+            CASE WHEN random() < 0.9 THEN (random() * 200 - 100)::int END AS change_24h,
+            CASE WHEN random() < 0.9 THEN (random() * 300 - 150)::int END AS change_72h,
+            CASE WHEN random() < 0.9 THEN (random() * 400 - 200)::int END AS change_7d
+        FROM generate_series(%s::date, %s::date, INTERVAL '1 day') d
+        CROSS JOIN generate_series(1, %s) i
+        WHERE random() < 0.9
+    """, (end - timedelta(days=days - 1), end, apps))
+    cursor.execute("""
+        INSERT INTO miniapp_rankings (miniapp_id, ranking_date, rank, rank_72h_change)
+        SELECT miniapp_id, day, rank, change_72h FROM synthetic
+    """)
+    cursor.execute("""
+        INSERT INTO miniapp_statistics (
+            miniapp_id, stat_date, current_rank, rank_24h_change, rank_72h_change,
+            rank_7d_change, avg_rank, best_rank, worst_rank
+        )
+        SELECT miniapp_id, day, rank, change_24h, change_72h, change_7d, rank, rank, rank FROM synthetic
+    """)
+    cursor.execute("""
+        INSERT INTO miniapp_rankings_24h (miniapp_id, ranking_date, rank, rank_24h_change)
+        SELECT miniapp_id, day, rank, change_24h FROM synthetic
+    """)
+    cursor.execute("""
+        INSERT INTO miniapp_rankings_weekly (miniapp_id, ranking_date, rank, rank_7d_change)
+        SELECT miniapp_id, day, rank, change_7d FROM synthetic
+    """)
+    cursor.execute("SELECT COUNT(*) FROM synthetic")
+    rows = cursor.fetchone()[0]
+    for table in TABLES:
+        cursor.execute(f"ANALYZE {table}")
+    return rows
+
+
+def _walk(node):
+    yield node
+    for child in node.get("Plans", ()):
+        yield from _walk(child)
+
+
+def explain(cursor, sql, params, indexes=None):
+    """Runs EXPLAIN (ANALYZE, BUFFERS) on a query; returns a plan summary dict.
+
+    Scans of partitions are reported as scans of their table, using the
+    table's index names (`indexes`, see index_parents()).
+    """
+    indexes = indexes or {}
+    cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", params)
+    result = cursor.fetchone()[0][0]
+    plan = result["Plan"]
+    scans = []
+    rows_read = 0
+    for node in _walk(plan):
+        if "Relation Name" in node:
+            relation = _parent_table(node["Relation Name"])
+            index = node.get("Index Name")
+            scans.append((node["Node Type"], relation, indexes.get(index, index)))
+            if relation in HISTORY_TABLES:
+                rows_read += node["Actual Rows"] * node["Actual Loops"] + node.get("Rows Removed by Filter", 0)
+    return {
+        "ms": result["Execution Time"],
+        "buffers": plan.get("Shared Hit Blocks", 0) + plan.get("Shared Read Blocks", 0),
+        "rows_read": rows_read,
+        "scans": sorted(set(scans), key=scans.index),
+        "seq_scans": sorted({rel for kind, rel, _ in scans if kind == "Seq Scan" and rel in HISTORY_TABLES}),
+    }
+
+
+def explain_all(cursor, day):
+    indexes = index_parents(cursor)
+    return {name: explain(cursor, sql, (day, *extra), indexes) for name, sql, extra in REPORT_QUERIES}
+
+
+def _describe(scans):
+    return ", ".join(f"{kind} {rel}" + (f" using {index}" if index else "") for kind, rel, index in scans)
+
+
+def print_plans(plans, baseline=None):
+    for name, p in plans.items():
+        mark = "❌" if p["seq_scans"] else "✅"
+        line = f"   {mark} {name:<18} {p['ms']:8.2f} ms {p['buffers']:7d} buffers {p['rows_read']:8d} rows read"
+        if baseline:
+            before = baseline[name]["rows_read"]
+            line += f" (was {before})" if before != p["rows_read"] else ""
+        print(line)
+        print(f"        {_describe(p['scans'])}")
+
+
+def evaluate_candidates(cursor, day, baseline):
+    """Creates every candidate, re-plans, and keeps those a query uses to read fewer rows.
+
+    Returns ([(name, table, definition)], plans with all candidates).
+    """
+    for name, table, definition in CANDIDATE_INDEXES:
+        cursor.execute(f"CREATE INDEX {name} ON {table} {definition}")
+    for table in TABLES:
+        cursor.execute(f"ANALYZE {table}")
+    plans = explain_all(cursor, day)
+    kept = []
+    for candidate in CANDIDATE_INDEXES:
+        for query, p in plans.items():
+            used = any(index == candidate[0] for _, _, index in p["scans"])
+            before = baseline[query]["rows_read"]
+            if used and before and (before - p["rows_read"]) / before >= MIN_ROWS_SAVING:
+                kept.append(candidate)
+                break
+    return kept, plans
+
+
+def next_migration_path(directory="migrations"):
+    numbers = [int(m.group(1)) for m in (re.match(r"(\d{3})_", f) for f in os.listdir(directory)) if m]
+    # 999_ is a hand-applied one-off, not part of the sequence
+    number = max(n for n in numbers if n < 900) + 1
+    return os.path.join(directory, f"{number:03d}_add_report_query_indexes.sql")
+
+
+def write_migration(indexes, path):
+    lines = [
+        f"-- Migrations: {os.path.basename(path)}",
+        "",
+        "-- Covering indexes for the daily report queries (report_queries.py),",
+        "-- proposed by index_advisor.py. On the partitioned history tables they",
+        "-- are created on every monthly partition.",
+    ]
+    for name, table, definition in indexes:
+        lines.append(f"CREATE INDEX IF NOT EXISTS {name} ON {table} {definition};")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN the report queries on synthetic data and propose indexes.")
+    parser.add_argument("--apps", type=int, default=1000, help="mini apps per day (default 1000)")
+    parser.add_argument("--days", type=int, default=365, help="days of history (default 365)")
+    parser.add_argument("--write-migration", action="store_true", help="write the kept indexes as the next migration")
+    args = parser.parse_args()
+
+    if not ADVISOR_DB_URL:
+        print("❌ INDEX_ADVISOR_DB_URL is not set; point it at a scratch or dev copy of the schema, never production")
+        sys.exit(2)
+
+    day = date.today()
+    conn = connect(statement_timeout_ms=0, url=ADVISOR_DB_URL)
+    try:
+        cursor = conn.cursor()
+        create_scratch_schema(cursor, day - timedelta(days=args.days - 1), day)
+        print(f"Loading {args.days} days x {args.apps} apps of synthetic history...")
+        rows = load_synthetic(cursor, args.apps, args.days, day)
+        print(f"   {rows} rows per history table")
+
+        print("\nCurrent indexes:")
+        baseline = explain_all(cursor, day)
+        print_plans(baseline)
+        regressions = [name for name, p in baseline.items() if p["seq_scans"]]
+
+        print("\nWith candidate indexes:")
+        kept, plans = evaluate_candidates(cursor, day, baseline)
+        print_plans(plans, baseline)
+
+        if kept:
+            print("\nProposed indexes:")
+            for name, table, definition in kept:
+                print(f"   CREATE INDEX IF NOT EXISTS {name} ON {table} {definition};")
+            if args.write_migration:
+                path = next_migration_path()
+                write_migration(kept, path)
+                print(f"✅ Migration written: {path}")
+        else:
+            print("\n✅ No index proposals, the current plans are already index-driven")
+    finally:
+        # Nothing of the scratch schema survives (release() rolls back)
+        release(conn)
+
+    if regressions:
+        print(f"\n❌ Sequential scan on a history table: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import asyncio
+from config import DEFAULT_LIMIT
+from miniapp_fetcher import open_session, iter_bodies, FetchError
+from miniapp_schema import decode_page
+
+# Pages buffered between two stages; peak memory is about
+# (number of stages x QUEUE_SIZE) pages, independent of the ranking length.
+QUEUE_SIZE = 2
+
+# Deadline for the whole fetch -> load run (seconds)
+PIPELINE_TIMEOUT = 300
+
+_DONE = object()
+
+
+def _decode(item):
+    body, cursor = item
+    entries, decoded_cursor = decode_page(body)
+    if decoded_cursor != cursor:
+        raise FetchError(f"Cursor mismatch: peeked {cursor!r}, decoded {decoded_cursor!r}")
+    return entries
+
+
+async def _fetch_stage(session, out_q, limit):
+    async for item in iter_bodies(session, limit):
+        await out_q.put(item)
+    await out_q.put(_DONE)
+
+
+async def _map_stage(in_q, out_q, func):
+    """Runs `func` on every item in a worker thread and passes results on."""
+    while (item := await in_q.get()) is not _DONE:
+        await out_q.put(await asyncio.to_thread(func, item))
+    await out_q.put(_DONE)
+
+
+async def _load_stage(in_q, load):
+    loaded = 0
+    while (item := await in_q.get()) is not _DONE:
+        loaded += await asyncio.to_thread(load, item)
+    return loaded
+
+
+async def run_pipeline(transform, load, limit=DEFAULT_LIMIT, queue_size=QUEUE_SIZE, timeout=PIPELINE_TIMEOUT):
+    """Streams the ranking page by page through fetch -> decode -> transform -> load.
+
+    `transform(entries)` turns one page of miniapp_schema.RankEntry records
+    into whatever `load` expects; `load(rows)` writes it and returns the
+    number of miniapps loaded. Both run in worker threads, one page at a
+    time, so each may own a DB cursor.
+    Returns the total reported by `load`.
+    """
+    raw_q = asyncio.Queue(queue_size)
+    page_q = asyncio.Queue(queue_size)
+    row_q = asyncio.Queue(queue_size)
+    try:
+        async with asyncio.timeout(timeout):
+            async with open_session() as session:
+                async with asyncio.TaskGroup() as tg:
+                    tg.create_task(_fetch_stage(session, raw_q, limit))
+                    tg.create_task(_map_stage(raw_q, page_q, _decode))
+                    tg.create_task(_map_stage(page_q, row_q, transform))
+                    loader = tg.create_task(_load_stage(row_q, load))
+    except ExceptionGroup as eg:
+        # Surface the stage failure itself; the other stages were only cancelled
+        raise eg.exceptions[0]
+    return loader.result()
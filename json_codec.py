@@ -0,0 +1,46 @@
+import json
+import os
+
+# orjson is several times faster than the stdlib encoder and produces bytes
+# directly; the fallback keeps scripts working where it is not installed.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(value, pretty=False, sort_keys=False):
+    """Serializes `value` once into UTF-8 JSON bytes.
+
+    Compact output is byte-identical between orjson and the fallback for the
+    payloads we store (str/int/bool/None/list/dict); dates and other
+    unsupported types are written with str().
+    """
+    if orjson is not None:
+        option = (orjson.OPT_INDENT_2 if pretty else 0) | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(value, default=str, option=option)
+    return json.dumps(
+        value, ensure_ascii=False, default=str, sort_keys=sort_keys,
+        indent=2 if pretty else None, separators=None if pretty else (",", ":")
+    ).encode("utf-8")
+
+
+def loads(data):
+    """Parses JSON from bytes or str; invalid input raises ValueError."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def write_bytes(path, data):
+    """Writes an already encoded payload atomically; returns its size in bytes."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return len(data)
+
+
+def read_file(path):
+    with open(path, "rb") as f:
+        return loads(f.read())
@@ -0,0 +1,216 @@
+import argparse
+import os
+import sys
+import uuid
+from datetime import date, datetime, timezone
+from db import connect, release
+from json_codec import dumps, loads, read_file, write_bytes
+
+# One leaderboard document per ingestion run, built from the day's
+# miniapp_statistics right after they are written. The e-mail,
+# debug_fetch_today.py and check_data.py read it instead of running their own
+# report queries. It is stored in leaderboard_runs (migration 028) and as
+# LEADERBOARD_DIR/<day>/<run id>.json, both keyed by run id.
+# Changes follow the statistics convention: previous rank - current rank.
+LEADERBOARD_VERSION = 1
+
+LEADERBOARD_DIR = os.getenv("LEADERBOARD_DIR", "leaderboards")
+
+# Change windows, as (document key, miniapp_statistics column)
+WINDOWS = (
+    ("24h", "rank_24h_change"),
+    ("72h", "rank_72h_change"),
+    ("7d", "rank_7d_change"),
+    ("30d", "rank_30d_change"),
+)
+
+TOP_LIMIT = 10
+MOVERS_LIMIT = 10
+# Same definition as report_queries.RISING_STARS
+RISING_STARS_LIMIT = 20
+RISING_STARS_MIN_RANK = 10
+CATEGORY_LIMIT = 5
+
+DAY_ROWS = f"""
+    SELECT s.miniapp_id, m.name, m.author_username, m.domain, m.primary_category, s.current_rank,
+           {", ".join(f"s.{column}" for _, column in WINDOWS)},
+           s.avg_rank, s.best_rank, s.worst_rank
+    FROM miniapp_statistics s
+    JOIN miniapps m ON s.miniapp_id = m.id
+    WHERE s.stat_date = %s AND s.current_rank IS NOT NULL
+    ORDER BY s.current_rank
+"""
+
+
+class LeaderboardError(Exception):
+    """Raised when no leaderboard exists for the requested run or day."""
+
+
+def new_run_id(now=None):
+    """A sortable id for one ingestion run, e.g. 20250725T061502Z-1a2b3c4d."""
+    now = now or datetime.now(timezone.utc)
+    return f"{now:%Y%m%dT%H%M%SZ}-{uuid.uuid4().hex[:8]}"
+
+
+def _app(row):
+    app_id, name, username, domain, category, rank = row[:6]
+    changes = row[6:6 + len(WINDOWS)]
+    avg_rank, best_rank, worst_rank = row[6 + len(WINDOWS):]
+    return {
+        "id": app_id, "name": name, "username": username, "domain": domain, "category": category,
+        "rank": rank,
+        "changes": {key: change for (key, _), change in zip(WINDOWS, changes)},
+        "avg_rank": round(float(avg_rank), 2) if avg_rank is not None else None,
+        "best_rank": best_rank, "worst_rank": worst_rank,
+    }
+
+
+def _entry(app, window=None):
+    entry = {key: app[key] for key in ("id", "name", "username", "domain", "category", "rank")}
+    if window:
+        entry["change"] = app["changes"][window]
+    return entry
+
+
+def build_leaderboard(cursor, day, run_id=None):
+    """Builds the leaderboard document of `day` from one scan of its statistics.
+
+    Lists keep the report query orderings; ties go to the better current rank.
+    """
+    cursor.execute(DAY_ROWS, (day,))
+    apps = [_app(row) for row in cursor.fetchall()]
+    windows = {}
+    for key, _ in WINDOWS:
+        moved = [app for app in apps if app["changes"][key]]
+        # `apps` is in rank order and sorted() is stable, so equal changes keep it
+        windows[key] = {
+            "gainers": [_entry(app, key) for app in sorted(
+                (app for app in moved if app["changes"][key] > 0), key=lambda a: -a["changes"][key]
+            )[:MOVERS_LIMIT]],
+            "losers": [_entry(app, key) for app in sorted(
+                (app for app in moved if app["changes"][key] < 0), key=lambda a: a["changes"][key]
+            )[:MOVERS_LIMIT]],
+        }
+    rising = sorted(
+        (app for app in apps if (app["changes"]["24h"] or 0) > 0 and app["rank"] > RISING_STARS_MIN_RANK),
+        key=lambda a: -a["changes"]["24h"]
+    )
+    categories = {}
+    for app in apps:
+        top = categories.setdefault(app["category"] or "other", [])
+        if len(top) < CATEGORY_LIMIT:
+            top.append(_entry(app, "24h"))
+    return {
+        "version": LEADERBOARD_VERSION,
+        "run_id": run_id or new_run_id(),
+        "day": str(day),
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "apps": len(apps),
+        "top_overall": apps[:TOP_LIMIT],
+        "windows": windows,
+        "rising_stars": [_entry(app, "24h") for app in rising[:RISING_STARS_LIMIT]],
+        "categories": categories,
+    }
+
+
+def store_leaderboard(cursor, doc):
+    """Inserts the document into leaderboard_runs (the caller commits)."""
+    cursor.execute(
+        "INSERT INTO leaderboard_runs (run_id, run_date, version, document) VALUES (%s, %s, %s, %s::jsonb)",
+        (doc["run_id"], doc["day"], doc["version"], dumps(doc).decode("utf-8"))
+    )
+
+
+def leaderboard_path(day, run_id, leaderboard_dir=None):
+    return os.path.join(leaderboard_dir or LEADERBOARD_DIR, str(day), f"{run_id}.json")
+
+
+def write_leaderboard(doc, leaderboard_dir=None):
+    """Writes the local copy of the document; returns its path."""
+    path = leaderboard_path(doc["day"], doc["run_id"], leaderboard_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_bytes(path, dumps(doc, pretty=True))
+    return path
+
+
+def _document(value):
+    # jsonb comes back decoded from both drivers; text does not
+    doc = loads(value) if isinstance(value, (str, bytes)) else value
+    if doc.get("version") != LEADERBOARD_VERSION:
+        raise LeaderboardError(f"Leaderboard {doc.get('run_id')} is version {doc.get('version')}, expected {LEADERBOARD_VERSION}")
+    return doc
+
+
+def load_leaderboard(cursor, day=None, run_id=None):
+    """The document of `run_id`, or the latest run of `day` (default today)."""
+    if run_id:
+        cursor.execute("SELECT document FROM leaderboard_runs WHERE run_id = %s", (run_id,))
+    else:
+        cursor.execute(
+            "SELECT document FROM leaderboard_runs WHERE run_date = %s ORDER BY created_at DESC, run_id DESC LIMIT 1",
+            (day or date.today(),)
+        )
+    row = cursor.fetchone()
+    if not row:
+        raise LeaderboardError(f"No leaderboard for {'run ' + run_id if run_id else day or date.today()}")
+    return _document(row[0])
+
+
+def read_leaderboard(day=None, run_id=None, leaderboard_dir=None):
+    """Like load_leaderboard(), from the local copies."""
+    day_dir = os.path.join(leaderboard_dir or LEADERBOARD_DIR, str(day or date.today()))
+    if run_id is None:
+        # Run ids start with their UTC timestamp, so the last name is the latest run
+        runs = sorted(name for name in os.listdir(day_dir) if name.endswith(".json")) if os.path.isdir(day_dir) else []
+        if not runs:
+            raise LeaderboardError(f"No local leaderboard in {day_dir}")
+        run_id = runs[-1][:-len(".json")]
+    path = os.path.join(day_dir, f"{run_id}.json")
+    if not os.path.exists(path):
+        raise LeaderboardError(f"No local leaderboard {path}")
+    return _document(read_file(path))
+
+
+def publish_leaderboard(conn, day, run_id=None):
+    """Builds, stores and commits the run's leaderboard, then writes the local copy."""
+    cursor = conn.cursor()
+    doc = build_leaderboard(cursor, day, run_id)
+    store_leaderboard(cursor, doc)
+    conn.commit()
+    return doc, write_leaderboard(doc)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-run leaderboard documents.")
+    parser.add_argument("day", nargs="?", type=date.fromisoformat, default=None, help="default: today")
+    parser.add_argument("--run", help="a specific run id instead of the day's latest")
+    parser.add_argument("--local", action="store_true", help=f"read the local copy under {LEADERBOARD_DIR}")
+    parser.add_argument("--build", action="store_true", help="build and store a new run for the day")
+    args = parser.parse_args()
+
+    if args.local:
+        try:
+            doc = read_leaderboard(args.day, args.run)
+        except (OSError, ValueError, LeaderboardError) as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(dumps(doc, pretty=True).decode("utf-8"))
+        return
+
+    conn = None
+    try:
+        conn = connect()
+        if args.build:
+            doc, path = publish_leaderboard(conn, args.day or date.today())
+            print(f"✅ Leaderboard {doc['run_id']} for {doc['day']}: {doc['apps']} apps ({path})")
+        else:
+            print(dumps(load_leaderboard(conn.cursor(), args.day, args.run), pretty=True).decode("utf-8"))
+    except LeaderboardError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    finally:
+        release(conn)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import argparse
+import contextlib
+import hashlib
+import io
+import os
+import sys
+import time
+from datetime import date
+from config import DEFAULT_LIMIT
+from daily_update_simple import load_page, load_page_pipelined
+from dotenv import load_dotenv
+from db import connect, connect_pipeline, pipeline_supported, release
+
+load_dotenv()
+# The runs write (and roll back) thousands of rows, so the database must be
+# named explicitly; NEON_DB_URL is never used as a default
+BENCHMARK_DB_URL = os.getenv("BENCHMARK_DB_URL")
+
+# App counts compared by default: today's ranking, and two growth scenarios
+DEFAULT_SIZES = (250, 10_000, 100_000)
+
+# Synthetic ids start here so they never collide with real miniapps
+FIRST_ID = 900_000_000
+
+
+def synthetic_pages(apps, page_size, today):
+    """Yields load_page() input for `apps` fake miniapps, `page_size` per page."""
+    for lo in range(0, apps, page_size):
+        meta, stats = [], []
+        for rank in range(lo + 1, min(lo + page_size, apps) + 1):
+            app_id = str(FIRST_ID + rank)
+            meta.append((
+                app_id, f"Bench app {rank}", f"bench{rank}.example", f"https://bench{rank}.example",
+                None, "utility", rank, f"bench{rank}", f"Bench {rank}", rank % 5000,
+                hashlib.md5(str(rank).encode()).hexdigest()
+            ))
+            stats.append((
+                app_id, today, rank, rank % 7 - 3, rank % 11 - 5, rank % 13 - 6, None,
+                float(rank), rank, 1, 3, 7, None
+            ))
+        yield meta, stats
+
+
+def _time_load(conn, load, apps, page_size, today):
+    """Loads every page in one transaction, rolls it back and returns the seconds taken."""
+    writes = {'miniapps': [0, 0], 'statistics': [0, 0]}
+    try:
+        started = time.perf_counter()
+        # load_page() reports every page; a 100k run would print a thousand lines
+        with contextlib.redirect_stdout(io.StringIO()):
+            for rows in synthetic_pages(apps, page_size, today):
+                load(rows, writes)
+        elapsed = time.perf_counter() - started
+    finally:
+        conn.rollback()
+    if writes['statistics'][0] != apps:
+        raise RuntimeError(f"expected {apps} statistics rows written, got {writes['statistics'][0]}")
+    return elapsed
+
+
+def run(sizes, page_size, dsn):
+    today = date.today()
+    print(f"Load stage benchmark ({page_size} apps per page, every run rolled back)")
+    print(f"{'apps':>8}  {'execute_values':>15}  {'pipeline':>10}  {'speedup':>8}")
+    conn = pipe_conn = None
+    try:
+        conn = connect(statement_timeout_ms=0, url=dsn)
+        cursor = conn.cursor()
+        pipe_conn = connect_pipeline(statement_timeout_ms=0, url=dsn)
+        for apps in sizes:
+            baseline = _time_load(conn, lambda rows, writes: load_page(cursor, rows, writes), apps, page_size, today)
+            pipelined = _time_load(pipe_conn, lambda rows, writes: load_page_pipelined(pipe_conn, rows, writes), apps, page_size, today)
+            print(f"{apps:>8}  {baseline:>14.2f}s  {pipelined:>9.2f}s  {baseline / pipelined:>7.1f}x")
+    finally:
+        release(pipe_conn)
+        release(conn)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the execute_values and pipeline-mode load paths.")
+    parser.add_argument("--sizes", type=lambda s: [int(n) for n in s.split(",")], default=DEFAULT_SIZES,
+                        help="comma-separated app counts (default: 250,10000,100000)")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_LIMIT)
+    parser.add_argument("--dsn", default=BENCHMARK_DB_URL,
+                        help="database to benchmark against (default: BENCHMARK_DB_URL; never NEON_DB_URL)")
+    args = parser.parse_args()
+    if not args.dsn:
+        print("❌ Pass --dsn or set BENCHMARK_DB_URL to a scratch or dev database")
+        sys.exit(2)
+    if not pipeline_supported():
+        print("❌ Pipeline mode needs psycopg 3 built against libpq 14 or newer")
+        sys.exit(1)
+    run(args.sizes, args.page_size, args.dsn)
+
+
+if __name__ == "__main__":
+    main()
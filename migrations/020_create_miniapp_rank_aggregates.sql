@@ -0,0 +1,31 @@
+-- Migrations: 020_create_miniapp_rank_aggregates.sql
+
+-- Running per-app rank aggregates, folded forward one day at a time by the
+-- daily update instead of re-scanning the whole ranking history.
+CREATE TABLE IF NOT EXISTS miniapp_rank_aggregates (
+    miniapp_id VARCHAR(64) PRIMARY KEY,
+    total_rankings INTEGER NOT NULL,
+    rank_sum BIGINT NOT NULL,
+    best_rank INTEGER NOT NULL,
+    worst_rank INTEGER NOT NULL,
+    last_rank INTEGER NOT NULL,
+    last_seen_date DATE NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Seed from the existing history (same definition as running_aggregates.py --rebuild)
+INSERT INTO miniapp_rank_aggregates (
+    miniapp_id, total_rankings, rank_sum, best_rank, worst_rank, last_rank, last_seen_date
+)
+SELECT
+    miniapp_id,
+    COUNT(*),
+    SUM(current_rank),
+    MIN(current_rank),
+    MAX(current_rank),
+    (ARRAY_AGG(current_rank ORDER BY stat_date DESC))[1],
+    MAX(stat_date)
+FROM miniapp_statistics
+WHERE current_rank > 0
+GROUP BY miniapp_id
+ON CONFLICT (miniapp_id) DO NOTHING;
@@ -0,0 +1,7 @@
+-- Migrations: 021_add_content_hashes.sql
+
+-- Hash of the persisted metadata columns; upserts skip rows whose hash is unchanged
+ALTER TABLE miniapps ADD COLUMN IF NOT EXISTS meta_hash TEXT;
+
+-- Hash of the normalized API payload; an identical snapshot is not rewritten
+ALTER TABLE ranking_snapshots ADD COLUMN IF NOT EXISTS payload_hash TEXT;
@@ -0,0 +1,9 @@
+-- Migrations: 022_add_snapshot_archive.sql
+
+-- Snapshots live in compressed columnar archive files (snapshot_archive.py);
+-- the database keeps only where the file is and its checksum
+ALTER TABLE ranking_snapshots ADD COLUMN IF NOT EXISTS archive_path TEXT;
+ALTER TABLE ranking_snapshots ADD COLUMN IF NOT EXISTS archive_sha256 TEXT;
+
+-- raw_json is NULL for archived snapshots
+ALTER TABLE ranking_snapshots ALTER COLUMN raw_json DROP NOT NULL;
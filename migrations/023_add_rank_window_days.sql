@@ -0,0 +1,16 @@
+-- Migrations: 023_add_rank_window_days.sql
+
+-- Effective length (days) of each rank-change window. Normally the nominal
+-- window; longer when the exact day had no snapshot and the nearest earlier
+-- one within the as-of tolerance was used. NULL when there is no change.
+ALTER TABLE miniapp_rankings_24h ADD COLUMN IF NOT EXISTS window_days SMALLINT;
+ALTER TABLE miniapp_rankings_weekly ADD COLUMN IF NOT EXISTS window_days SMALLINT;
+ALTER TABLE miniapp_rankings_30d ADD COLUMN IF NOT EXISTS window_days SMALLINT;
+
+ALTER TABLE miniapp_statistics ADD COLUMN IF NOT EXISTS rank_24h_window_days SMALLINT;
+ALTER TABLE miniapp_statistics ADD COLUMN IF NOT EXISTS rank_72h_window_days SMALLINT;
+ALTER TABLE miniapp_statistics ADD COLUMN IF NOT EXISTS rank_7d_window_days SMALLINT;
+ALTER TABLE miniapp_statistics ADD COLUMN IF NOT EXISTS rank_30d_window_days SMALLINT;
+
+-- Range scans by date for the as-of derivation (the primary key leads with miniapp_id)
+CREATE INDEX IF NOT EXISTS idx_miniapp_rankings_ranking_date ON miniapp_rankings (ranking_date);
@@ -0,0 +1,115 @@
+-- Migrations: 024_partition_ranking_history.sql
+
+-- Range-partitions the daily history tables by month. Each existing table is
+-- renamed to <table>_legacy and attached as the partition for everything up to
+-- the end of the current month; partition_manager.py creates the monthly
+-- partitions after that and rolls old days up into weekly aggregates.
+-- The parent keeps the legacy table's defaults, CHECK constraints, foreign
+-- keys (e.g. to miniapps) and secondary indexes; the legacy index names move
+-- to the parent's partitioned indexes.
+DO $$
+DECLARE
+    t RECORD;
+    s RECORD;
+    c RECORD;
+    i RECORD;
+    boundary DATE := (date_trunc('month', CURRENT_DATE) + INTERVAL '1 month')::date;
+BEGIN
+    FOR t IN
+        SELECT * FROM (VALUES
+            ('miniapp_rankings', 'ranking_date'),
+            ('miniapp_statistics', 'stat_date'),
+            ('miniapp_rankings_24h', 'ranking_date'),
+            ('miniapp_rankings_weekly', 'ranking_date'),
+            ('miniapp_rankings_30d', 'ranking_date')
+        ) AS v(name, date_column)
+    LOOP
+        -- Missing or already partitioned: nothing to do
+        CONTINUE WHEN to_regclass(t.name) IS NULL;
+        CONTINUE WHEN EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = t.name::regclass);
+
+        EXECUTE format('ALTER TABLE %I RENAME TO %I', t.name, t.name || '_legacy');
+        -- Indexes are re-created below; LIKE ... INCLUDING ALL would also copy a
+        -- primary key without the partition column, which a partitioned table rejects
+        EXECUTE format(
+            'CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED '
+            'INCLUDING IDENTITY INCLUDING STORAGE INCLUDING COMMENTS) PARTITION BY RANGE (%I)',
+            t.name, t.name || '_legacy', t.date_column
+        );
+        EXECUTE format('ALTER TABLE %I ADD PRIMARY KEY (miniapp_id, %I)', t.name, t.date_column);
+        -- Foreign keys; on ATTACH the legacy table's identical ones become their partition copies
+        FOR c IN
+            SELECT conname, pg_get_constraintdef(oid) AS definition
+            FROM pg_constraint
+            WHERE conrelid = (t.name || '_legacy')::regclass AND contype = 'f'
+        LOOP
+            EXECUTE format('ALTER TABLE %I ADD CONSTRAINT %I %s', t.name, c.conname, c.definition);
+        END LOOP;
+        -- Secondary indexes (not backing a constraint) on the parent, under their original names.
+        -- A unique index without the partition column cannot exist on the parent; it stays on
+        -- the legacy partition only.
+        FOR i IN
+            SELECT ic.relname AS index_name, x.indexrelid, x.indisunique,
+                   EXISTS (
+                       SELECT 1 FROM pg_attribute a
+                       WHERE a.attrelid = x.indrelid AND a.attname = t.date_column
+                         AND a.attnum = ANY (x.indkey)
+                   ) AS has_date_column
+            FROM pg_index x
+            JOIN pg_class ic ON ic.oid = x.indexrelid
+            WHERE x.indrelid = (t.name || '_legacy')::regclass
+              AND NOT EXISTS (SELECT 1 FROM pg_constraint k WHERE k.conindid = x.indexrelid)
+        LOOP
+            IF i.indisunique AND NOT i.has_date_column THEN
+                RAISE NOTICE 'Unique index % lacks %, kept on %_legacy only', i.index_name, t.date_column, t.name;
+                CONTINUE;
+            END IF;
+            EXECUTE format('ALTER INDEX %I RENAME TO %I', i.index_name, i.index_name || '_legacy');
+            EXECUTE regexp_replace(
+                pg_get_indexdef(i.indexrelid),
+                '^CREATE (UNIQUE )?INDEX \S+ ON \S+ ',
+                format('CREATE \1INDEX %I ON %I ', i.index_name, t.name)
+            );
+        END LOOP;
+        -- SERIAL sequences move to the parent, so the legacy partition can be dropped later
+        FOR s IN
+            SELECT seq.oid::regclass AS seq_name, a.attname
+            FROM pg_depend d
+            JOIN pg_class seq ON seq.oid = d.objid AND seq.relkind = 'S'
+            JOIN pg_attribute a ON a.attrelid = d.refobjid AND a.attnum = d.refobjsubid
+            WHERE d.refobjid = (t.name || '_legacy')::regclass AND d.deptype = 'a'
+        LOOP
+            EXECUTE format('ALTER SEQUENCE %s OWNED BY %I.%I', s.seq_name, t.name, s.attname);
+        END LOOP;
+        EXECUTE format(
+            'ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (MINVALUE) TO (%L)',
+            t.name, t.name || '_legacy', boundary
+        );
+        -- Latest-day and date-range lookups (MAX(stat_date), as-of scans) per partition,
+        -- unless a carried-over index already leads with the date column
+        IF NOT EXISTS (
+            SELECT 1 FROM pg_index x
+            JOIN pg_attribute a ON a.attrelid = x.indrelid AND a.attnum = x.indkey[0]
+            WHERE x.indrelid = t.name::regclass AND a.attname = t.date_column AND x.indnatts = 1
+        ) THEN
+            EXECUTE format('CREATE INDEX IF NOT EXISTS %I ON %I (%I)', t.name || '_' || t.date_column || '_idx', t.name, t.date_column);
+        END IF;
+        -- Safety net for a missed partition_manager run; normally stays empty
+        EXECUTE format('CREATE TABLE IF NOT EXISTS %I PARTITION OF %I DEFAULT', t.name || '_default', t.name);
+    END LOOP;
+END $$;
+
+-- Weekly rollup of rank history older than the retention window (one row per
+-- app and ISO week). Sums and counts are additive, so running aggregates can
+-- be rebuilt from rollups plus the remaining daily rows.
+CREATE TABLE IF NOT EXISTS miniapp_rank_history_weekly (
+    miniapp_id VARCHAR(64) NOT NULL,
+    week_start DATE NOT NULL,
+    days_ranked INTEGER NOT NULL,
+    rank_sum BIGINT NOT NULL,
+    best_rank INTEGER NOT NULL,
+    worst_rank INTEGER NOT NULL,
+    last_rank INTEGER NOT NULL,
+    last_seen_date DATE NOT NULL,
+    PRIMARY KEY (miniapp_id, week_start)
+);
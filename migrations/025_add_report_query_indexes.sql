@@ -0,0 +1,9 @@
+-- Migrations: 025_add_report_query_indexes.sql
+
+-- Covering indexes for the daily report queries (report_queries.py),
+-- proposed by index_advisor.py. On the partitioned history tables they
+-- are created on every monthly partition.
+CREATE INDEX IF NOT EXISTS idx_miniapp_statistics_day_change_24h ON miniapp_statistics (stat_date, rank_24h_change DESC) INCLUDE (miniapp_id, current_rank);
+CREATE INDEX IF NOT EXISTS idx_miniapp_statistics_day_rank ON miniapp_statistics (stat_date, current_rank) INCLUDE (miniapp_id);
+CREATE INDEX IF NOT EXISTS idx_miniapp_rankings_day_rank ON miniapp_rankings (ranking_date, rank) INCLUDE (miniapp_id, rank_72h_change);
+CREATE INDEX IF NOT EXISTS idx_miniapp_rankings_day_change_72h ON miniapp_rankings (ranking_date, rank_72h_change) INCLUDE (miniapp_id, rank);
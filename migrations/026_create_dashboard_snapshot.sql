@@ -0,0 +1,100 @@
+-- Migrations: 026_create_dashboard_snapshot.sql
+
+-- Everything the daily success e-mail shows, as one JSON document in one
+-- round trip (dashboard_snapshot.py loads it). Each key mirrors a section of
+-- notification_stats.py; rising stars and the top lists use the same
+-- definitions as report_queries.py.
+CREATE OR REPLACE FUNCTION dashboard_snapshot(p_day DATE DEFAULT CURRENT_DATE)
+RETURNS JSON
+LANGUAGE sql
+STABLE
+AS $$
+    WITH apprank_code AS (
+        SELECT code FROM daily_codes WHERE is_active = TRUE LIMIT 1
+    ),
+    lotto_code AS (
+        SELECT code FROM lotto_daily_codes WHERE is_active = TRUE LIMIT 1
+    ),
+    active_draw AS (
+        SELECT id, draw_number, jackpot FROM lottery_draws
+        WHERE status = 'active' ORDER BY draw_number DESC LIMIT 1
+    )
+    SELECT json_build_object(
+        'day', p_day,
+        'apprank', json_build_object(
+            'code', COALESCE((SELECT code FROM apprank_code), 'N/A'),
+            'usages', COALESCE((
+                SELECT json_agg(json_build_object('fid', u.fid, 'used_at', u.used_at) ORDER BY u.used_at DESC)
+                FROM daily_code_usages u WHERE u.code = COALESCE((SELECT code FROM apprank_code), 'N/A')
+            ), '[]'::json)
+        ),
+        'lotto', json_build_object(
+            'code', COALESCE((SELECT code FROM lotto_code), 'N/A'),
+            'usages', COALESCE((
+                SELECT json_agg(json_build_object('fid', u.fid, 'used_at', u.used_at) ORDER BY u.used_at DESC)
+                FROM lotto_daily_code_usages u WHERE u.code = COALESCE((SELECT code FROM lotto_code), 'N/A')
+            ), '[]'::json)
+        ),
+        'subscribers', COALESCE((
+            SELECT json_agg(json_build_object('app_id', app_id, 'count', subscribers))
+            FROM (SELECT app_id, COUNT(*) AS subscribers FROM notification_tokens GROUP BY app_id) s
+        ), '[]'::json),
+        'active_draw', (
+            SELECT json_build_object(
+                'draw_number', d.draw_number,
+                'jackpot', d.jackpot,
+                'tickets', (SELECT COUNT(*) FROM lottery_tickets t WHERE t.draw_id = d.id)
+            )
+            FROM active_draw d
+        ),
+        'rising_stars', COALESCE((
+            SELECT json_agg(json_build_object('name', r.name, 'username', r.author_username, 'change', r.rank_24h_change)
+                            ORDER BY r.rank_24h_change DESC)
+            FROM (
+                SELECT m.name, m.author_username, s.rank_24h_change
+                FROM miniapp_statistics s
+                JOIN miniapps m ON s.miniapp_id = m.id
+                WHERE s.stat_date = p_day AND s.rank_24h_change > 0 AND s.current_rank > 10
+                ORDER BY s.rank_24h_change DESC
+                LIMIT 20
+            ) r
+        ), '[]'::json),
+        'top_gainers', COALESCE((
+            SELECT json_agg(json_build_object('name', g.name, 'username', g.author_username, 'rank', g.current_rank,
+                                              'change', g.rank_24h_change, 'domain', g.domain)
+                            ORDER BY g.rank_24h_change DESC)
+            FROM (
+                SELECT m.name, m.author_username, s.current_rank, s.rank_24h_change, m.domain
+                FROM miniapp_statistics s
+                JOIN miniapps m ON s.miniapp_id = m.id
+                WHERE s.stat_date = p_day AND s.rank_24h_change IS NOT NULL
+                ORDER BY s.rank_24h_change DESC
+                LIMIT 10
+            ) g
+        ), '[]'::json),
+        'top_overall', COALESCE((
+            SELECT json_agg(json_build_object('name', o.name, 'username', o.author_username, 'rank', o.current_rank,
+                                              'domain', o.domain)
+                            ORDER BY o.current_rank)
+            FROM (
+                SELECT m.name, m.author_username, s.current_rank, m.domain
+                FROM miniapp_statistics s
+                JOIN miniapps m ON s.miniapp_id = m.id
+                WHERE s.stat_date = p_day
+                ORDER BY s.current_rank ASC
+                LIMIT 5
+            ) o
+        ), '[]'::json),
+        'latest_winner', (
+            SELECT json_build_object(
+                'draw_id', ld.id, 'draw_number', ld.draw_number, 'jackpot', ld.jackpot,
+                'player_fid', lt.player_fid, 'player_name', lt.player_name
+            )
+            FROM lottery_draws ld
+            JOIN lottery_tickets lt ON ld.id = lt.draw_id AND ld.winning_number = lt.number
+            WHERE ld.status = 'completed'
+            ORDER BY ld.draw_number DESC
+            LIMIT 1
+        )
+    )
+$$;
@@ -0,0 +1,7 @@
+-- Migrations: 027_add_snapshot_object_key.sql
+
+-- Snapshot archives live in an object store (object_store.py); a row keeps
+-- only its metadata, the object key and the archive checksum. raw_json and
+-- archive_path are left for rows not yet moved by
+-- `python snapshot_archive.py --migrate`, which clears both.
+ALTER TABLE ranking_snapshots ADD COLUMN IF NOT EXISTS object_key TEXT;
@@ -0,0 +1,16 @@
+-- Migrations: 028_create_leaderboard_runs.sql
+
+-- One leaderboard document per ingestion run (leaderboard.py): top overall,
+-- gainers and losers per change window, rising stars and per-category tops.
+-- The e-mail, debug_fetch_today.py and check_data.py read the latest run of
+-- a day instead of running their own report queries.
+CREATE TABLE IF NOT EXISTS leaderboard_runs (
+    run_id TEXT PRIMARY KEY,
+    run_date DATE NOT NULL,
+    version SMALLINT NOT NULL,
+    document JSONB NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_leaderboard_runs_date
+    ON leaderboard_runs (run_date, created_at DESC);
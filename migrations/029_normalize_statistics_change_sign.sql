@@ -0,0 +1,33 @@
+-- Migrations: 029_normalize_statistics_change_sign.sql
+
+-- miniapp_statistics rank_*_change columns are previous rank - current rank
+-- (positive means the app climbed), as daily_update_simple.py always wrote
+-- them. daily_update.py used to copy the 24h/7d change tables, which hold
+-- current - previous, so its rows have those columns negated. A row is
+-- flipped when its stored change is exactly the negation of the change
+-- recomputed from the app's earlier statistics rows; flipped rows then match,
+-- so running this again changes nothing. rank_72h_change came from the API
+-- (positive means climbed) in both scripts and is left alone.
+WITH recomputed AS (
+    SELECT s.miniapp_id, s.stat_date,
+           p1.current_rank - s.current_rank AS change_24h,
+           p7.current_rank - s.current_rank AS change_7d,
+           p30.current_rank - s.current_rank AS change_30d
+    FROM miniapp_statistics s
+    LEFT JOIN miniapp_statistics p1 ON p1.miniapp_id = s.miniapp_id AND p1.stat_date = s.stat_date - 1
+    LEFT JOIN miniapp_statistics p7 ON p7.miniapp_id = s.miniapp_id AND p7.stat_date = s.stat_date - 7
+    LEFT JOIN miniapp_statistics p30 ON p30.miniapp_id = s.miniapp_id AND p30.stat_date = s.stat_date - 30
+    WHERE s.current_rank IS NOT NULL
+)
+UPDATE miniapp_statistics s SET
+    rank_24h_change = -s.rank_24h_change,
+    rank_7d_change = -s.rank_7d_change,
+    rank_30d_change = -s.rank_30d_change
+FROM recomputed r
+WHERE r.miniapp_id = s.miniapp_id AND r.stat_date = s.stat_date
+  AND (
+      (s.rank_24h_change <> 0 AND s.rank_24h_change = -r.change_24h)
+      OR (COALESCE(s.rank_24h_change, 0) = 0 AND s.rank_7d_change <> 0 AND s.rank_7d_change = -r.change_7d)
+      OR (COALESCE(s.rank_24h_change, 0) = 0 AND COALESCE(s.rank_7d_change, 0) = 0
+          AND s.rank_30d_change <> 0 AND s.rank_30d_change = -r.change_30d)
+  );
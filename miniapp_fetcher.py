@@ -0,0 +1,172 @@
+import asyncio
+import random
+import re
+import aiohttp
+from config import get_api_headers, FARCASTER_API_URL, DEFAULT_LIMIT
+from json_codec import loads
+
+# Per-request and whole-walk deadlines (seconds)
+REQUEST_TIMEOUT = 20
+CONNECT_TIMEOUT = 10
+TOTAL_TIMEOUT = 180
+
+# Retry policy: exponential backoff with full jitter
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+# The cursor sits in a small top-level object, so it can be read from the raw
+# body before the (much larger) miniApps array is decoded.
+_CURSOR_RE = re.compile(rb'"next"\s*:\s*\{\s*"cursor"\s*:\s*"([^"\\]+)"')
+
+
+class FetchError(Exception):
+    """Raised when the top-mini-apps API cannot be paged through."""
+
+
+def extract_miniapps(data):
+    """Returns the miniapp list from either response shape, or None."""
+    if not isinstance(data, dict):
+        return None
+    result = data.get('result')
+    if isinstance(result, dict) and 'miniApps' in result:
+        return result['miniApps']
+    return data.get('miniApps')
+
+
+def next_cursor(data):
+    """Returns the cursor of the following page, or None on the last page."""
+    return (data.get('next') or {}).get('cursor')
+
+
+def _peek_cursor(body):
+    match = _CURSOR_RE.search(body)
+    return match.group(1).decode() if match else None
+
+
+def _backoff_delay(attempt, retry_after=None):
+    if retry_after:
+        try:
+            return min(BACKOFF_CAP, float(retry_after))
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+def open_session():
+    """Creates one pooled, keep-alive session for the whole cursor walk."""
+    connector = aiohttp.TCPConnector(limit=4, keepalive_timeout=60, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout, headers=get_api_headers())
+
+
+async def fetch_page(session, cursor=None, limit=DEFAULT_LIMIT):
+    """Fetches the raw body of one page, retrying transient failures."""
+    params = {"limit": limit}
+    if cursor:
+        params["cursor"] = cursor
+    for attempt in range(MAX_RETRIES + 1):
+        retry_after = None
+        try:
+            async with session.get(FARCASTER_API_URL, params=params) as response:
+                body = await response.read()
+                if response.status == 200:
+                    return body
+                error = f"API Error: {response.status} - {body[:500].decode(errors='replace')}"
+                if response.status not in RETRY_STATUSES:
+                    raise FetchError(error)
+                retry_after = response.headers.get("Retry-After")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error = f"{type(e).__name__}: {e}"
+        if attempt == MAX_RETRIES:
+            raise FetchError(f"Giving up after {MAX_RETRIES + 1} attempts ({error})")
+        delay = _backoff_delay(attempt, retry_after)
+        print(f"   Retrying page in {delay:.1f}s ({error})")
+        await asyncio.sleep(delay)
+
+
+def decode_body(body):
+    """Decodes one raw page into (miniapps, next_cursor)."""
+    try:
+        data = loads(body)
+    except ValueError as e:
+        raise FetchError(f"Invalid JSON in API response: {e}")
+    miniapps = extract_miniapps(data)
+    if miniapps is None:
+        keys = list(data.keys()) if isinstance(data, dict) else type(data).__name__
+        raise FetchError(f"Unexpected API response structure: {keys}")
+    return miniapps, next_cursor(data)
+
+
+async def iter_bodies(session, limit=DEFAULT_LIMIT):
+    """Yields (body, cursor) for every page without decoding the page itself.
+
+    `cursor` is the one used to request the following page; decoders should
+    check it against the decoded value. Only when it cannot be peeked from
+    the raw body is the page decoded here.
+    """
+    cursor = None
+    while True:
+        body = await fetch_page(session, cursor, limit)
+        cursor = _peek_cursor(body)
+        if cursor is None:
+            _, cursor = await asyncio.to_thread(decode_body, body)
+        yield body, cursor
+        if not cursor:
+            return
+
+
+async def iter_pages(session, limit=DEFAULT_LIMIT):
+    """Yields the miniapp list of every page, in ranking order.
+
+    While page N is decoded in a worker thread, the request for page N+1 is
+    already in flight.
+    """
+    body = await fetch_page(session, limit=limit)
+    prefetch = None
+    try:
+        while True:
+            cursor = _peek_cursor(body)
+            decode = asyncio.create_task(asyncio.to_thread(decode_body, body))
+            prefetch = asyncio.create_task(fetch_page(session, cursor, limit)) if cursor else None
+            miniapps, cursor_after = await decode
+            # The decoded cursor is authoritative; refetch if the peek disagreed
+            if cursor_after != cursor:
+                if prefetch:
+                    prefetch.cancel()
+                prefetch = asyncio.create_task(fetch_page(session, cursor_after, limit)) if cursor_after else None
+            yield miniapps
+            if prefetch is None:
+                return
+            body = await prefetch
+            prefetch = None
+    finally:
+        if prefetch:
+            prefetch.cancel()
+
+
+async def fetch_all_miniapps(limit=DEFAULT_LIMIT, total_timeout=TOTAL_TIMEOUT):
+    """Downloads every page within the total deadline."""
+    all_miniapps = []
+    async with asyncio.timeout(total_timeout):
+        async with open_session() as session:
+            async for miniapps in iter_pages(session, limit):
+                all_miniapps.extend(miniapps)
+                print(f"   Downloaded: {len(miniapps)} miniapps")
+    return all_miniapps
+
+
+def download_miniapps(limit=DEFAULT_LIMIT):
+    """Downloads the full ranking; returns None on failure."""
+    print("Downloading miniapp rankings...")
+    try:
+        all_miniapps = asyncio.run(fetch_all_miniapps(limit))
+    except FetchError as e:
+        print(f"❌ {e}")
+        return None
+    except TimeoutError:
+        print(f"❌ Download did not finish within {TOTAL_TIMEOUT}s")
+        return None
+    print(f"Total downloaded: {len(all_miniapps)} miniapps")
+    return all_miniapps
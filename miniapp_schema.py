@@ -0,0 +1,187 @@
+import json
+import time
+import tracemalloc
+from dataclasses import dataclass
+from miniapp_fetcher import FetchError, extract_miniapps, next_cursor
+from json_codec import loads
+
+
+class MalformedPageError(FetchError):
+    """Raised when a page does not match the top-mini-apps schema."""
+
+
+def _field(obj, key, kind, where, required=False):
+    value = obj.get(key)
+    if value is None:
+        if required:
+            raise MalformedPageError(f"{where}: missing {key!r}")
+        return None
+    # bool is an int subclass; a rank of True is still malformed
+    if not isinstance(value, kind) or (kind is int and isinstance(value, bool)):
+        raise MalformedPageError(f"{where}: {key!r} should be {kind.__name__}, got {type(value).__name__}")
+    return value
+
+
+@dataclass(slots=True, frozen=True)
+class Author:
+    fid: int | None
+    username: str | None
+    display_name: str | None
+    follower_count: int | None
+    following_count: int | None
+
+    @classmethod
+    def from_api(cls, data, where):
+        if not isinstance(data, dict):
+            raise MalformedPageError(f"{where}: author should be an object")
+        return cls(
+            _field(data, 'fid', int, where),
+            _field(data, 'username', str, where),
+            _field(data, 'displayName', str, where),
+            _field(data, 'followerCount', int, where),
+            _field(data, 'followingCount', int, where),
+        )
+
+
+_NO_AUTHOR = Author(None, None, None, None, None)
+
+
+@dataclass(slots=True, frozen=True)
+class MiniApp:
+    id: str
+    short_id: str | None
+    name: str
+    domain: str
+    home_url: str | None
+    icon_url: str | None
+    image_url: str | None
+    splash_image_url: str | None
+    splash_background_color: str | None
+    button_title: str | None
+    supports_notifications: bool
+    primary_category: str | None
+    author: Author
+
+    @classmethod
+    def from_api(cls, data, where):
+        if not isinstance(data, dict):
+            raise MalformedPageError(f"{where}: miniApp should be an object")
+        author = data.get('author')
+        return cls(
+            _field(data, 'id', str, where, required=True),
+            _field(data, 'shortId', str, where),
+            _field(data, 'name', str, where, required=True),
+            _field(data, 'domain', str, where, required=True),
+            _field(data, 'homeUrl', str, where),
+            _field(data, 'iconUrl', str, where),
+            _field(data, 'imageUrl', str, where),
+            _field(data, 'splashImageUrl', str, where),
+            _field(data, 'splashBackgroundColor', str, where),
+            _field(data, 'buttonTitle', str, where),
+            bool(_field(data, 'supportsNotifications', bool, where)),
+            _field(data, 'primaryCategory', str, where),
+            _NO_AUTHOR if author is None else Author.from_api(author, where),
+        )
+
+    def metadata_row(self):
+        """Values in bulk_loader.METADATA_COLUMNS order."""
+        a = self.author
+        return (
+            self.id, self.short_id, self.name, self.domain, self.home_url,
+            self.icon_url, self.image_url, self.splash_image_url,
+            self.splash_background_color, self.button_title,
+            self.supports_notifications, self.primary_category,
+            a.fid, a.username, a.display_name, a.follower_count, a.following_count,
+        )
+
+
+@dataclass(slots=True, frozen=True)
+class RankEntry:
+    rank: int
+    rank_72h_change: int | None
+    miniapp: MiniApp
+
+    @classmethod
+    def from_api(cls, data, position):
+        where = f"entry {position}"
+        if not isinstance(data, dict):
+            raise MalformedPageError(f"{where}: should be an object")
+        rank = _field(data, 'rank', int, where, required=True)
+        if rank < 1:
+            raise MalformedPageError(f"{where}: rank {rank} is not positive")
+        return cls(rank, _field(data, 'rank72hChange', int, where), MiniApp.from_api(data.get('miniApp'), where))
+
+
+def decode_entries(miniapps):
+    """Validates a list of API ranking entries into RankEntry records."""
+    if not isinstance(miniapps, list):
+        raise MalformedPageError(f"miniApps should be a list, got {type(miniapps).__name__}")
+    return [RankEntry.from_api(item, i) for i, item in enumerate(miniapps)]
+
+
+def snapshot_entries(payload):
+    """Returns the ranked entries of any stored snapshot shape.
+
+    Handles the plain list written by daily_update, the
+    {snapshotDate, miniapps} wrapper of update_ranking_simple and raw API pages.
+    """
+    if isinstance(payload, list):
+        return payload
+    if isinstance(payload, dict):
+        if isinstance(payload.get('miniapps'), list):
+            return payload['miniapps']
+        entries = extract_miniapps(payload)
+        if entries is not None:
+            return entries
+    raise ValueError("Unrecognized snapshot format")
+
+
+def decode_page(body):
+    """Decodes one raw API page into ([RankEntry], next_cursor).
+
+    Either response shape is accepted; anything else, and any entry with a
+    missing or mistyped persisted field, raises MalformedPageError before a
+    single row is written.
+    """
+    try:
+        data = loads(body)
+    except ValueError as e:
+        raise MalformedPageError(f"Invalid JSON in API response: {e}")
+    miniapps = extract_miniapps(data)
+    if miniapps is None:
+        keys = list(data.keys()) if isinstance(data, dict) else type(data).__name__
+        raise MalformedPageError(f"Unexpected API response structure: {keys}")
+    cursor = next_cursor(data)
+    if cursor is not None and not isinstance(cursor, str):
+        raise MalformedPageError(f"next.cursor should be str, got {type(cursor).__name__}")
+    return decode_entries(miniapps), cursor
+
+
+def benchmark(sample_path="top_miniapps_2025-07-25.json", pages=40):
+    """Compares decode time and retained memory of typed records with plain dicts."""
+    with open(sample_path, encoding="utf-8") as f:
+        sample = json.load(f)
+    entries = sample['miniapps'] if isinstance(sample, dict) else sample
+    body = json.dumps({"result": {"miniApps": entries}, "next": {"cursor": "x"}}).encode()
+
+    def dicts(raw):
+        data = json.loads(raw)
+        return extract_miniapps(data)
+
+    print(f"Decoding {pages} pages of {len(entries)} entries ({len(body)} bytes each)")
+    for label, decode in (("dicts", dicts), ("records", lambda raw: decode_page(raw)[0])):
+        started = time.perf_counter()
+        for _ in range(pages):
+            decode(body)
+        elapsed = (time.perf_counter() - started) / pages
+
+        tracemalloc.start()
+        retained = [decode(body) for _ in range(pages)]
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del retained
+        print(f"   {label:<8} {elapsed * 1000:7.2f} ms/page   {size / pages / 1024:8.1f} KiB retained/page")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,147 @@
+import asyncio
+import os
+from datetime import date
+from dashboard_snapshot import DASHBOARD_SQL, to_sections
+from json_codec import loads
+from report_queries import RISING_STARS
+
+# psycopg 3 and psycopg-pool are optional like in db.py; without them every
+# section keeps its default.
+try:
+    from psycopg_pool import AsyncConnectionPool
+except ImportError:
+    AsyncConnectionPool = None
+
+# Seconds a single statistics query may take before its section falls back to its default
+QUERY_TIMEOUT = float(os.getenv("NOTIFICATION_QUERY_TIMEOUT", "5"))
+# Connections the sections share; the dashboard query reuses the first one
+POOL_MAX = int(os.getenv("NOTIFICATION_POOL_MAX", "3"))
+
+
+async def _configure(conn):
+    """The server also stops a pooled connection's statements at QUERY_TIMEOUT."""
+    await conn.execute(f"SET statement_timeout = {int(QUERY_TIMEOUT * 1000)}")
+
+
+async def _open_pool(db_url):
+    pool = AsyncConnectionPool(
+        db_url, min_size=1, max_size=POOL_MAX, open=False, timeout=QUERY_TIMEOUT,
+        kwargs={"autocommit": True}, configure=_configure,
+    )
+    try:
+        await pool.open(wait=True, timeout=QUERY_TIMEOUT)
+    except BaseException:
+        await pool.close()
+        raise
+    return pool
+
+
+async def _fetch(conn, sql, *args):
+    async with conn.cursor() as cursor:
+        await asyncio.wait_for(cursor.execute(sql, args or None), QUERY_TIMEOUT)
+        return await cursor.fetchall()
+
+
+def _code_section(codes_table, usages_table):
+    async def section(conn, today):
+        rows = await _fetch(conn, f"SELECT code FROM {codes_table} WHERE is_active = TRUE LIMIT 1")
+        code = rows[0][0] if rows else "N/A"
+        usages = await _fetch(conn, f"SELECT fid, used_at FROM {usages_table} WHERE code = %s ORDER BY used_at DESC", code)
+        return code, usages
+    return section
+
+
+async def _subscribers(conn, today):
+    return await _fetch(conn, "SELECT app_id, COUNT(*) FROM notification_tokens GROUP BY app_id")
+
+
+async def _active_draw(conn, today):
+    """(draw_number, jackpot, tickets sold) of the active lottery round, or ()."""
+    rows = await _fetch(conn, "SELECT id, draw_number, jackpot FROM lottery_draws WHERE status = 'active' ORDER BY draw_number DESC LIMIT 1")
+    if not rows:
+        return ()
+    draw_id, draw_number, jackpot = rows[0]
+    tickets = await _fetch(conn, "SELECT COUNT(*) FROM lottery_tickets WHERE draw_id = %s", draw_id)
+    return draw_number, jackpot, tickets[0][0]
+
+
+async def _rising_stars(conn, today):
+    return await _fetch(conn, RISING_STARS, today)
+
+
+async def _latest_winner(conn, today):
+    rows = await _fetch(conn, """
+        SELECT ld.id, ld.draw_number, ld.jackpot, lt.player_fid, lt.player_name
+        FROM lottery_draws ld
+        JOIN lottery_tickets lt ON ld.id = lt.draw_id AND ld.winning_number = lt.number
+        WHERE ld.status = 'completed'
+        ORDER BY ld.draw_number DESC
+        LIMIT 1
+    """)
+    return rows[0] if rows else ()
+
+
+# Independent sections of the success e-mail; they run concurrently on the shared pool
+SECTIONS = {
+    "apprank": _code_section("daily_codes", "daily_code_usages"),
+    "lotto": _code_section("lotto_daily_codes", "lotto_daily_code_usages"),
+    "subscribers": _subscribers,
+    "active_draw": _active_draw,
+    "rising_stars": _rising_stars,
+    "latest_winner": _latest_winner,
+}
+
+
+async def _dashboard(conn, today):
+    """All sections at once from dashboard_snapshot() (migration 026)."""
+    doc = (await _fetch(conn, DASHBOARD_SQL, today))[0][0]
+    # jsonb comes back decoded; a text result does not
+    return to_sections(loads(doc) if isinstance(doc, (str, bytes)) else doc)
+
+
+async def _run_section(name, section, pool, today):
+    try:
+        async with pool.connection() as conn:
+            return await section(conn, today)
+    except Exception as e:
+        reason = "timed out" if isinstance(e, asyncio.TimeoutError) else e
+        print(f"⚠️  Statistics section '{name}' unavailable, using its default: {reason}")
+        return None
+
+
+async def gather_statistics(db_url, today=None):
+    """Fetches every statistics section, in one round trip when possible.
+
+    The dashboard_snapshot() document is tried first; if it is missing or
+    fails, the sections run concurrently on a pool of at most POOL_MAX
+    connections. Returns {section: result}; a section that failed or
+    exceeded QUERY_TIMEOUT is None, so the caller keeps that section's
+    default.
+    """
+    today = today or date.today()
+    if AsyncConnectionPool is None:
+        print("❌ psycopg 3 and psycopg-pool are needed for statistics (pip install -r requirements.txt)")
+        return dict.fromkeys(SECTIONS)
+    try:
+        pool = await _open_pool(db_url)
+    except Exception as e:
+        print(f"❌ Error connecting for statistics: {e}")
+        return dict.fromkeys(SECTIONS)
+    try:
+        try:
+            async with pool.connection() as conn:
+                return await _dashboard(conn, today)
+        except Exception as e:
+            reason = "timed out" if isinstance(e, asyncio.TimeoutError) else e
+            print(f"⚠️  Dashboard snapshot unavailable, querying sections separately: {reason}")
+        results = await asyncio.gather(*(
+            _run_section(name, section, pool, today) for name, section in SECTIONS.items()
+        ))
+        return dict(zip(SECTIONS, results))
+    finally:
+        await pool.close()
+
+
+def fetch_statistics(db_url, today=None):
+    """Synchronous entry point for gather_statistics()."""
+    return asyncio.run(gather_statistics(db_url, today))
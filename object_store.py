@@ -0,0 +1,134 @@
+import os
+import sys
+from urllib.parse import urlparse
+
+# boto3 is only needed for an s3:// store
+try:
+    import boto3
+except ImportError:
+    boto3 = None
+
+# Where large blobs (snapshot archives) live; the database keeps only their keys.
+#   a directory or file:///path   local filesystem (default: ./object_store)
+#   s3://bucket/prefix            S3 or an S3-compatible service (needs boto3)
+OBJECT_STORE_URL = os.getenv("OBJECT_STORE_URL", "object_store")
+# Remote objects are downloaded here on first read and reused afterwards
+OBJECT_CACHE_DIR = os.getenv("OBJECT_CACHE_DIR", "object_cache")
+# A local directory is not durable by default (CI runners discard it after the
+# job); set this when it is a persistent volume. Only a durable store may hold
+# the sole copy of a snapshot: with any other store ranking_snapshots.raw_json
+# is still written, and the archive does not reduce database storage.
+OBJECT_STORE_DURABLE = os.getenv("OBJECT_STORE_DURABLE", "").lower() in ("1", "true", "yes")
+
+
+class ObjectStoreError(Exception):
+    """Raised for missing objects and unusable store URLs."""
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class LocalObjectStore:
+    """Objects as files under a root directory; keys are relative paths."""
+
+    def __init__(self, root, durable=None):
+        self.root = root
+        self.durable = OBJECT_STORE_DURABLE if durable is None else durable
+
+    def _path(self, key):
+        return os.path.join(self.root, *key.split("/"))
+
+    def put(self, key, data):
+        _write_atomic(self._path(key), data)
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    def discard(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def local_path(self, key):
+        """Path of the object on disk; nothing is copied."""
+        path = self._path(key)
+        if not os.path.exists(path):
+            raise ObjectStoreError(f"Missing object {key} in {self.root}")
+        return path
+
+    def get(self, key):
+        with open(self.local_path(key), "rb") as f:
+            return f.read()
+
+
+class S3ObjectStore:
+    """Objects in an S3 bucket under a key prefix, cached locally on read."""
+
+    def __init__(self, bucket, prefix="", cache_dir=None):
+        if boto3 is None:
+            raise ObjectStoreError("s3:// object store needs boto3 (pip install boto3)")
+        # Credentials, region and AWS_ENDPOINT_URL come from the usual AWS environment
+        self.client = boto3.client("s3")
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.cache = LocalObjectStore(os.path.join(cache_dir or OBJECT_CACHE_DIR, bucket, self.prefix), durable=False)
+        self.durable = True
+
+    def _key(self, key):
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def put(self, key, data):
+        self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data)
+        # The next read downloads the new object instead of a stale cached copy
+        self.cache.discard(key)
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except self.client.exceptions.ClientError:
+            return False
+        return True
+
+    def local_path(self, key):
+        """Path of a cached copy, downloaded on first use."""
+        if not self.cache.exists(key):
+            try:
+                body = self.client.get_object(Bucket=self.bucket, Key=self._key(key))["Body"].read()
+            except self.client.exceptions.NoSuchKey:
+                raise ObjectStoreError(f"Missing object {key} in s3://{self.bucket}/{self.prefix}")
+            self.cache.put(key, body)
+        return self.cache.local_path(key)
+
+    def get(self, key):
+        with open(self.local_path(key), "rb") as f:
+            return f.read()
+
+
+def open_store(url=None):
+    """Returns the object store for a URL (default OBJECT_STORE_URL)."""
+    url = url or OBJECT_STORE_URL
+    parsed = urlparse(url)
+    if parsed.scheme == "s3":
+        return S3ObjectStore(parsed.netloc, parsed.path)
+    if parsed.scheme == "file":
+        return LocalObjectStore(parsed.path)
+    if parsed.scheme:
+        raise ObjectStoreError(f"Unsupported object store URL: {url}")
+    return LocalObjectStore(url)
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python object_store.py KEY   (writes the object to stdout)")
+        sys.exit(2)
+    sys.stdout.buffer.write(open_store().get(sys.argv[1]))
+
+
+if __name__ == "__main__":
+    main()
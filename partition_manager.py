@@ -0,0 +1,266 @@
+import os
+import re
+import sys
+from datetime import date, timedelta
+from dotenv import load_dotenv
+from db import connect, release, DB_ERRORS
+from rank_derivation import LOOKBACK_DAYS, ASOF_TOLERANCE_DAYS
+
+load_dotenv()
+
+# Daily history tables, range-partitioned by month (migration 024)
+PARTITIONED_TABLES = (
+    ("miniapp_rankings", "ranking_date"),
+    ("miniapp_statistics", "stat_date"),
+    ("miniapp_rankings_24h", "ranking_date"),
+    ("miniapp_rankings_weekly", "ranking_date"),
+    ("miniapp_rankings_30d", "ranking_date"),
+)
+
+# Monthly partitions kept ready beyond the current month
+MONTHS_AHEAD = 2
+
+# Days of daily rows kept when retention runs; older days are rolled up into
+# weekly aggregates and the daily rows deleted. Never less than the
+# rank-change lookback plus a week, so the daily derivation always finds its
+# reference days.
+MIN_RETENTION_DAYS = LOOKBACK_DAYS + ASOF_TOLERANCE_DAYS + 7
+RETENTION_DAYS = max(int(os.getenv("HISTORY_RETENTION_DAYS", "180")), MIN_RETENTION_DAYS)
+# Rollup deletes daily history for good, so the daily runs only apply it when
+# this is set; otherwise it runs only through `partition_manager.py --rollup`.
+HISTORY_ROLLUP = os.getenv("HISTORY_ROLLUP", "").lower() in ("1", "true", "yes")
+
+_BOUND_RE = re.compile(r"FROM \((.+?)\) TO \((.+?)\)")
+
+
+def _bound(value):
+    value = value.strip("'")
+    return None if value in ("MINVALUE", "MAXVALUE") else date.fromisoformat(value)
+
+
+def _month_start(day):
+    return day.replace(day=1)
+
+
+def _next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def to_regclass(cursor, table):
+    cursor.execute("SELECT to_regclass(%s)", (table,))
+    return cursor.fetchone()[0]
+
+
+def is_partitioned(cursor, table):
+    cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", (table,))
+    return cursor.fetchone() is not None
+
+
+def list_partitions(cursor, table):
+    """Returns [(name, lower, upper)] of a table's range partitions, in order.
+
+    An open bound (MINVALUE/MAXVALUE) is None; the default partition is left out.
+    """
+    cursor.execute("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+    """, (table,))
+    partitions = []
+    for name, bound in cursor.fetchall():
+        match = _BOUND_RE.search(bound)
+        if match:
+            partitions.append((name, _bound(match.group(1)), _bound(match.group(2))))
+    return sorted(partitions, key=lambda p: p[2] or date.max)
+
+
+def default_partition(cursor, table):
+    """Name of a table's DEFAULT partition (migration 024), or None."""
+    cursor.execute("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s) AND pg_get_expr(c.relpartbound, c.oid) = 'DEFAULT'
+    """, (table,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _create_partition(cursor, table, column, name, month, default):
+    """Creates one monthly partition, taking over the rows the default partition holds for it.
+
+    CREATE TABLE ... PARTITION OF fails while the default partition has rows
+    in the new range (a missed run), so those rows are moved into a new
+    table that is then attached in the same transaction.
+    """
+    bounds = (month, _next_month(month))
+    if default:
+        cursor.execute(f"SELECT 1 FROM {default} WHERE {column} >= %s AND {column} < %s LIMIT 1", bounds)
+    if not default or cursor.fetchone() is None:
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)", bounds)
+        return
+    cursor.execute(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    cursor.execute(f"""
+        WITH moved AS (DELETE FROM {default} WHERE {column} >= %s AND {column} < %s RETURNING *)
+        INSERT INTO {name} SELECT * FROM moved
+    """, bounds)
+    print(f"   {name}: {cursor.rowcount} rows moved from {default}")
+    cursor.execute(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)", bounds)
+
+
+def ensure_partitions(cursor, today=None, months_ahead=MONTHS_AHEAD):
+    """Creates the monthly partitions from this month to `months_ahead` ahead.
+
+    Months already covered (e.g. by the legacy partition) are skipped; rows
+    that landed in the default partition meanwhile move into their month.
+    Returns the names of the partitions created.
+    """
+    today = today or date.today()
+    last = _month_start(today)
+    for _ in range(months_ahead):
+        last = _next_month(last)
+    created = []
+    for table, column in PARTITIONED_TABLES:
+        if not is_partitioned(cursor, table):
+            continue
+        covered = max((upper for _, _, upper in list_partitions(cursor, table) if upper), default=date.min)
+        month = max(_month_start(today), covered)
+        default = default_partition(cursor, table)
+        while month <= last:
+            name = f"{table}_p{month:%Y%m}"
+            _create_partition(cursor, table, column, name, month, default)
+            created.append(name)
+            month = _next_month(month)
+    return created
+
+
+def rollup(cursor, today=None, retention_days=RETENTION_DAYS):
+    """Rolls daily rank history older than the retention window into weekly rows.
+
+    The cutoff is aligned to a Monday so whole weeks are rolled up at once.
+    Ranks come from miniapp_statistics, the same history running_aggregates
+    is defined over, so rebuilt aggregates do not change.
+    Afterwards the old daily rows are removed from every history table:
+    partitions entirely before the cutoff are detached and dropped, the rest
+    is deleted. Returns (cutoff, weekly rows written, partitions dropped,
+    rows deleted).
+    """
+    today = today or date.today()
+    cutoff = today - timedelta(days=max(retention_days, MIN_RETENTION_DAYS))
+    cutoff -= timedelta(days=cutoff.weekday())
+
+    cursor.execute("""
+        INSERT INTO miniapp_rank_history_weekly AS w (
+            miniapp_id, week_start, days_ranked, rank_sum, best_rank, worst_rank, last_rank, last_seen_date
+        )
+        SELECT
+            miniapp_id,
+            date_trunc('week', day)::date,
+            COUNT(*),
+            SUM(rank),
+            MIN(rank),
+            MAX(rank),
+            (ARRAY_AGG(rank ORDER BY day DESC))[1],
+            MAX(day)
+        FROM (
+            SELECT miniapp_id, stat_date AS day, current_rank AS rank
+            FROM miniapp_statistics WHERE stat_date < %(cutoff)s AND current_rank > 0
+        ) d
+        GROUP BY 1, 2
+        ON CONFLICT (miniapp_id, week_start) DO UPDATE SET
+            days_ranked = w.days_ranked + EXCLUDED.days_ranked,
+            rank_sum = w.rank_sum + EXCLUDED.rank_sum,
+            best_rank = LEAST(w.best_rank, EXCLUDED.best_rank),
+            worst_rank = GREATEST(w.worst_rank, EXCLUDED.worst_rank),
+            last_rank = CASE WHEN EXCLUDED.last_seen_date >= w.last_seen_date
+                             THEN EXCLUDED.last_rank ELSE w.last_rank END,
+            last_seen_date = GREATEST(w.last_seen_date, EXCLUDED.last_seen_date)
+    """, {"cutoff": cutoff})
+    weekly = cursor.rowcount
+
+    dropped = []
+    deleted = 0
+    for table, column in PARTITIONED_TABLES:
+        if to_regclass(cursor, table) is None:
+            continue
+        if is_partitioned(cursor, table):
+            for name, _, upper in list_partitions(cursor, table):
+                if upper is not None and upper <= cutoff:
+                    cursor.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+                    cursor.execute(f"DROP TABLE {name}")
+                    dropped.append(name)
+        # Only partitions straddling the cutoff (or an unpartitioned table) are scanned
+        cursor.execute(f"DELETE FROM {table} WHERE {column} < %s", (cutoff,))
+        deleted += cursor.rowcount
+    return cutoff, weekly, dropped, deleted
+
+
+def run_maintenance(conn, today=None, retention=None):
+    """Creates upcoming partitions and, if enabled, applies retention in its own transaction.
+
+    Retention (rollup()) runs only when `retention` is true, defaulting to
+    HISTORY_ROLLUP. Meant to run after the daily load has committed; a
+    failure is reported and rolled back without affecting the day's data.
+    Returns True on success.
+    """
+    retention = HISTORY_ROLLUP if retention is None else retention
+    cursor = conn.cursor()
+    try:
+        created = ensure_partitions(cursor, today)
+        if retention:
+            cutoff, weekly, dropped, deleted = rollup(cursor, today)
+        conn.commit()
+        print(f"History maintenance: {len(created)} partitions created", end="")
+        if retention:
+            print(f", rolled up before {cutoff} ({weekly} weekly rows, {len(dropped)} partitions dropped, "
+                  f"{deleted} daily rows deleted)", end="")
+        print()
+        return True
+    except DB_ERRORS as e:
+        conn.rollback()
+        print(f"⚠️  History maintenance skipped: {e}")
+        return False
+
+
+def print_status(cursor):
+    for table, _ in PARTITIONED_TABLES:
+        if to_regclass(cursor, table) is None:
+            continue
+        if not is_partitioned(cursor, table):
+            print(f"{table}: not partitioned (apply migration 024)")
+            continue
+        print(f"{table}:")
+        for name, lower, upper in list_partitions(cursor, table):
+            cursor.execute(f"SELECT COUNT(*) FROM {name}")
+            print(f"   {name:<40} {str(lower or '-inf'):>10} .. {str(upper or '+inf'):<10} {cursor.fetchone()[0]:>9} rows")
+    cursor.execute("SELECT COUNT(*), MIN(week_start), MAX(week_start) FROM miniapp_rank_history_weekly")
+    rows, first, last = cursor.fetchone()
+    print(f"miniapp_rank_history_weekly: {rows} rows" + (f" ({first} .. {last})" if rows else ""))
+
+
+def main():
+    mode = sys.argv[1] if len(sys.argv) > 1 else "--status"
+    conn = None
+    try:
+        conn = connect(statement_timeout_ms=0)
+        cursor = conn.cursor()
+        if mode == "--status":
+            print_status(cursor)
+        elif mode == "--ensure":
+            created = ensure_partitions(cursor)
+            conn.commit()
+            print(f"✅ Partitions created: {', '.join(created) or 'none needed'}")
+        elif mode == "--rollup":
+            # Explicit request: roll up and delete daily rows older than RETENTION_DAYS
+            if not run_maintenance(conn, retention=True):
+                sys.exit(1)
+        else:
+            print("Usage: python partition_manager.py [--status | --ensure | --rollup]")
+            sys.exit(2)
+    finally:
+        release(conn)
+
+
+if __name__ == "__main__":
+    main()
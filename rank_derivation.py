@@ -0,0 +1,130 @@
+import os
+import sys
+from datetime import date, timedelta
+from dotenv import load_dotenv
+from db import connect, release
+
+load_dotenv()
+
+# (table, change column, days back) for the derived rank-change tables.
+# Changes are current - previous, as these tables have always stored them.
+CHANGE_TABLES = (
+    ("miniapp_rankings_24h", "rank_24h_change", 1),
+    ("miniapp_rankings_weekly", "rank_7d_change", 7),
+    ("miniapp_rankings_30d", "rank_30d_change", 30),
+)
+
+LOOKBACK_DAYS = max(days for _, _, days in CHANGE_TABLES)
+
+# How many extra days back a window may reach when its exact day has no
+# snapshot (a skipped cron run); 0 restores exact-date matching.
+ASOF_TOLERANCE_DAYS = int(os.getenv("RANK_ASOF_TOLERANCE_DAYS", "1"))
+
+
+def _deltas_sql():
+    # Snapshot days are resolved first: for every day and window, the latest
+    # snapshot day in [day - N - tolerance, day - N]. That table is tiny, so
+    # each app's previous rank is then a hash/index lookup on (id, date).
+    refs = ",\n".join(
+        f"""                (SELECT MAX(p.day) FROM days p
+                 WHERE p.day BETWEEN d.day - {days} - %(tolerance)s AND d.day - {days}) AS ref_{days}"""
+        for _, _, days in CHANGE_TABLES
+    )
+    lookups = ",\n".join(
+        f"            p{days}.rank AS prev_{days},\n"
+        f"            CASE WHEN p{days}.rank IS NOT NULL THEN r.ranking_date - ref.ref_{days} END AS days_{days}"
+        for _, _, days in CHANGE_TABLES
+    )
+    joins = "\n".join(
+        f"        LEFT JOIN scan p{days} ON p{days}.miniapp_id = r.miniapp_id AND p{days}.ranking_date = ref.ref_{days}"
+        for _, _, days in CHANGE_TABLES
+    )
+    return f"""
+        WITH scan AS MATERIALIZED (
+            SELECT miniapp_id, ranking_date, rank FROM miniapp_rankings
+            WHERE ranking_date BETWEEN %(scan_start)s AND %(end)s
+        ),
+        days AS (SELECT DISTINCT ranking_date AS day FROM scan),
+        ref AS MATERIALIZED (
+            SELECT
+                d.day,
+{refs}
+            FROM days d
+            WHERE d.day BETWEEN %(start)s AND %(end)s
+        )
+        SELECT
+            r.miniapp_id, r.ranking_date, r.rank,
+{lookups}
+        FROM scan r
+        JOIN ref ON ref.day = r.ranking_date
+{joins}
+    """
+
+
+def derive_changes(cursor, start, end, tolerance=ASOF_TOLERANCE_DAYS):
+    """Fills every rank-change table for [start, end] from one scan of miniapp_rankings.
+
+    The scan covers [start - LOOKBACK_DAYS - tolerance, end] once; each
+    window compares against the nearest earlier snapshot within `tolerance`
+    days of its exact offset and records the effective length in
+    window_days. Pass the same day twice for the daily run, or the whole
+    history to rebuild it.
+    Returns {table: rows written}.
+    """
+    cursor.execute("DROP TABLE IF EXISTS rank_deltas")
+    cursor.execute(f"CREATE TEMP TABLE rank_deltas ON COMMIT DROP AS {_deltas_sql()}", {
+        "scan_start": start - timedelta(days=LOOKBACK_DAYS + tolerance),
+        "start": start, "end": end, "tolerance": tolerance,
+    })
+    written = {}
+    for table, column, days in CHANGE_TABLES:
+        cursor.execute(f"""
+            INSERT INTO {table} (miniapp_id, ranking_date, rank, {column}, window_days)
+            SELECT miniapp_id, ranking_date, rank, rank - prev_{days}, days_{days}
+            FROM rank_deltas
+            ON CONFLICT (miniapp_id, ranking_date) DO UPDATE SET
+                rank = EXCLUDED.rank,
+                {column} = EXCLUDED.{column},
+                window_days = EXCLUDED.window_days
+            WHERE ({table}.rank, {table}.{column}, {table}.window_days)
+                IS DISTINCT FROM (EXCLUDED.rank, EXCLUDED.{column}, EXCLUDED.window_days)
+        """)
+        written[table] = cursor.rowcount
+    return written
+
+
+def history_range(cursor):
+    """Returns (first, last) ranking_date in miniapp_rankings, or (None, None)."""
+    cursor.execute("SELECT MIN(ranking_date), MAX(ranking_date) FROM miniapp_rankings")
+    return cursor.fetchone()
+
+
+def main():
+    conn = None
+    try:
+        # Rebuilding the whole history may legitimately run for minutes
+        conn = connect(statement_timeout_ms=0)
+        cursor = conn.cursor()
+        if sys.argv[1:] == ["--all"]:
+            start, end = history_range(cursor)
+            if start is None:
+                print("❌ miniapp_rankings is empty")
+                sys.exit(1)
+        elif 1 <= len(sys.argv[1:]) <= 2:
+            start = date.fromisoformat(sys.argv[1])
+            end = date.fromisoformat(sys.argv[2]) if len(sys.argv) > 2 else date.today()
+        else:
+            print("Usage: python rank_derivation.py START [END] | --all")
+            sys.exit(2)
+        print(f"Deriving rank changes for {start} .. {end}...")
+        written = derive_changes(cursor, start, end)
+        conn.commit()
+        for table, rows in written.items():
+            print(f"   - {table}: {rows} rows written")
+        print("✅ Rank-change tables rebuilt")
+    finally:
+        release(conn)
+
+
+if __name__ == "__main__":
+    main()
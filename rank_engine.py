@@ -0,0 +1,183 @@
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+import numpy as np
+
+# Ranks are 1-based, so 0 marks "not ranked on that day"
+NOT_RANKED = 0
+
+# Day offsets of the change columns in miniapp_statistics (24h, 72h, 7d, 30d)
+DEFAULT_WINDOWS = (1, 3, 7, 30)
+
+# Rows processed per block in summarize(); keeps temporaries cache-sized
+BLOCK_ROWS = 8192
+
+RankSummary = namedtuple("RankSummary", ["app_ids", "current_rank", "changes", "avg_rank", "best_rank"])
+
+
+class RankMatrix:
+    """Ranks held as an apps x dates integer matrix over a contiguous daily axis.
+
+    Rank changes follow the statistics table convention: previous rank minus
+    current rank, so a positive value means the app climbed.
+    """
+
+    def __init__(self, app_ids, start_date, ranks, snapshots=None):
+        self.app_ids = list(app_ids)
+        self.index = {app_id: i for i, app_id in enumerate(self.app_ids)}
+        self.start_date = start_date
+        self.ranks = ranks
+        # Known snapshot_columns() mask: read-only matrices (rank_store.py) and
+        # partial matrices whose apps do not show every run day (from_rows)
+        self.snapshots = snapshots
+
+    @classmethod
+    def empty(cls, app_ids, start_date, end_date, dtype=np.int32):
+        days = (end_date - start_date).days + 1
+        return cls(app_ids, start_date, np.full((len(app_ids), days), NOT_RANKED, dtype=dtype))
+
+    @classmethod
+    def from_rows(cls, rows, app_ids=None, start_date=None, end_date=None, dtype=np.int32, snapshot_days=None):
+        """Builds the matrix from (miniapp_id, date, rank) rows.
+
+        Rows outside the given apps or date range are ignored. `snapshot_days`
+        are the days with a run across all apps; when the matrix holds only
+        some apps, pass them so as-of lookups pick the same days as the SQL
+        derivation (see snapshot_columns).
+        """
+        rows = list(rows)
+        if app_ids is None:
+            app_ids = sorted({r[0] for r in rows})
+        if start_date is None:
+            start_date = min((r[1] for r in rows), default=date.today())
+        if end_date is None:
+            end_date = max((r[1] for r in rows), default=start_date)
+        matrix = cls.empty(app_ids, start_date, end_date, dtype)
+        days = matrix.ranks.shape[1]
+        for app_id, day, rank in rows:
+            i = matrix.index.get(app_id)
+            j = (day - start_date).days
+            if i is not None and 0 <= j < days and rank is not None:
+                matrix.ranks[i, j] = rank
+        if snapshot_days is not None:
+            matrix.snapshots = np.zeros(days, dtype=bool)
+            for day in snapshot_days:
+                j = (day - start_date).days
+                if 0 <= j < days:
+                    matrix.snapshots[j] = True
+        return matrix
+
+    @property
+    def end_date(self):
+        return self.start_date + timedelta(days=self.ranks.shape[1] - 1)
+
+    def column(self, day):
+        """Returns the column index of `day`; raises KeyError if off the axis."""
+        j = (day - self.start_date).days
+        if not 0 <= j < self.ranks.shape[1]:
+            raise KeyError(f"{day} is outside {self.start_date}..{self.end_date}")
+        return j
+
+    def rows_for(self, app_ids):
+        """Returns row indices for `app_ids`, -1 for apps not in the matrix."""
+        return np.fromiter((self.index.get(a, -1) for a in app_ids), dtype=np.int64, count=len(app_ids))
+
+    def set_column(self, day, app_ids, ranks):
+        """Stores one day's ranks for the given apps (all must be in the matrix)."""
+        self.ranks[self.rows_for(app_ids), self.column(day)] = ranks
+
+    def snapshot_columns(self):
+        """Boolean mask of the run days: the known mask if one was given,
+        otherwise the days on which any app in the matrix was ranked."""
+        if self.snapshots is not None:
+            return self.snapshots
+        return (self.ranks != NOT_RANKED).any(axis=0)
+
+    def as_of_columns(self, end_date, windows=DEFAULT_WINDOWS, tolerance=0):
+        """Returns the column each window compares against, -1 where there is none.
+
+        For a window of w days that is the latest snapshot day in
+        [end - w - tolerance, end - w], so a skipped run falls back to the
+        day before instead of leaving the window empty.
+        """
+        end = self.column(end_date)
+        # Index of the latest snapshot column at or before each column
+        snapshots = self.snapshot_columns()
+        latest = np.maximum.accumulate(np.where(snapshots, np.arange(len(snapshots)), -1))
+        targets = end - np.asarray(windows, dtype=np.int64)
+        found = np.where(targets >= 0, latest[np.clip(targets, 0, None)], -1)
+        return np.where((found >= 0) & (found >= targets - tolerance), found, -1)
+
+    def window_lengths(self, end_date, windows=DEFAULT_WINDOWS, tolerance=0):
+        """Returns {window: effective length in days, or None} for as-of lookups."""
+        end = self.column(end_date)
+        columns = self.as_of_columns(end_date, windows, tolerance)
+        return {w: int(end - c) if c >= 0 else None for w, c in zip(windows, columns)}
+
+    def rank_changes(self, end_date, windows=DEFAULT_WINDOWS, rows=None, tolerance=0):
+        """Returns {window: masked array} of rank changes ending at `end_date`.
+
+        Each window compares against its as-of column (see as_of_columns);
+        all windows are gathered with one fancy index. Entries are masked
+        where either end of the window is unranked or no snapshot is close
+        enough.
+        """
+        end = self.column(end_date)
+        ranks = self.ranks if rows is None else self.ranks[rows]
+        offsets = self.as_of_columns(end_date, windows, tolerance)
+        in_range = offsets >= 0
+        past = ranks[:, np.where(in_range, offsets, 0)]
+        current = ranks[:, end]
+        valid = (past != NOT_RANKED) & (current != NOT_RANKED)[:, None] & in_range
+        deltas = past.astype(np.int64) - current[:, None]
+        return {w: np.ma.array(deltas[:, k], mask=~valid[:, k]) for k, w in enumerate(windows)}
+
+    def summarize(self, end_date=None, windows=DEFAULT_WINDOWS):
+        """Computes window changes, average rank and best rank for every app.
+
+        Averages and best ranks cover all ranked days up to `end_date`.
+        """
+        end_date = end_date or self.end_date
+        end = self.column(end_date)
+        n = self.ranks.shape[0]
+        avg = np.empty(n, dtype=np.float64)
+        best = np.empty(n, dtype=np.int64)
+        sentinel = np.iinfo(self.ranks.dtype).max
+        for lo in range(0, n, BLOCK_ROWS):
+            block = self.ranks[lo:lo + BLOCK_ROWS, :end + 1]
+            ranked = block != NOT_RANKED
+            counts = ranked.sum(axis=1)
+            sums = block.sum(axis=1, dtype=np.int64)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                avg[lo:lo + BLOCK_ROWS] = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+            best[lo:lo + BLOCK_ROWS] = np.where(ranked, block, sentinel).min(axis=1)
+        never = best == sentinel
+        return RankSummary(
+            app_ids=self.app_ids,
+            current_rank=np.ma.array(self.ranks[:, end], mask=self.ranks[:, end] == NOT_RANKED),
+            changes=self.rank_changes(end_date, windows),
+            avg_rank=np.ma.array(avg, mask=never),
+            best_rank=np.ma.array(best, mask=never),
+        )
+
+
+def benchmark(apps=100_000, days=365, windows=DEFAULT_WINDOWS, seed=7):
+    """Times summarize() on a simulated history of `apps` x `days`."""
+    rng = np.random.default_rng(seed)
+    ranks = np.empty((apps, days), dtype=np.int32)
+    for j in range(days):
+        ranks[:, j] = rng.permutation(apps) + 1
+    ranks[rng.random((apps, days)) < 0.1] = NOT_RANKED
+    matrix = RankMatrix([f"app-{i}" for i in range(apps)], date(2025, 1, 1), ranks)
+
+    started = time.perf_counter()
+    summary = matrix.summarize(windows=windows)
+    elapsed = time.perf_counter() - started
+    ranked = int((~summary.changes[windows[0]].mask).sum())
+    print(f"Rank engine: {apps} apps x {days} days, windows {list(windows)}")
+    print(f"   summarize(): {elapsed * 1000:.1f} ms ({ranked} apps with a {windows[0]}d change)")
+    return elapsed
+
+
+if __name__ == "__main__":
+    benchmark()
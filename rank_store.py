@@ -0,0 +1,294 @@
+import os
+import sys
+from collections import namedtuple
+from datetime import date, timedelta
+import numpy as np
+from json_codec import dumps, loads, write_bytes
+from rank_engine import BLOCK_ROWS, NOT_RANKED, RankMatrix
+
+# Persistent apps x days rank matrix, appended to once a day:
+#   meta.json     format version, dtype, first day, number of days, app capacity,
+#                 and the columns that hold a run
+#   app_ids.json  row -> miniapp id; new apps are appended, rows never move
+#   apps.json     per row: latest name and primary_category (dictionary-coded)
+#   ranks.bin     capacity x days ranks in column-major order, so each day is one
+#                 contiguous block and appending a day only extends the file
+# Unranked cells hold rank_engine.NOT_RANKED (0). open_matrix() memory-maps the
+# file into a RankMatrix without copying it.
+RANK_STORE_DIR = os.getenv("RANK_STORE_DIR", "rank_store")
+VERSION = 1
+
+# uint16 holds ranks up to 65534 (the dtype maximum is summarize()'s sentinel);
+# the store is rewritten as uint32 the first time a larger rank arrives
+DTYPES = (np.uint16, np.uint32)
+
+# Rows reserved up front; the file is rewritten with double the capacity when full
+INITIAL_CAPACITY = 1024
+
+HistoryStats = namedtuple("HistoryStats", ["app_ids", "days_ranked", "best_rank", "volatility", "top_streak"])
+
+
+class RankStoreError(Exception):
+    """Raised for a missing or inconsistent rank store."""
+
+
+def _paths(store_dir):
+    store_dir = store_dir or RANK_STORE_DIR
+    return (os.path.join(store_dir, "meta.json"), os.path.join(store_dir, "app_ids.json"),
+            os.path.join(store_dir, "ranks.bin"))
+
+
+def _apps_path(store_dir):
+    return os.path.join(store_dir or RANK_STORE_DIR, "apps.json")
+
+
+def app_metadata(store_dir=None):
+    """Returns {"name": [...], "category": [code, ...], "categories": [...]}, aligned with the rows.
+
+    A category code indexes "categories"; -1 means unknown.
+    """
+    try:
+        with open(_apps_path(store_dir), "rb") as f:
+            return loads(f.read())
+    except FileNotFoundError:
+        return {"name": [], "category": [], "categories": []}
+
+
+def _update_metadata(apps, app_ids, index, metadata):
+    missing = len(app_ids) - len(apps["name"])
+    apps["name"] += [None] * missing
+    apps["category"] += [-1] * missing
+    codes = {category: code for code, category in enumerate(apps["categories"])}
+    for app_id, (name, category) in metadata.items():
+        row = index.get(app_id)
+        if row is None:
+            continue
+        if category is not None and category not in codes:
+            codes[category] = len(apps["categories"])
+            apps["categories"].append(category)
+        apps["name"][row] = name
+        apps["category"][row] = -1 if category is None else codes[category]
+
+
+def _load(store_dir):
+    meta_path, ids_path, ranks_path = _paths(store_dir)
+    if not os.path.exists(meta_path):
+        return None, []
+    with open(meta_path, "rb") as f:
+        meta = loads(f.read())
+    if meta.get("version") != VERSION:
+        raise RankStoreError(f"Unsupported rank store version in {meta_path}")
+    with open(ids_path, "rb") as f:
+        app_ids = loads(f.read())
+    return meta, app_ids
+
+
+def _map(ranks_path, meta, mode):
+    if meta["days"] == 0:
+        return np.zeros((meta["capacity"], 0), dtype=meta["dtype"], order="F")
+    return np.memmap(ranks_path, dtype=meta["dtype"], mode=mode, shape=(meta["capacity"], meta["days"]), order="F")
+
+
+def _rewrite(ranks_path, meta, capacity, dtype):
+    """Copies the matrix into a new file with more rows and/or a wider dtype."""
+    old = _map(ranks_path, meta, "r")
+    tmp_path = f"{ranks_path}.{os.getpid()}.tmp"
+    if meta["days"]:
+        new = np.memmap(tmp_path, dtype=dtype, mode="w+", shape=(capacity, meta["days"]), order="F")
+        new[:old.shape[0]] = old
+        new.flush()
+        del new
+    else:
+        open(tmp_path, "wb").close()
+    del old
+    os.replace(tmp_path, ranks_path)
+    meta.update(capacity=capacity, dtype=np.dtype(dtype).name)
+
+
+def append_day(day, ranking, store_dir=None, metadata=None):
+    """Stores one day's ranks, given as (miniapp_id, rank) pairs; returns the new app count.
+
+    Re-appending a day replaces its column. Days skipped since the last
+    append stay NOT_RANKED. A day before the first stored day is refused:
+    rebuild the store instead. `metadata` ({miniapp_id: (name, category)})
+    updates apps.json.
+    """
+    meta_path, ids_path, ranks_path = _paths(store_dir)
+    meta, app_ids = _load(store_dir)
+    if meta is None:
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        open(ranks_path, "wb").close()
+        meta = {"version": VERSION, "dtype": np.dtype(DTYPES[0]).name, "start_date": str(day),
+                "days": 0, "capacity": INITIAL_CAPACITY, "runs": []}
+    start = date.fromisoformat(meta["start_date"])
+    column = (day - start).days
+    if column < 0:
+        raise RankStoreError(f"{day} is before the store's first day {start}; rebuild the store")
+
+    ranking = [(app_id, rank) for app_id, rank in ranking if rank]
+    index = {app_id: i for i, app_id in enumerate(app_ids)}
+    new_apps = 0
+    for app_id, _ in ranking:
+        if app_id not in index:
+            index[app_id] = len(app_ids)
+            app_ids.append(app_id)
+            new_apps += 1
+
+    capacity = meta["capacity"]
+    while capacity < len(app_ids):
+        capacity *= 2
+    dtype = np.dtype(meta["dtype"])
+    top = max((rank for _, rank in ranking), default=0)
+    if top >= np.iinfo(dtype).max:
+        dtype = next((np.dtype(d) for d in DTYPES if top < np.iinfo(d).max), None)
+        if dtype is None:
+            raise RankStoreError(f"Rank {top} does not fit any supported dtype")
+    if capacity != meta["capacity"] or dtype != np.dtype(meta["dtype"]):
+        _rewrite(ranks_path, meta, capacity, dtype)
+
+    if column >= meta["days"]:
+        # Extending the file zero-fills the new days, i.e. NOT_RANKED
+        with open(ranks_path, "r+b") as f:
+            f.truncate(meta["capacity"] * (column + 1) * dtype.itemsize)
+        meta["days"] = column + 1
+    ranks = _map(ranks_path, meta, "r+")
+    ranks[:, column] = NOT_RANKED
+    if ranking:
+        rows = np.fromiter((index[a] for a, _ in ranking), dtype=np.int64, count=len(ranking))
+        ranks[rows, column] = [rank for _, rank in ranking]
+    ranks.flush()
+    del ranks
+    runs = set(meta["runs"]) - {column}
+    meta["runs"] = sorted(runs | {column} if ranking else runs)
+
+    apps = app_metadata(store_dir)
+    _update_metadata(apps, app_ids, index, metadata or {})
+    write_bytes(_apps_path(store_dir), dumps(apps))
+    # meta.json last: readers only see the new day once its column is complete
+    write_bytes(ids_path, dumps(app_ids))
+    write_bytes(meta_path, dumps(meta))
+    return new_apps
+
+
+def open_matrix(store_dir=None):
+    """Memory-maps the store read-only as a RankMatrix (no copy is made)."""
+    meta, app_ids = _load(store_dir)
+    if meta is None or meta["days"] == 0:
+        raise RankStoreError(f"Rank store {store_dir or RANK_STORE_DIR} is empty")
+    ranks = _map(_paths(store_dir)[2], meta, "r")
+    snapshots = np.zeros(meta["days"], dtype=bool)
+    snapshots[meta["runs"]] = True
+    return RankMatrix(app_ids, date.fromisoformat(meta["start_date"]), ranks[:len(app_ids)], snapshots)
+
+
+def append_from_db(cursor, day, source, store_dir=None):
+    """Appends `day` from a running_aggregates source query; returns (apps ranked, new apps)."""
+    cursor.execute(source, {"day": day})
+    ranking = cursor.fetchall()
+    cursor.execute(
+        "SELECT id, name, primary_category FROM miniapps WHERE id = ANY(%s)",
+        ([app_id for app_id, _ in ranking],)
+    )
+    metadata = {app_id: (name, category) for app_id, name, category in cursor.fetchall()}
+    return len(ranking), append_day(day, ranking, store_dir, metadata)
+
+
+def rebuild(cursor, source, start, end, store_dir=None):
+    """Recreates the store from the database for [start, end]; returns the days with ranks.
+
+    Only days still held as daily rows can be rebuilt (see partition_manager).
+    """
+    for path in (*_paths(store_dir), _apps_path(store_dir)):
+        if os.path.exists(path):
+            os.remove(path)
+    filled = 0
+    day = start
+    while day <= end:
+        ranked, _ = append_from_db(cursor, day, source, store_dir)
+        filled += bool(ranked)
+        day += timedelta(days=1)
+    return filled
+
+
+def history_stats(matrix, top=10):
+    """Full-history statistics per app, computed on the mapped matrix.
+
+    volatility is the standard deviation of day-over-day rank changes
+    (consecutive ranked days only, NaN with fewer than two); top_streak is
+    the longest run of consecutive days ranked `top` or better.
+    """
+    ranks = matrix.ranks
+    n = ranks.shape[0]
+    days_ranked = np.empty(n, dtype=np.int64)
+    best = np.empty(n, dtype=np.int64)
+    volatility = np.empty(n, dtype=np.float64)
+    longest = np.empty(n, dtype=np.int64)
+    sentinel = np.iinfo(ranks.dtype).max
+    for lo in range(0, n, BLOCK_ROWS):
+        block = np.asarray(ranks[lo:lo + BLOCK_ROWS], dtype=np.int64)
+        ranked = block != NOT_RANKED
+        days_ranked[lo:lo + BLOCK_ROWS] = ranked.sum(axis=1)
+        best[lo:lo + BLOCK_ROWS] = np.where(ranked, block, sentinel).min(axis=1)
+
+        moves = np.diff(block, axis=1)
+        both = ranked[:, 1:] & ranked[:, :-1]
+        count = both.sum(axis=1)
+        mean = np.where(both, moves, 0).sum(axis=1) / np.maximum(count, 1)
+        variance = np.where(both, (moves - mean[:, None]) ** 2, 0).sum(axis=1) / np.maximum(count, 1)
+        volatility[lo:lo + BLOCK_ROWS] = np.where(count >= 2, np.sqrt(variance), np.nan)
+
+        current = np.zeros(len(block), dtype=np.int64)
+        streak = np.zeros(len(block), dtype=np.int64)
+        in_top = ranked & (block <= top)
+        for j in range(block.shape[1]):
+            current = np.where(in_top[:, j], current + 1, 0)
+            np.maximum(streak, current, out=streak)
+        longest[lo:lo + BLOCK_ROWS] = streak
+
+    return HistoryStats(
+        app_ids=matrix.app_ids,
+        days_ranked=days_ranked,
+        best_rank=np.ma.array(best, mask=days_ranked == 0),
+        volatility=volatility,
+        top_streak=longest,
+    )
+
+
+def main():
+    args = sys.argv[1:]
+    if args[:1] == ["--rebuild"] and len(args) in (2, 3):
+        from db import connect, release
+        from running_aggregates import STATISTICS_SOURCE
+        start = date.fromisoformat(args[1])
+        end = date.fromisoformat(args[2]) if len(args) > 2 else date.today()
+        conn = None
+        try:
+            conn = connect()
+            filled = rebuild(conn.cursor(), STATISTICS_SOURCE, start, end)
+            print(f"✅ Rank store rebuilt: {filled} days with ranks in {start}..{end}")
+        finally:
+            release(conn)
+    elif not args or args[0] == "--stats":
+        top = int(args[1]) if len(args) > 1 else 10
+        matrix = open_matrix()
+        stats = history_stats(matrix, top)
+        print(f"Rank store: {len(matrix.app_ids)} apps x {matrix.ranks.shape[1]} days "
+              f"({matrix.start_date}..{matrix.end_date}, {matrix.ranks.dtype})")
+        order = np.argsort(-np.nan_to_num(stats.volatility, nan=-1))[:10]
+        print("Most volatile apps (std of daily rank change):")
+        for i in order:
+            if np.isnan(stats.volatility[i]):
+                break
+            print(f"   {stats.app_ids[i]}: {stats.volatility[i]:.1f} over {stats.days_ranked[i]} days, best #{stats.best_rank[i]}")
+        print(f"Longest top-{top} streaks:")
+        for i in np.argsort(-stats.top_streak, kind="stable")[:10]:
+            if not stats.top_streak[i]:
+                break
+            print(f"   {stats.app_ids[i]}: {stats.top_streak[i]} days")
+    else:
+        print("Usage: python rank_store.py [--stats [TOP]] | --rebuild START [END]")
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# Hot read queries of the daily reports. The scripts that show them and
+# index_advisor.py, which EXPLAINs them, share these exact texts.
+# Every query takes the report day as its first parameter. The scripts read
+# the run's leaderboard (leaderboard.py) first and fall back to these.
+
+# Top movers of the day (daily_update_simple, debug_fetch_today); params: day, limit
+TOP_GAINERS = """
+    SELECT m.name, m.author_username, s.current_rank, s.rank_24h_change, m.domain
+    FROM miniapp_statistics s
+    JOIN miniapps m ON s.miniapp_id = m.id
+    WHERE s.stat_date = %s AND s.rank_24h_change > 0
+    ORDER BY s.rank_24h_change DESC
+    LIMIT %s
+"""
+
+# Current leaders (daily_update_simple, debug_fetch_today); params: day, limit
+TOP_OVERALL = """
+    SELECT m.name, m.author_username, s.current_rank, m.domain
+    FROM miniapp_statistics s
+    JOIN miniapps m ON s.miniapp_id = m.id
+    WHERE s.stat_date = %s
+    ORDER BY s.current_rank ASC
+    LIMIT %s
+"""
+
+# Climbers outside the top 10 (email_notifications); params: day
+RISING_STARS = """
+    SELECT m.name, m.author_username, s.rank_24h_change
+    FROM miniapp_statistics s
+    JOIN miniapps m ON s.miniapp_id = m.id
+    WHERE s.stat_date = %s
+    AND s.rank_24h_change > 0
+    AND s.current_rank > 10
+    ORDER BY s.rank_24h_change DESC
+    LIMIT 20
+"""
+
+# Per-day sections of check_data.py, which now reads them from the
+# leaderboard (or builds one when no run exists); params: day
+DAY_TOP_10 = """
+    SELECT m.name, m.domain, r.rank, r.rank_72h_change
+    FROM miniapp_rankings r
+    JOIN miniapps m ON r.miniapp_id = m.id
+    WHERE r.ranking_date = %s
+    ORDER BY r.rank
+    LIMIT 10
+"""
+
+DAY_RISERS_72H = """
+    SELECT m.name, r.rank, r.rank_72h_change
+    FROM miniapp_rankings r
+    JOIN miniapps m ON r.miniapp_id = m.id
+    WHERE r.ranking_date = %s
+      AND r.rank_72h_change > 0
+    ORDER BY r.rank_72h_change DESC
+    LIMIT 5
+"""
+
+DAY_FALLERS_72H = """
+    SELECT m.name, r.rank, r.rank_72h_change
+    FROM miniapp_rankings r
+    JOIN miniapps m ON r.miniapp_id = m.id
+    WHERE r.ranking_date = %s
+      AND r.rank_72h_change < 0
+    ORDER BY r.rank_72h_change ASC
+    LIMIT 5
+"""
+
+DAY_CHANGES_24H = """
+    SELECT m.name, r24.rank, r24.rank_24h_change
+    FROM miniapp_rankings_24h r24
+    JOIN miniapps m ON r24.miniapp_id = m.id
+    WHERE r24.ranking_date = %s
+      AND r24.rank_24h_change IS NOT NULL
+    ORDER BY ABS(r24.rank_24h_change) DESC
+    LIMIT 10
+"""
+
+DAY_CHANGES_7D = """
+    SELECT m.name, rw.rank, rw.rank_7d_change
+    FROM miniapp_rankings_weekly rw
+    JOIN miniapps m ON rw.miniapp_id = m.id
+    WHERE rw.ranking_date = %s
+      AND rw.rank_7d_change IS NOT NULL
+    ORDER BY ABS(rw.rank_7d_change) DESC
+    LIMIT 10
+"""
+
+DAY_STATISTICS = """
+    SELECT m.name, s.current_rank, s.rank_24h_change, s.rank_72h_change,
+           s.rank_7d_change, s.avg_rank, s.best_rank, s.worst_rank
+    FROM miniapp_statistics s
+    JOIN miniapps m ON s.miniapp_id = m.id
+    WHERE s.stat_date = %s
+    ORDER BY s.current_rank
+    LIMIT 5
+"""
+
+# (name, sql, extra params after the day) as the scripts run them
+REPORT_QUERIES = (
+    ("top_gainers", TOP_GAINERS, (10,)),
+    ("top_overall", TOP_OVERALL, (5,)),
+    ("rising_stars", RISING_STARS, ()),
+    ("day_top_10", DAY_TOP_10, ()),
+    ("day_risers_72h", DAY_RISERS_72H, ()),
+    ("day_fallers_72h", DAY_FALLERS_72H, ()),
+    ("day_changes_24h", DAY_CHANGES_24H, ()),
+    ("day_changes_7d", DAY_CHANGES_7D, ()),
+    ("day_statistics", DAY_STATISTICS, ()),
+)
@@ -0,0 +1,199 @@
+import sys
+from db import connect, release
+
+
+# Today's ranks, as (miniapp_id, rank), for each daily script's source table
+STATISTICS_SOURCE = """
+    SELECT miniapp_id, current_rank AS rank FROM miniapp_statistics
+    WHERE stat_date = %(day)s AND current_rank > 0
+"""
+RANKINGS_SOURCE = """
+    SELECT miniapp_id, rank FROM miniapp_rankings
+    WHERE ranking_date = %(day)s AND rank > 0
+"""
+
+# Aggregates over a history relation of
+# (miniapp_id, day, days_ranked, rank_sum, best_rank, worst_rank, last_rank):
+# a daily row counts once, a weekly rollup row counts its whole week.
+_AGGREGATE_SELECT = """
+    SELECT
+        miniapp_id,
+        SUM(days_ranked) AS total_rankings,
+        SUM(rank_sum) AS rank_sum,
+        MIN(best_rank) AS best_rank,
+        MAX(worst_rank) AS worst_rank,
+        (ARRAY_AGG(last_rank ORDER BY day DESC))[1] AS last_rank,
+        MAX(day) AS last_seen_date
+    FROM ({history}) h
+    GROUP BY miniapp_id
+"""
+
+_DAILY_ROW = "miniapp_id, {day} AS day, 1 AS days_ranked, {rank} AS rank_sum, {rank} AS best_rank, {rank} AS worst_rank, {rank} AS last_rank"
+
+# Days older than the retention window live in miniapp_rank_history_weekly (partition_manager.py)
+_ROLLUP_HISTORY = """
+    SELECT miniapp_id, last_seen_date AS day, days_ranked, rank_sum, best_rank, worst_rank, last_rank
+    FROM miniapp_rank_history_weekly
+"""
+
+_FULL_HISTORY = f"""
+    SELECT {_DAILY_ROW.format(day="stat_date", rank="current_rank")}
+    FROM miniapp_statistics WHERE current_rank > 0
+    UNION ALL
+    {_ROLLUP_HISTORY}
+"""
+
+_UPSERT_ALL = """
+    ON CONFLICT (miniapp_id) DO UPDATE SET
+        total_rankings = EXCLUDED.total_rankings,
+        rank_sum = EXCLUDED.rank_sum,
+        best_rank = EXCLUDED.best_rank,
+        worst_rank = EXCLUDED.worst_rank,
+        last_rank = EXCLUDED.last_rank,
+        last_seen_date = EXCLUDED.last_seen_date,
+        updated_at = NOW()
+"""
+
+_COLUMNS = "miniapp_id, total_rankings, rank_sum, best_rank, worst_rank, last_rank, last_seen_date"
+
+
+def refresh_day(cursor, day, source=STATISTICS_SOURCE):
+    """Folds one day's ranks into the running aggregates in O(apps).
+
+    Re-running the same day replaces that day's rank instead of counting it
+    twice. If the replaced rank was an app's best or worst, that app alone
+    is recomputed from its history. Days older than an app's last seen date
+    are skipped, as are same-day re-runs with an unchanged rank; use
+    rebuild() after backfilling history.
+    Returns (apps folded in, apps recomputed).
+    """
+    cursor.execute("DROP TABLE IF EXISTS agg_day")
+    cursor.execute(f"CREATE TEMP TABLE agg_day ON COMMIT DROP AS {source}", {"day": day})
+
+    # Same-day reruns that would invalidate best/worst
+    cursor.execute("""
+        SELECT a.miniapp_id
+        FROM miniapp_rank_aggregates a
+        JOIN agg_day d ON d.miniapp_id = a.miniapp_id
+        WHERE a.last_seen_date = %s
+          AND a.last_rank <> d.rank
+          AND a.last_rank IN (a.best_rank, a.worst_rank)
+    """, (day,))
+    stale_ids = [r[0] for r in cursor.fetchall()]
+
+    cursor.execute("""
+        INSERT INTO miniapp_rank_aggregates AS a (
+            miniapp_id, total_rankings, rank_sum, best_rank, worst_rank, last_rank, last_seen_date
+        )
+        SELECT DISTINCT ON (miniapp_id) miniapp_id, 1, rank, rank, rank, rank, %(day)s
+        FROM agg_day
+        ORDER BY miniapp_id, rank
+        ON CONFLICT (miniapp_id) DO UPDATE SET
+            total_rankings = a.total_rankings
+                + CASE WHEN a.last_seen_date < EXCLUDED.last_seen_date THEN 1 ELSE 0 END,
+            rank_sum = a.rank_sum + EXCLUDED.rank_sum
+                - CASE WHEN a.last_seen_date = EXCLUDED.last_seen_date THEN a.last_rank ELSE 0 END,
+            best_rank = LEAST(a.best_rank, EXCLUDED.best_rank),
+            worst_rank = GREATEST(a.worst_rank, EXCLUDED.worst_rank),
+            last_rank = EXCLUDED.last_rank,
+            last_seen_date = EXCLUDED.last_seen_date,
+            updated_at = NOW()
+        WHERE a.last_seen_date < EXCLUDED.last_seen_date
+           OR (a.last_seen_date = EXCLUDED.last_seen_date AND a.last_rank <> EXCLUDED.last_rank)
+    """, {"day": day})
+    folded = cursor.rowcount
+
+    if stale_ids:
+        history = f"""
+            SELECT {_DAILY_ROW.format(day="stat_date", rank="current_rank")}
+            FROM miniapp_statistics
+            WHERE miniapp_id = ANY(%(ids)s) AND stat_date <> %(day)s AND current_rank > 0
+            UNION ALL
+            SELECT {_DAILY_ROW.format(day="%(day)s", rank="rank")}
+            FROM agg_day WHERE miniapp_id = ANY(%(ids)s)
+            UNION ALL
+            {_ROLLUP_HISTORY} WHERE miniapp_id = ANY(%(ids)s)
+        """
+        cursor.execute(
+            f"INSERT INTO miniapp_rank_aggregates ({_COLUMNS}) {_AGGREGATE_SELECT.format(history=history)} {_UPSERT_ALL}",
+            {"ids": stale_ids, "day": day}
+        )
+    return folded, len(stale_ids)
+
+
+def fetch_aggregates(cursor, miniapp_ids):
+    """Returns {miniapp_id: (avg_rank, best_rank)} for the given apps."""
+    cursor.execute("""
+        SELECT miniapp_id, rank_sum::numeric / total_rankings, best_rank
+        FROM miniapp_rank_aggregates
+        WHERE miniapp_id = ANY(%s)
+    """, (list(miniapp_ids),))
+    return {r[0]: (r[1], r[2]) for r in cursor.fetchall()}
+
+
+def rebuild(cursor):
+    """Recomputes every app's aggregates from the full history."""
+    cursor.execute(
+        f"INSERT INTO miniapp_rank_aggregates ({_COLUMNS}) {_AGGREGATE_SELECT.format(history=_FULL_HISTORY)} {_UPSERT_ALL}"
+    )
+    rebuilt = cursor.rowcount
+    cursor.execute(f"""
+        DELETE FROM miniapp_rank_aggregates
+        WHERE miniapp_id NOT IN (SELECT miniapp_id FROM ({_FULL_HISTORY}) h)
+    """)
+    return rebuilt
+
+
+def verify(cursor, limit=20):
+    """Compares the running aggregates with a full recompute.
+
+    Returns the number of apps that differ and prints up to `limit` of them.
+    """
+    cursor.execute(f"""
+        WITH full_recompute AS ({_AGGREGATE_SELECT.format(history=_FULL_HISTORY)})
+        SELECT
+            COALESCE(f.miniapp_id, a.miniapp_id),
+            f.total_rankings, a.total_rankings,
+            f.rank_sum, a.rank_sum,
+            f.best_rank, a.best_rank,
+            f.worst_rank, a.worst_rank,
+            f.last_seen_date, a.last_seen_date
+        FROM full_recompute f
+        FULL OUTER JOIN miniapp_rank_aggregates a ON a.miniapp_id = f.miniapp_id
+        WHERE (f.total_rankings, f.rank_sum, f.best_rank, f.worst_rank, f.last_rank, f.last_seen_date)
+            IS DISTINCT FROM
+              (a.total_rankings, a.rank_sum, a.best_rank, a.worst_rank, a.last_rank, a.last_seen_date)
+    """)
+    mismatches = cursor.fetchall()
+    for row in mismatches[:limit]:
+        mid, fc, ac, fs, as_, fb, ab, fw, aw, fd, ad = row
+        print(f"   {mid}: count {fc}/{ac}, sum {fs}/{as_}, best {fb}/{ab}, worst {fw}/{aw}, last {fd}/{ad}")
+    return len(mismatches)
+
+
+def main():
+    mode = sys.argv[1] if len(sys.argv) > 1 else "--verify"
+    conn = None
+    try:
+        conn = connect(statement_timeout_ms=0)
+        cursor = conn.cursor()
+        if mode == "--rebuild":
+            rebuilt = rebuild(cursor)
+            conn.commit()
+            print(f"✅ Rebuilt running aggregates for {rebuilt} miniapps")
+        elif mode == "--verify":
+            print("Comparing running aggregates with a full recompute (full recompute / running)...")
+            mismatches = verify(cursor)
+            if mismatches:
+                print(f"❌ {mismatches} miniapps differ; run with --rebuild to repair")
+                sys.exit(1)
+            print("✅ Running aggregates match the full history")
+        else:
+            print("Usage: python running_aggregates.py [--verify | --rebuild]")
+            sys.exit(2)
+    finally:
+        release(conn)
+
+
+if __name__ == "__main__":
+    main()
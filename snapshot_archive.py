@@ -0,0 +1,481 @@
+import hashlib
+import json
+import lzma
+import os
+import struct
+import sys
+import zlib
+import numpy as np
+from object_store import ObjectStoreError, open_store
+from json_codec import dumps, loads
+from miniapp_schema import snapshot_entries
+
+# Columnar archive of one day's ranking (".mcol"):
+#   prefix  MAGIC, version (u16), header length (u32)
+#   header  JSON: snapshot date, row count and a directory of column segments
+#   data    one compressed segment per column (plus a dictionary segment for
+#           strings), so a reader decodes only the columns it asks for.
+# Version 3 keeps only the short, often read fields (ranks, ids, names,
+# authors) as typed columns and every other field of a row in the "rest"
+# column, one JSON array for the day: long texts and URLs are unique per row
+# and compress better next to the rest of their row (icon, splash and image
+# URLs share hosts and ids) than in columns of their own. Segments are raw
+# LZMA2. Versions 1 and 2 (zlib, every field below a column, version 2 with
+# a per-row "extra" JSON column) are still read.
+MAGIC = b"MCOL"
+VERSION = 3
+READ_VERSIONS = (1, 2, 3)
+EXTRA_COLUMN = "extra"
+REST_COLUMN = "rest"
+_PREFIX = struct.Struct("<4sHI")
+
+# Raw LZMA2; a day is far below the 4 MiB dictionary
+_LZMA_FILTERS = [{"id": lzma.FILTER_LZMA2, "preset": 9 | lzma.PRESET_EXTREME, "dict_size": 1 << 22}]
+
+NULL_INT = np.iinfo(np.int64).min
+NULL_CODE = -1
+
+# (column, path into an API ranking entry, type)
+COLUMNS = (
+    ("rank", ("rank",), "int"),
+    ("rank_72h_change", ("rank72hChange",), "int"),
+    ("id", ("miniApp", "id"), "str"),
+    ("short_id", ("miniApp", "shortId"), "str"),
+    ("name", ("miniApp", "name"), "str"),
+    ("domain", ("miniApp", "domain"), "str"),
+    ("home_url", ("miniApp", "homeUrl"), "str"),
+    ("icon_url", ("miniApp", "iconUrl"), "str"),
+    ("image_url", ("miniApp", "imageUrl"), "str"),
+    ("splash_image_url", ("miniApp", "splashImageUrl"), "str"),
+    ("splash_background_color", ("miniApp", "splashBackgroundColor"), "str"),
+    ("button_title", ("miniApp", "buttonTitle"), "str"),
+    ("supports_notifications", ("miniApp", "supportsNotifications"), "bool"),
+    ("primary_category", ("miniApp", "primaryCategory"), "str"),
+    ("author_fid", ("miniApp", "author", "fid"), "int"),
+    ("author_username", ("miniApp", "author", "username"), "str"),
+    ("author_display_name", ("miniApp", "author", "displayName"), "str"),
+    ("author_follower_count", ("miniApp", "author", "followerCount"), "int"),
+    ("author_following_count", ("miniApp", "author", "followingCount"), "int"),
+)
+
+# The COLUMNS a version 3 archive stores as typed columns; the others live in
+# the rest column and SnapshotArchive.column() reads them from there
+TYPED_COLUMNS = (
+    "rank", "rank_72h_change", "id", "short_id", "name", "domain", "supports_notifications",
+    "primary_category", "author_fid", "author_username", "author_display_name",
+    "author_follower_count", "author_following_count",
+)
+
+
+class ArchiveError(Exception):
+    """Raised for missing, corrupt or incompatible archive files."""
+
+
+_KINDS = {"int": int, "bool": bool, "str": str}
+
+
+def _fits(value, kind):
+    """Whether a column of `kind` stores `value` exactly."""
+    if kind == "int":
+        return type(value) is int and NULL_INT < value <= np.iinfo(np.int64).max
+    return type(value) is _KINDS[kind]
+
+
+# Marks a field that is absent from an entry, as opposed to null
+_ABSENT = object()
+
+
+def _copy_dicts(value):
+    """Copies the nested dicts of an entry; lists and scalars are shared, never modified."""
+    return {k: _copy_dicts(v) for k, v in value.items()} if isinstance(value, dict) else value
+
+
+def _split(entry, columns):
+    """Returns ({column: value or _ABSENT}, rest) for one entry.
+
+    A field goes into its typed column only when the column stores it
+    exactly; a field that is absent or holds another type stays in `rest`
+    and is _ABSENT in its column. Dicts emptied by taking out the typed
+    fields are dropped from `rest`; entries() recreates them.
+    """
+    rest = _copy_dicts(entry)
+    values = {}
+    for name, path, kind in columns:
+        parents = [rest]
+        for key in path[:-1]:
+            parents.append(parents[-1].get(key) if isinstance(parents[-1], dict) else None)
+        parent = parents[-1]
+        if not (isinstance(parent, dict) and path[-1] in parent
+                and (parent[path[-1]] is None or _fits(parent[path[-1]], kind))):
+            values[name] = _ABSENT
+            continue
+        values[name] = parent.pop(path[-1])
+        for depth in range(len(path) - 1, 0, -1):
+            if parents[depth]:
+                break
+            del parents[depth - 1][path[depth - 1]]
+    return values, rest
+
+
+def _merge(target, rest):
+    for key, value in rest.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        else:
+            target[key] = value
+
+
+def _set(entry, path, value):
+    for key in path[:-1]:
+        entry = entry.setdefault(key, {})
+    entry[path[-1]] = value
+
+
+def _get(entry, path):
+    for key in path:
+        if not isinstance(entry, dict):
+            return None
+        entry = entry.get(key)
+    return entry
+
+
+def _same(a, b):
+    """Structural equality that, unlike ==, tells True from 1 and 1 from 1.0."""
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(_same(v, b[k]) for k, v in a.items())
+    if isinstance(a, list):
+        return len(a) == len(b) and all(map(_same, a, b))
+    return a == b
+
+
+def _compress(segment):
+    return lzma.compress(segment, format=lzma.FORMAT_RAW, filters=_LZMA_FILTERS)
+
+
+def _encode_column(values, kind):
+    """Returns (segments, extra header fields) for one column."""
+    if kind == "int":
+        array = np.array([NULL_INT if v is None else int(v) for v in values], dtype=np.int64)
+        return [array.tobytes()], {}
+    if kind == "bool":
+        array = np.array([NULL_CODE if v is None else int(bool(v)) for v in values], dtype=np.int8)
+        return [array.tobytes()], {}
+    # Dictionary-encoded strings: repeated authors, categories and URL hosts collapse
+    dictionary = {}
+    codes = np.array(
+        [NULL_CODE if v is None else dictionary.setdefault(str(v), len(dictionary)) for v in values],
+        dtype=np.int32
+    )
+    return [codes.tobytes(), json.dumps(list(dictionary), ensure_ascii=False).encode("utf-8")], {
+        "dict_size": len(dictionary)
+    }
+
+
+def encode_archive(miniapps_data, snapshot_date):
+    """Encodes a list of ranking entries into archive bytes.
+
+    Anything but ranking entries with a miniApp.id (e.g. a still wrapped
+    {snapshotDate, miniapps} file) raises ArchiveError.
+    """
+    if not isinstance(miniapps_data, list):
+        raise ArchiveError(f"Expected a list of ranking entries, got {type(miniapps_data).__name__}")
+    typed = [column for column in COLUMNS if column[0] in TYPED_COLUMNS]
+    split = []
+    for i, entry in enumerate(miniapps_data):
+        if not isinstance(entry, dict) or not isinstance(entry.get("miniApp"), dict) or entry["miniApp"].get("id") is None:
+            raise ArchiveError(f"Entry {i} is not a ranking entry with miniApp.id")
+        split.append(_split(entry, typed))
+    directory = []
+    blobs = []
+    offset = 0
+
+    def add(segment):
+        nonlocal offset
+        compressed = _compress(segment)
+        blobs.append(compressed)
+        offset += len(compressed)
+        return [offset - len(compressed), len(compressed)]
+
+    for name, path, kind in typed:
+        values = [values[name] for values, _ in split]
+        present = [v is not _ABSENT for v in values]
+        segments, extra = _encode_column([v if p else None for v, p in zip(values, present)], kind)
+        column = {"name": name, "path": list(path), "type": kind, "segments": [add(s) for s in segments], **extra}
+        if not all(present):
+            column["present"] = add(np.packbits(np.array(present, dtype=bool)).tobytes())
+        directory.append(column)
+    rest = json.dumps([rest for _, rest in split], ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    directory.append({"name": REST_COLUMN, "type": "json", "segments": [add(rest)]})
+    header = json.dumps({
+        "snapshot_date": str(snapshot_date),
+        "rows": len(split),
+        "codec": "lzma2",
+        "columns": directory,
+    }).encode("utf-8")
+    return _PREFIX.pack(MAGIC, VERSION, len(header)) + header + b"".join(blobs)
+
+
+def object_key(snapshot_date):
+    day = str(snapshot_date)
+    return f"snapshots/{day[:4]}/top_miniapps_{day}.mcol"
+
+
+def store_archive(miniapps_data, snapshot_date, store=None):
+    """Uploads the archive for a day to the object store; returns (key, sha256 hex)."""
+    data = encode_archive(miniapps_data, snapshot_date)
+    key = object_key(snapshot_date)
+    (store or open_store()).put(key, data)
+    return key, hashlib.sha256(data).hexdigest()
+
+
+def archive_snapshot(miniapps_data, snapshot_date, store=None, payload=None):
+    """Stores a day's archive; returns (key, sha256 hex, raw_json).
+
+    `payload` is the day already encoded as JSON (content_hash.encode_payload),
+    reused for raw_json instead of encoding the entries again.
+
+    raw_json is the payload JSON to keep in ranking_snapshots, or None when
+    the archive can replace it: the store is durable and the stored archive
+    reads back as exactly this payload. With the default, non-durable local
+    store the database keeps raw_json next to the archive, so its storage
+    only shrinks once OBJECT_STORE_URL points at a durable store.
+    """
+    store = store or open_store()
+    key, checksum = store_archive(miniapps_data, snapshot_date, store)
+    if store.durable:
+        try:
+            if verify_archive(fetch_archive(key, checksum, store), miniapps_data):
+                return key, checksum, None
+        except (OSError, ArchiveError) as e:
+            print(f"⚠️  {snapshot_date}: stored archive unreadable, keeping raw_json: {e}")
+    return key, checksum, (payload if payload is not None else dumps(miniapps_data)).decode("utf-8")
+
+
+def fetch_archive(key, expected_sha256=None, store=None):
+    """Opens a stored archive; a remote object is downloaded only now."""
+    try:
+        path = (store or open_store()).local_path(key)
+    except ObjectStoreError as e:
+        raise ArchiveError(str(e))
+    return SnapshotArchive(path, expected_sha256)
+
+
+class SnapshotArchive:
+    """Reader that loads single columns without decoding the rest of the day."""
+
+    def __init__(self, path, expected_sha256=None):
+        self.path = path
+        if expected_sha256:
+            with open(path, "rb") as f:
+                actual = hashlib.sha256(f.read()).hexdigest()
+            if actual != expected_sha256:
+                raise ArchiveError(f"Checksum mismatch for {path}")
+        with open(path, "rb") as f:
+            prefix = f.read(_PREFIX.size)
+            if len(prefix) < _PREFIX.size:
+                raise ArchiveError(f"Truncated archive: {path}")
+            magic, version, header_length = _PREFIX.unpack(prefix)
+            if magic != MAGIC or version not in READ_VERSIONS:
+                raise ArchiveError(f"Not a supported snapshot archive (version {version}): {path}")
+            header = json.loads(f.read(header_length))
+        self._data_start = _PREFIX.size + header_length
+        self.version = version
+        self.snapshot_date = header["snapshot_date"]
+        self.rows = header["rows"]
+        self.codec = header.get("codec", "zlib")
+        self.columns = {c["name"]: c for c in header["columns"]}
+
+    def _segment(self, f, span):
+        offset, length = span
+        f.seek(self._data_start + offset)
+        data = f.read(length)
+        try:
+            if self.codec == "lzma2":
+                return lzma.decompress(data, format=lzma.FORMAT_RAW, filters=_LZMA_FILTERS)
+            return zlib.decompress(data)
+        except (lzma.LZMAError, zlib.error) as e:
+            raise ArchiveError(f"Corrupt segment in {self.path}: {e}")
+
+    def _present(self, f, column):
+        """Row mask of the values a version 3 column holds, None when it holds all of them."""
+        if "present" not in column:
+            return None
+        bits = np.frombuffer(self._segment(f, column["present"]), dtype=np.uint8)
+        return np.unpackbits(bits, count=self.rows).astype(bool)
+
+    def column_array(self, name):
+        """Returns the raw column: an int64/int8 array, or (codes, dictionary) for strings."""
+        try:
+            column = self.columns[name]
+        except KeyError:
+            raise ArchiveError(f"Unknown column {name!r}; available: {', '.join(self.columns)}")
+        with open(self.path, "rb") as f:
+            if column["type"] == "int":
+                return np.frombuffer(self._segment(f, column["segments"][0]), dtype=np.int64)
+            if column["type"] == "bool":
+                return np.frombuffer(self._segment(f, column["segments"][0]), dtype=np.int8)
+            if column["type"] == "json":
+                return json.loads(self._segment(f, column["segments"][0]))
+            codes = np.frombuffer(self._segment(f, column["segments"][0]), dtype=np.int32)
+            return codes, json.loads(self._segment(f, column["segments"][1]))
+
+    def _values(self, name):
+        """Returns ({row: value}, kind) for the rows a stored column holds."""
+        column = self.columns[name]
+        kind = column["type"]
+        data = self.column_array(name)
+        if kind == "int":
+            values = [None if v == NULL_INT else v for v in data.tolist()]
+        elif kind == "bool":
+            values = [None if v == NULL_CODE else bool(v) for v in data.tolist()]
+        elif kind == "json":
+            values = data
+        else:
+            codes, dictionary = data
+            values = [None if c == NULL_CODE else dictionary[c] for c in codes.tolist()]
+        with open(self.path, "rb") as f:
+            present = self._present(f, column)
+        if present is None:
+            return dict(enumerate(values))
+        return {i: v for i, v in enumerate(values) if present[i]}
+
+    def column(self, name):
+        """Returns one column as a list of Python values, None for nulls and absent fields.
+
+        A COLUMNS field that a version 3 archive keeps in its rest column
+        (e.g. icon_url) is read from the rebuilt entries.
+        """
+        if name not in self.columns:
+            path = next((path for column, path, _ in COLUMNS if column == name), None)
+            if path is None:
+                raise ArchiveError(f"Unknown column {name!r}; available: {', '.join(self.columns)}")
+            return [_get(entry, path) for entry in self.entries()]
+        values = self._values(name)
+        return [values.get(i) for i in range(self.rows)]
+
+    def entries(self):
+        """Rebuilds the ranking entries in API shape.
+
+        Version 2 and 3 archives return the encoded payload unchanged;
+        version 1 archives hold the typed columns only.
+        """
+        if self.version >= 3:
+            rest = self.column_array(REST_COLUMN)
+            entries = [{} for _ in range(self.rows)]
+            for name, column in self.columns.items():
+                if name == REST_COLUMN:
+                    continue
+                for i, value in self._values(name).items():
+                    _set(entries[i], column["path"], value)
+            for entry, remainder in zip(entries, rest):
+                _merge(entry, remainder)
+            return entries
+        values = {name: self.column(name) for name, _, _ in COLUMNS}
+        extras = self.column(EXTRA_COLUMN) if EXTRA_COLUMN in self.columns else [None] * self.rows
+        entries = []
+        for i in range(self.rows):
+            extra = json.loads(extras[i]) if extras[i] is not None else {}
+            missing = set(extra.get("missing", ()))
+            entry = {}
+            for name, path, _ in COLUMNS:
+                if name not in missing:
+                    _set(entry, path, values[name][i])
+            _merge(entry, extra.get("rest", {}))
+            entries.append(entry)
+        return entries
+
+
+def verify_archive(archive, miniapps_data):
+    """Whether an opened archive decodes back to exactly `miniapps_data`."""
+    return archive.rows == len(miniapps_data) and _same(archive.entries(), miniapps_data)
+
+
+def migrate_to_store(conn, store=None):
+    """Moves every snapshot still held in the database or a local file into the object store.
+
+    Only a durable store is used, and raw_json or archive_path is cleared
+    only after the stored archive reads back as the same entries; otherwise
+    the day is left as it is. Each day is committed on its own, so an
+    interrupted run resumes where it stopped.
+    """
+    store = store or open_store()
+    if not store.durable:
+        raise ObjectStoreError(
+            "Refusing to move snapshots into a non-durable object store; "
+            "use an s3:// OBJECT_STORE_URL or set OBJECT_STORE_DURABLE=1 for a persistent directory"
+        )
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT snapshot_date FROM ranking_snapshots
+        WHERE object_key IS NULL AND (raw_json IS NOT NULL OR archive_path IS NOT NULL)
+        ORDER BY snapshot_date
+    """)
+    days = [r[0] for r in cursor.fetchall()]
+    migrated = 0
+    for day in days:
+        cursor.execute("SELECT raw_json, archive_path, archive_sha256 FROM ranking_snapshots WHERE snapshot_date = %s", (day,))
+        raw, path, checksum = cursor.fetchone()
+        try:
+            if raw is not None:
+                entries = snapshot_entries(loads(raw) if isinstance(raw, (str, bytes)) else raw)
+                key, checksum = store_archive(entries, day, store)
+                source = f"{len(raw)} bytes of JSON"
+            else:
+                with open(path, "rb") as f:
+                    data = f.read()
+                actual = hashlib.sha256(data).hexdigest()
+                if checksum and actual != checksum:
+                    print(f"⚠️  {day}: checksum mismatch for {path}, left in place")
+                    continue
+                entries = SnapshotArchive(path, actual).entries()
+                key, checksum = object_key(day), actual
+                store.put(key, data)
+                source = path
+            verified = verify_archive(fetch_archive(key, checksum, store), entries)
+        except (OSError, ValueError, ArchiveError, ObjectStoreError) as e:
+            print(f"⚠️  {day}: not moved, left in place: {e}")
+            continue
+        if not verified:
+            print(f"⚠️  {day}: stored archive does not match the snapshot, left in place")
+            continue
+        cursor.execute("""
+            UPDATE ranking_snapshots
+            SET object_key = %s, archive_sha256 = %s, raw_json = NULL, archive_path = NULL
+            WHERE snapshot_date = %s
+        """, (key, checksum, day))
+        conn.commit()
+        migrated += 1
+        print(f"   {day}: {source} -> {key}")
+    return migrated
+
+
+def main():
+    if len(sys.argv) >= 2 and sys.argv[1] == "--migrate":
+        from db import connection
+        with connection(statement_timeout_ms=0) as conn:
+            try:
+                migrated = migrate_to_store(conn)
+            except ObjectStoreError as e:
+                print(f"❌ {e}")
+                sys.exit(1)
+            print(f"✅ Moved {migrated} snapshots to the object store")
+    elif len(sys.argv) >= 2:
+        # A local archive file, or the key of a stored one
+        archive = SnapshotArchive(sys.argv[1]) if os.path.exists(sys.argv[1]) else fetch_archive(sys.argv[1])
+        if len(sys.argv) >= 3:
+            for value in archive.column(sys.argv[2]):
+                print(value)
+        else:
+            print(f"{archive.snapshot_date}: {archive.rows} rows")
+            for name, column in archive.columns.items():
+                size = sum(length for _, length in column["segments"])
+                print(f"   {name:<24} {column['type']:<5} {size:>8} bytes")
+    else:
+        print("Usage: python snapshot_archive.py FILE|KEY [COLUMN] | --migrate")
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
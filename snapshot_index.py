@@ -0,0 +1,253 @@
+import argparse
+import mmap
+import os
+import re
+import struct
+from datetime import date, timedelta
+from json_codec import dumps, loads
+from miniapp_schema import snapshot_entries
+
+# Indexed snapshot file (".msnap"), one per day:
+#   prefix   MAGIC, version (u16), header length (u32)
+#   header   JSON: snapshot date, row count and the section offsets below
+#   index    one fixed-size entry per app, sorted by app id:
+#            id offset (u32), id length (u16), rank (i32), record offset (u32), record length (u32)
+#   ids      the app ids, UTF-8, in index order
+#   records  each ranking entry as compact JSON, in rank order
+# The file is memory-mapped and an app is found by binary search over the
+# index, so "rank of app X on day D" reads a few hundred bytes instead of
+# parsing the whole day; the rank sits in the index and needs no JSON at all.
+MAGIC = b"MSNP"
+VERSION = 1
+_PREFIX = struct.Struct("<4sHI")
+_INDEX_ENTRY = struct.Struct("<IHiII")
+
+NULL_RANK = -1
+
+SNAPSHOT_INDEX_DIR = os.getenv("SNAPSHOT_INDEX_DIR", "snapshot_index")
+
+_DATE_RE = re.compile(r"(\d{4}-\d{2}-\d{2})")
+
+
+class SnapshotFileError(Exception):
+    """Raised for missing, corrupt or incompatible snapshot files."""
+
+
+def snapshot_path(snapshot_date, index_dir=None):
+    day = str(snapshot_date)
+    return os.path.join(index_dir or SNAPSHOT_INDEX_DIR, day[:4], f"top_miniapps_{day}.msnap")
+
+
+def encode_snapshot(miniapps_data, snapshot_date, records=None):
+    """Encodes a day's ranking entries into indexed snapshot bytes.
+
+    `records` are the entries already encoded as JSON (content_hash.encode_payload);
+    without them every entry is encoded here.
+    """
+    encoded = records
+    records = []
+    keyed = []
+    offset = 0
+    for i, entry in enumerate(miniapps_data):
+        record = encoded[i] if encoded is not None else dumps(entry)
+        app_id = str(entry["miniApp"]["id"]).encode("utf-8")
+        rank = entry.get("rank")
+        keyed.append((app_id, NULL_RANK if rank is None else rank, offset, len(record)))
+        records.append(record)
+        offset += len(record)
+    keyed.sort()
+
+    index = bytearray()
+    ids = bytearray()
+    for app_id, rank, record_offset, record_length in keyed:
+        index += _INDEX_ENTRY.pack(len(ids), len(app_id), rank, record_offset, record_length)
+        ids += app_id
+    header = dumps({
+        "snapshot_date": str(snapshot_date),
+        "rows": len(keyed),
+        "ids_offset": len(index),
+        "records_offset": len(index) + len(ids),
+    })
+    return _PREFIX.pack(MAGIC, VERSION, len(header)) + header + bytes(index) + bytes(ids) + b"".join(records)
+
+
+def write_snapshot(miniapps_data, snapshot_date, index_dir=None, records=None):
+    """Writes the indexed snapshot file for a day; returns its path."""
+    path = snapshot_path(snapshot_date, index_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(encode_snapshot(miniapps_data, snapshot_date, records))
+    os.replace(tmp_path, path)
+    return path
+
+
+class IndexedSnapshot:
+    """Memory-mapped reader with point lookups by app id."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            try:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise SnapshotFileError(f"Empty snapshot file: {path}")
+        try:
+            header_length, header = self._read_header()
+        except SnapshotFileError:
+            self._map.close()
+            raise
+        self.snapshot_date = date.fromisoformat(header["snapshot_date"])
+        self.rows = header["rows"]
+        self._index_start = _PREFIX.size + header_length
+        self._ids_start = self._index_start + header["ids_offset"]
+        self._records_start = self._index_start + header["records_offset"]
+
+    def _read_header(self):
+        try:
+            magic, version, header_length = _PREFIX.unpack_from(self._map)
+        except struct.error:
+            raise SnapshotFileError(f"Truncated snapshot file: {self.path}")
+        if magic != MAGIC or version != VERSION:
+            raise SnapshotFileError(f"Not a version {VERSION} indexed snapshot: {self.path}")
+        try:
+            return header_length, loads(self._map[_PREFIX.size:_PREFIX.size + header_length])
+        except ValueError as e:
+            raise SnapshotFileError(f"Corrupt header in {self.path}: {e}")
+
+    def __len__(self):
+        return self.rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._map.close()
+
+    def _entry(self, i):
+        return _INDEX_ENTRY.unpack_from(self._map, self._index_start + i * _INDEX_ENTRY.size)
+
+    def _id(self, entry):
+        start = self._ids_start + entry[0]
+        return self._map[start:start + entry[1]]
+
+    def _find(self, app_id):
+        """Index entry of `app_id` by binary search, or None."""
+        key = str(app_id).encode("utf-8")
+        lo, hi = 0, self.rows
+        while lo < hi:
+            mid = (lo + hi) // 2
+            entry = self._entry(mid)
+            found = self._id(entry)
+            if found == key:
+                return entry
+            if found < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def __contains__(self, app_id):
+        return self._find(app_id) is not None
+
+    def rank(self, app_id):
+        """The app's rank that day, or None when it was not ranked."""
+        entry = self._find(app_id)
+        if entry is None or entry[2] == NULL_RANK:
+            return None
+        return entry[2]
+
+    def entry(self, app_id):
+        """The app's full ranking entry, or None; only this record is parsed."""
+        entry = self._find(app_id)
+        if entry is None:
+            return None
+        start = self._records_start + entry[3]
+        return loads(self._map[start:start + entry[4]])
+
+    def ids(self):
+        """All app ids, sorted."""
+        return [self._id(self._entry(i)).decode("utf-8") for i in range(self.rows)]
+
+    def entries(self):
+        """Every ranking entry in rank order (parses the whole day)."""
+        spans = sorted((e[3], e[4]) for e in map(self._entry, range(self.rows)))
+        return [loads(self._map[self._records_start + o:self._records_start + o + n]) for o, n in spans]
+
+
+def rank_history(app_id, start, end, index_dir=None):
+    """Returns [(date, rank or None)] for every day in [start, end] that has a snapshot file."""
+    history = []
+    day = start
+    while day <= end:
+        path = snapshot_path(day, index_dir)
+        if os.path.exists(path):
+            with IndexedSnapshot(path) as snapshot:
+                history.append((day, snapshot.rank(app_id)))
+        day += timedelta(days=1)
+    return history
+
+
+def convert_json(path, index_dir=None, snapshot_date=None):
+    """Converts a JSON snapshot of any stored shape; returns (date, output path).
+
+    The date comes from `snapshot_date`, the file's snapshotDate wrapper or
+    a YYYY-MM-DD in its name, in that order.
+    """
+    with open(path, "rb") as f:
+        payload = loads(f.read())
+    if snapshot_date is None and isinstance(payload, dict) and payload.get("snapshotDate"):
+        snapshot_date = payload["snapshotDate"]
+    if snapshot_date is None:
+        match = _DATE_RE.search(os.path.basename(path))
+        if not match:
+            raise SnapshotFileError(f"No snapshot date for {path}; pass --date")
+        snapshot_date = match.group(1)
+    day = date.fromisoformat(str(snapshot_date))
+    return day, write_snapshot(snapshot_entries(payload), day, index_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Indexed snapshot files: convert JSON snapshots and look up apps.")
+    parser.add_argument("--dir", default=None, help=f"snapshot file directory (default {SNAPSHOT_INDEX_DIR})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    convert = commands.add_parser("convert", help="convert JSON snapshot files")
+    convert.add_argument("files", nargs="+")
+    convert.add_argument("--date", type=date.fromisoformat, help="snapshot date for a single undated file")
+    lookup = commands.add_parser("lookup", help="an app's rank on every stored day")
+    lookup.add_argument("app_id")
+    lookup.add_argument("start", type=date.fromisoformat)
+    lookup.add_argument("end", type=date.fromisoformat, nargs="?", default=date.today())
+    show = commands.add_parser("show", help="summary of one file, or one app's entry")
+    show.add_argument("file")
+    show.add_argument("app_id", nargs="?")
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        if args.date and len(args.files) > 1:
+            parser.error("--date applies to a single file; convert dated files together or one at a time")
+        for path in args.files:
+            try:
+                day, output = convert_json(path, args.dir, args.date)
+            except (OSError, ValueError, KeyError, TypeError, struct.error, SnapshotFileError) as e:
+                # A malformed snapshot skips its file, not the rest of the batch
+                print(f"⚠️  {path}: {type(e).__name__}: {e}")
+                continue
+            print(f"   {path} ({day}): {os.path.getsize(path)} bytes -> {os.path.getsize(output)} bytes ({output})")
+    elif args.command == "lookup":
+        for day, rank in rank_history(args.app_id, args.start, args.end, args.dir):
+            print(f"   {day}: {'-' if rank is None else rank}")
+    else:
+        with IndexedSnapshot(args.file) as snapshot:
+            if args.app_id:
+                entry = snapshot.entry(args.app_id)
+                print(dumps(entry, pretty=True).decode("utf-8") if entry else f"{args.app_id} not ranked on {snapshot.snapshot_date}")
+            else:
+                print(f"{snapshot.snapshot_date}: {len(snapshot)} apps")
+
+
+if __name__ == "__main__":
+    main()
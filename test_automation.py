@@ -4,10 +4,10 @@ Teszt script az automatikus frissítési folyamathoz
 """
 
 import os
-import json
 import subprocess
 import sys
 from datetime import datetime
+from json_codec import read_file
 
 def test_data_download():
     """Teszteli az adatok letöltését"""
@@ -22,8 +22,9 @@ def test_data_download():
             
             # Ellenőrizzük a fájlt
             if os.path.exists("top_miniapps.json"):
-                with open("top_miniapps.json", "r", encoding="utf-8") as f:
-                    data = json.load(f)
+                data = read_file("top_miniapps.json")
+                if isinstance(data, dict):
+                    data = data.get('miniapps', [])
                 print(f"   - Miniappok száma: {len(data)}")
                 return True
             else:
@@ -0,0 +1,61 @@
+import glob
+import os
+import sys
+import uuid
+
+import pytest
+
+# The modules live at the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# A scratch Postgres for the tests of SQL-heavy modules; they are skipped without it
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+def ranking_entry(rank, app_id, **miniapp):
+    """One entry of the ranking API response."""
+    return {
+        "rank": rank,
+        "rank72hChange": rank % 5 - 2,
+        "miniApp": {
+            "id": app_id,
+            "shortId": f"s{app_id}",
+            "name": f"App {app_id}",
+            "domain": f"{app_id}.example",
+            "homeUrl": f"https://{app_id}.example",
+            "iconUrl": None,
+            "supportsNotifications": rank % 2 == 0,
+            "primaryCategory": "games" if rank % 2 else "social",
+            "author": {"fid": 1000 + rank, "username": f"user{rank}", "displayName": f"User {rank}",
+                       "followerCount": rank * 10, "followingCount": rank},
+            **miniapp,
+        },
+    }
+
+
+@pytest.fixture
+def pg():
+    """A psycopg2 connection whose search_path is a fresh schema with the ranking tables."""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL not set")
+    psycopg2 = pytest.importorskip("psycopg2")
+    conn = psycopg2.connect(TEST_DATABASE_URL)
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    cursor = conn.cursor()
+    cursor.execute(f"CREATE SCHEMA {schema}")
+    cursor.execute(f"SET search_path TO {schema}")
+    scripts = [os.path.join(ROOT, "tests", "ranking_schema.sql"), os.path.join(ROOT, "miniapp_rankings_30d.sql")]
+    # 026 (dashboard_snapshot) needs the e-mail and lottery tables, which these tests do not use
+    migrations = [p for p in sorted(glob.glob(os.path.join(ROOT, "migrations", "02*.sql"))) if "_dashboard_" not in p]
+    for path in scripts + migrations:
+        with open(path) as f:
+            cursor.execute(f.read())
+    conn.commit()
+    try:
+        yield conn
+    finally:
+        conn.rollback()
+        cursor.execute(f"DROP SCHEMA {schema} CASCADE")
+        conn.commit()
+        conn.close()
@@ -0,0 +1,73 @@
+-- Ranking tables as they existed before migrations/020; the pg fixture in
+-- conftest.py applies miniapp_rankings_30d.sql and migrations 020+ on top.
+CREATE TABLE miniapps (
+    id VARCHAR(64) PRIMARY KEY,
+    short_id TEXT,
+    name TEXT NOT NULL,
+    domain TEXT,
+    home_url TEXT,
+    icon_url TEXT,
+    image_url TEXT,
+    splash_image_url TEXT,
+    splash_background_color TEXT,
+    button_title TEXT,
+    supports_notifications BOOLEAN,
+    primary_category TEXT,
+    author_fid BIGINT,
+    author_username TEXT,
+    author_display_name TEXT,
+    author_follower_count INTEGER,
+    author_following_count INTEGER,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE TABLE miniapp_rankings (
+    id SERIAL,
+    miniapp_id VARCHAR(64) NOT NULL,
+    ranking_date DATE NOT NULL,
+    rank INTEGER NOT NULL,
+    rank_72h_change INTEGER,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (miniapp_id, ranking_date)
+);
+
+CREATE TABLE ranking_snapshots (
+    id SERIAL,
+    snapshot_date DATE PRIMARY KEY,
+    total_miniapps INTEGER,
+    raw_json TEXT NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE TABLE miniapp_statistics (
+    id SERIAL,
+    miniapp_id VARCHAR(64) NOT NULL,
+    stat_date DATE NOT NULL,
+    current_rank INTEGER,
+    rank_24h_change INTEGER,
+    rank_72h_change INTEGER,
+    rank_7d_change INTEGER,
+    rank_30d_change INTEGER,
+    total_rankings INTEGER,
+    avg_rank NUMERIC,
+    best_rank INTEGER,
+    worst_rank INTEGER,
+    PRIMARY KEY (miniapp_id, stat_date)
+);
+
+CREATE TABLE miniapp_rankings_24h (
+    miniapp_id VARCHAR(64) NOT NULL,
+    ranking_date DATE NOT NULL,
+    rank INTEGER NOT NULL,
+    rank_24h_change INTEGER,
+    PRIMARY KEY (miniapp_id, ranking_date)
+);
+
+CREATE TABLE miniapp_rankings_weekly (
+    miniapp_id VARCHAR(64) NOT NULL,
+    ranking_date DATE NOT NULL,
+    rank INTEGER NOT NULL,
+    rank_7d_change INTEGER,
+    PRIMARY KEY (miniapp_id, ranking_date)
+);
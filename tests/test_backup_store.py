@@ -0,0 +1,76 @@
+import json
+import os
+import zlib
+
+import pytest
+
+from backup_store import (
+    BackupStoreError, disk_usage, get_object, get_snapshot, import_json_backups, list_days, put_object,
+    put_snapshot,
+)
+from conftest import ranking_entry
+
+
+def _day(*app_ids, **miniapp):
+    return [ranking_entry(rank, app_id, **miniapp) for rank, app_id in enumerate(app_ids, 1)]
+
+
+def test_snapshot_round_trip(tmp_path):
+    data = _day("a", "b")
+    data[0]["miniApp"]["viewerContext"] = {"favorited": True}
+    data[1]["miniApp"]["author"] = None
+    data.append({"rank": 3})
+    put_snapshot(data, "2025-07-25", str(tmp_path))
+
+    assert get_snapshot("2025-07-25", str(tmp_path)) == data
+    assert list_days(str(tmp_path)) == ["2025-07-25"]
+
+
+def test_repeated_records_are_stored_once(tmp_path):
+    store = str(tmp_path)
+    assert put_snapshot(_day("a", "b"), "2025-07-25", store) == (4, 0)
+    _, objects, count = disk_usage(store)
+
+    # Same apps on new ranks: only the manifest is new
+    data = _day("a", "b")
+    for entry in data:
+        entry["rank"] += 10
+    assert put_snapshot(data, "2025-07-26", store) == (0, 4)
+    assert disk_usage(store)[1:] == (objects, count)
+
+    # A follower count change stores a new author record, not a new app record
+    data[0]["miniApp"]["author"]["followerCount"] += 1
+    assert put_snapshot(data, "2025-07-27", store) == (1, 3)
+    assert get_snapshot("2025-07-27", store) == data
+
+
+def test_viewer_state_does_not_duplicate_records(tmp_path):
+    store = str(tmp_path)
+    put_snapshot(_day("a"), "2025-07-25", store)
+    assert put_snapshot(_day("a", viewerContext={"favorited": True}), "2025-07-26", store) == (0, 2)
+
+
+def test_corrupt_and_missing_data_raise(tmp_path):
+    store = str(tmp_path)
+    object_hash, _ = put_object({"x": 1}, store)
+    assert get_object(object_hash, store) == {"x": 1}
+    path = os.path.join(store, "objects", object_hash[:2], f"{object_hash}.z")
+    with open(path, "wb") as f:
+        f.write(zlib.compress(b'{"x":2}'))
+
+    with pytest.raises(BackupStoreError):
+        get_object(object_hash, store)
+    with pytest.raises(BackupStoreError):
+        get_snapshot("2025-07-25", store)
+
+
+def test_import_json_backups(tmp_path):
+    json_dir = tmp_path / "json"
+    json_dir.mkdir()
+    (json_dir / "top_miniapps_2025-07-25.json").write_text(json.dumps(_day("a")))
+    (json_dir / "top_miniapps_2025-07-26.json").write_text(json.dumps({"snapshotDate": "2025-07-26", "miniapps": _day("b")}))
+    (json_dir / "top_miniapps.json").write_text("[]")
+    store = str(tmp_path / "store")
+
+    assert import_json_backups(str(json_dir), store) == 2
+    assert get_snapshot("2025-07-26", store) == _day("b")
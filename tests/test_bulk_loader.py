@@ -0,0 +1,100 @@
+from datetime import date, timedelta
+
+from bulk_loader import BulkLoader, _RowStream, miniapp_row
+from conftest import ranking_entry
+from rank_derivation import derive_changes
+from running_aggregates import RANKINGS_SOURCE, refresh_day
+
+DAY = date(2025, 7, 25)
+
+
+def _load(conn, data, day=DAY):
+    loader = BulkLoader(conn.cursor())
+    loader.load(data, day)
+    conn.commit()
+    return loader
+
+
+def _day(*app_ids, **miniapp):
+    return [ranking_entry(rank, app_id, **miniapp) for rank, app_id in enumerate(app_ids, 1)]
+
+
+def test_copy_text_escapes_values():
+    stream = _RowStream([("a\tb", None, True, "line\nbreak\\")])
+    assert stream.read() == "a\\tb\t\\N\tt\tline\\nbreak\\\\\n"
+    assert stream.count == 1
+
+
+def test_meta_hash_ignores_ranks_but_not_metadata():
+    entry = ranking_entry(1, "a")
+    assert miniapp_row(entry["miniApp"])[-1] == miniapp_row(ranking_entry(5, "a", author=entry["miniApp"]["author"])["miniApp"])[-1]
+    assert miniapp_row(entry["miniApp"])[-1] != miniapp_row(ranking_entry(1, "a", name="Renamed")["miniApp"])[-1]
+
+
+def test_first_load_writes_every_row(pg):
+    loader = _load(pg, _day("a", "b", "c"))
+
+    assert loader.stats["copy miniapps"][0] == 3
+    assert loader.stats["merge miniapps"][0] == 3
+    assert loader.stats["merge rankings"][0] == 3
+    assert loader.skipped == {"merge miniapps": 0, "merge rankings": 0}
+
+
+def test_unchanged_rows_are_not_rewritten(pg):
+    _load(pg, _day("a", "b", "c"))
+    loader = _load(pg, _day("a", "b", "c"))
+
+    assert loader.stats["merge miniapps"][0] == 0
+    assert loader.stats["merge rankings"][0] == 0
+    assert loader.skipped == {"merge miniapps": 3, "merge rankings": 3}
+
+
+def test_only_changed_rows_are_written(pg):
+    data = _day("a", "b", "c")
+    _load(pg, data)
+    data[0]["miniApp"]["name"] = "Renamed"
+    data[1]["rank"], data[2]["rank"] = 3, 2
+    loader = _load(pg, data)
+
+    # a was renamed; b and c swapped ranks
+    assert loader.stats["merge miniapps"][0] == 1
+    assert loader.stats["merge rankings"][0] == 2
+    cursor = pg.cursor()
+    cursor.execute("SELECT miniapp_id, rank FROM miniapp_rankings ORDER BY rank")
+    assert cursor.fetchall() == [("a", 1), ("c", 2), ("b", 3)]
+    cursor.execute("SELECT name FROM miniapps WHERE id = 'a'")
+    assert cursor.fetchone() == ("Renamed",)
+
+
+def test_app_repeated_across_pages_is_merged_once(pg):
+    data = _day("a", "b") + [ranking_entry(3, "a")]
+    loader = _load(pg, data)
+
+    assert loader.stats["copy rankings"][0] == 3
+    assert loader.stats["merge rankings"][0] == 2
+    cursor = pg.cursor()
+    cursor.execute("SELECT rank FROM miniapp_rankings WHERE miniapp_id = 'a'")
+    assert cursor.fetchall() == [(1,)]
+
+
+def test_statistics_store_previous_minus_current(pg):
+    _load(pg, _day("a", "b", "c"), DAY - timedelta(days=1))
+    _load(pg, _day("c", "a", "b"))
+    cursor = pg.cursor()
+    derive_changes(cursor, DAY - timedelta(days=1), DAY)
+    refresh_day(cursor, DAY - timedelta(days=1), RANKINGS_SOURCE)
+    refresh_day(cursor, DAY, RANKINGS_SOURCE)
+    loader = BulkLoader(cursor)
+    loader.merge_statistics(DAY)
+    pg.commit()
+
+    assert loader.stats["merge statistics"][0] == 3
+    cursor.execute("""
+        SELECT miniapp_id, current_rank, rank_24h_change, total_rankings, best_rank, worst_rank
+        FROM miniapp_statistics WHERE stat_date = %s ORDER BY current_rank
+    """, (DAY,))
+    # c climbed from 3 to 1: positive
+    assert cursor.fetchall() == [("c", 1, 2, 2, 1, 3), ("a", 2, -1, 2, 1, 2), ("b", 3, -1, 2, 2, 3)]
+
+    loader.merge_statistics(DAY)
+    assert loader.skipped["merge statistics"] == 3
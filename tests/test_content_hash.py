@@ -0,0 +1,45 @@
+import json
+
+from conftest import ranking_entry
+from content_hash import encode_payload, normalize, payload_hash, row_hash
+from json_codec import dumps
+
+
+def test_payload_hash_ignores_key_order():
+    data = [ranking_entry(1, "a"), ranking_entry(2, "b")]
+    reordered = [dict(reversed(list(entry.items()))) for entry in data]
+
+    assert payload_hash(reordered) == payload_hash(data)
+    assert payload_hash(data[::-1]) != payload_hash(data)
+
+
+def test_payload_hash_sees_every_change():
+    data = [ranking_entry(1, "a"), ranking_entry(2, "b")]
+    changed = json.loads(json.dumps(data))
+    changed[1]["miniApp"]["author"]["followerCount"] += 1
+
+    assert payload_hash(changed) != payload_hash(data)
+
+
+def test_encode_payload_serializes_once():
+    data = [ranking_entry(1, "a", viewerContext={"favorited": True}), ranking_entry(2, "b")]
+    payload, records, digest_hex = encode_payload(data)
+
+    assert payload == dumps(data, sort_keys=True)
+    assert records == [dumps(entry, sort_keys=True) for entry in data]
+    assert json.loads(payload) == data
+    assert digest_hex == payload_hash(data)
+    assert encode_payload([])[0] == b"[]"
+
+
+def test_normalize_drops_viewer_state():
+    entry = ranking_entry(1, "a", viewerContext={"favorited": True})
+
+    assert b"viewerContext" not in normalize(entry)
+    assert normalize(entry) == normalize(ranking_entry(1, "a"))
+
+
+def test_row_hash_includes_column_names():
+    assert row_hash(("a", "b"), (1, 2)) == row_hash(("b", "a"), (2, 1))
+    assert row_hash(("a", "b"), (1, 2)) != row_hash(("a", "c"), (1, 2))
+    assert row_hash(("a",), (None,)) != row_hash(("a",), ("",))
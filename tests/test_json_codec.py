@@ -0,0 +1,49 @@
+from datetime import date
+
+import pytest
+
+import json_codec
+from conftest import ranking_entry
+
+PAYLOADS = [
+    [ranking_entry(1, "a", name="Ünïcode ✓ \"quoted\"\n", tags=["x", "y"], iconUrl=None)],
+    {"z": 1, "a": [True, False, None], "nested": {"b": -5, "a": " "}},
+    [],
+]
+
+
+@pytest.mark.parametrize("value", PAYLOADS)
+@pytest.mark.parametrize("sort_keys", [False, True])
+def test_fallback_is_byte_identical(monkeypatch, value, sort_keys):
+    pytest.importorskip("orjson")
+    fast = json_codec.dumps(value, sort_keys=sort_keys)
+    monkeypatch.setattr(json_codec, "orjson", None)
+
+    assert json_codec.dumps(value, sort_keys=sort_keys) == fast
+    assert json_codec.loads(fast) == value
+
+
+def test_dates_are_written_as_strings():
+    assert json_codec.loads(json_codec.dumps({"day": date(2025, 7, 25)})) == {"day": "2025-07-25"}
+
+
+def test_pretty_output_parses_back():
+    data = PAYLOADS[0]
+    pretty = json_codec.dumps(data, pretty=True)
+
+    assert b"\n  " in pretty
+    assert json_codec.loads(pretty) == data
+
+
+def test_write_and_read_file(tmp_path):
+    path = str(tmp_path / "data.json")
+    data = json_codec.dumps(PAYLOADS[1])
+
+    assert json_codec.write_bytes(path, data) == len(data)
+    assert json_codec.read_file(path) == PAYLOADS[1]
+    assert list(tmp_path.iterdir()) == [tmp_path / "data.json"]
+
+
+def test_invalid_json_raises_value_error():
+    with pytest.raises(ValueError):
+        json_codec.loads(b"{not json")
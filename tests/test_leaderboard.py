@@ -0,0 +1,70 @@
+from datetime import date
+
+import pytest
+
+import leaderboard
+from leaderboard import (
+    LEADERBOARD_VERSION, LeaderboardError, build_leaderboard, read_leaderboard, write_leaderboard,
+)
+
+DAY = date(2025, 7, 25)
+
+
+class FakeCursor:
+    """Returns the given DAY_ROWS rows for any query."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def execute(self, sql, params=None):
+        self.params = params
+
+    def fetchall(self):
+        return self.rows
+
+
+def _row(app_id, rank, change_24h, change_72h=0, category="games"):
+    # miniapp_id, name, username, domain, category, rank, 24h, 72h, 7d, 30d, avg, best, worst
+    return (app_id, f"App {app_id}", f"user_{app_id}", f"{app_id}.example", category, rank,
+            change_24h, change_72h, None, None, rank + 0.5, rank, rank + 3)
+
+
+def test_build_leaderboard():
+    rows = [
+        _row("a", 1, 0), _row("b", 2, 5), _row("c", 3, -4), _row("d", 4, 5),
+        _row("e", 11, 7, category=None), _row("f", 12, -9, change_72h=2),
+    ]
+    doc = build_leaderboard(FakeCursor(rows), DAY, "run-1")
+
+    assert doc["version"] == LEADERBOARD_VERSION
+    assert (doc["run_id"], doc["day"], doc["apps"]) == ("run-1", "2025-07-25", 6)
+    assert [app["id"] for app in doc["top_overall"]] == ["a", "b", "c", "d", "e", "f"]
+    assert doc["top_overall"][0]["avg_rank"] == 1.5
+    # Gainers only hold positive changes, ties keep the better rank
+    window = doc["windows"]["24h"]
+    assert [(m["id"], m["change"]) for m in window["gainers"]] == [("e", 7), ("b", 5), ("d", 5)]
+    assert [(m["id"], m["change"]) for m in window["losers"]] == [("f", -9), ("c", -4)]
+    assert doc["windows"]["72h"]["losers"] == []
+    assert doc["windows"]["7d"] == {"gainers": [], "losers": []}
+    assert [m["id"] for m in doc["rising_stars"]] == ["e"]
+    assert [m["id"] for m in doc["categories"]["games"]] == ["a", "b", "c", "d", "f"]
+    assert [m["id"] for m in doc["categories"]["other"]] == ["e"]
+
+
+def test_local_copy_round_trip(tmp_path):
+    first = build_leaderboard(FakeCursor([_row("a", 1, 2)]), DAY, "20250725T060000Z-aaaaaaaa")
+    latest = build_leaderboard(FakeCursor([_row("b", 1, 3)]), DAY, "20250725T120000Z-bbbbbbbb")
+    for doc in (latest, first):
+        write_leaderboard(doc, str(tmp_path))
+
+    assert read_leaderboard(DAY, leaderboard_dir=str(tmp_path)) == latest
+    assert read_leaderboard(DAY, first["run_id"], str(tmp_path)) == first
+    with pytest.raises(LeaderboardError):
+        read_leaderboard(date(2025, 7, 26), leaderboard_dir=str(tmp_path))
+
+
+def test_other_versions_are_refused(tmp_path, monkeypatch):
+    write_leaderboard(build_leaderboard(FakeCursor([]), DAY, "run-1"), str(tmp_path))
+    monkeypatch.setattr(leaderboard, "LEADERBOARD_VERSION", LEADERBOARD_VERSION + 1)
+    with pytest.raises(LeaderboardError):
+        read_leaderboard(DAY, "run-1", str(tmp_path))
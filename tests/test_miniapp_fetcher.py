@@ -0,0 +1,112 @@
+import asyncio
+import json
+
+import aiohttp
+import pytest
+
+import miniapp_fetcher
+from conftest import ranking_entry
+from miniapp_fetcher import BACKOFF_CAP, MAX_RETRIES, FetchError, _backoff_delay, fetch_page, iter_pages
+
+
+class _Response:
+    def __init__(self, status, body=b"", headers=None):
+        self.status = status
+        self._body = body
+        self.headers = headers or {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def read(self):
+        return self._body
+
+
+class _Session:
+    """Answers get() from a list of responses or exceptions, recording the params."""
+
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.requests = []
+
+    def get(self, url, params=None):
+        self.requests.append(params)
+        answer = self.answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    delays = []
+    monkeypatch.setattr(miniapp_fetcher, "_backoff_delay", lambda attempt, retry_after=None: delays.append(retry_after) or 0)
+    return delays
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_transient_errors_are_retried(no_backoff):
+    session = _Session([
+        _Response(503),
+        aiohttp.ClientConnectionError("reset"),
+        _Response(429, headers={"Retry-After": "2"}),
+        _Response(200, b"ok"),
+    ])
+
+    assert _run(fetch_page(session, "c1")) == b"ok"
+    assert len(session.requests) == 4
+    assert session.requests[0]["cursor"] == "c1"
+    assert no_backoff == [None, None, "2"]
+
+
+def test_client_errors_fail_at_once():
+    session = _Session([_Response(404, b"not found")])
+
+    with pytest.raises(FetchError, match="404"):
+        _run(fetch_page(session))
+    assert len(session.requests) == 1
+
+
+def test_gives_up_after_max_retries():
+    session = _Session([asyncio.TimeoutError()] * (MAX_RETRIES + 1))
+
+    with pytest.raises(FetchError, match="Giving up"):
+        _run(fetch_page(session))
+    assert len(session.requests) == MAX_RETRIES + 1
+
+
+def test_backoff_honors_retry_after_up_to_the_cap():
+    assert _backoff_delay(0, "3") == 3
+    assert _backoff_delay(0, "600") == BACKOFF_CAP
+    for attempt in range(8):
+        assert 0 <= _backoff_delay(attempt, "soon") <= BACKOFF_CAP
+
+
+def _body(entries, cursor=None, raw_cursor=None):
+    body = {"result": {"miniApps": entries}}
+    if cursor:
+        body["next"] = {"cursor": cursor}
+    data = json.dumps(body).encode()
+    # A cursor the fast peek cannot read; the decoded one must win
+    return data.replace(b'"next": {', b'"next": {"x": 1, ') if raw_cursor else data
+
+
+def test_pages_are_walked_in_order():
+    pages = [
+        _body([ranking_entry(1, "a")], "p2"),
+        _body([ranking_entry(2, "b")], "p3", raw_cursor=True),
+        _body([ranking_entry(3, "c")]),
+    ]
+    session = _Session([_Response(200, body) for body in pages])
+
+    async def walk():
+        return [entry["miniApp"]["id"] async for page in iter_pages(session, limit=1) for entry in page]
+
+    assert _run(walk()) == ["a", "b", "c"]
+    assert [params.get("cursor") for params in session.requests] == [None, "p2", "p3"]
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from conftest import ranking_entry
+from miniapp_schema import MalformedPageError, decode_entries, decode_page, snapshot_entries
+
+
+def _page(entries, cursor=None, wrapped=True):
+    body = {"miniApps": entries}
+    if wrapped:
+        body = {"result": body}
+    if cursor is not None:
+        body["next"] = {"cursor": cursor}
+    return json.dumps(body).encode()
+
+
+def test_decode_page_in_both_shapes():
+    entries = [ranking_entry(1, "a"), ranking_entry(2, "b")]
+
+    decoded, cursor = decode_page(_page(entries, "c2"))
+    assert cursor == "c2"
+    assert [(e.rank, e.miniapp.id, e.miniapp.author.fid) for e in decoded] == [(1, "a", 1001), (2, "b", 1002)]
+    assert decode_page(_page(entries, wrapped=False))[1] is None
+
+
+def test_metadata_row_follows_the_api_fields():
+    entry = decode_entries([ranking_entry(1, "a", iconUrl="https://a.example/i.png")])[0]
+
+    assert entry.miniapp.metadata_row() == (
+        "a", "sa", "App a", "a.example", "https://a.example", "https://a.example/i.png", None, None, None, None,
+        False, "games", 1001, "user1", "User 1", 10, 1,
+    )
+
+
+def test_missing_author_and_flags_are_defaults():
+    entry = decode_entries([ranking_entry(1, "a", author=None, supportsNotifications=None)])[0]
+
+    assert entry.miniapp.supports_notifications is False
+    assert entry.miniapp.author.fid is None
+
+
+@pytest.mark.parametrize("change", [
+    {"rank": None},
+    {"rank": 0},
+    {"rank": True},
+    {"rank": "1"},
+    {"rank72hChange": 1.5},
+    {"miniApp": None},
+])
+def test_malformed_entries_are_rejected(change):
+    with pytest.raises(MalformedPageError):
+        decode_entries([{**ranking_entry(1, "a"), **change}])
+
+
+@pytest.mark.parametrize("miniapp", [{"id": None}, {"name": 5}, {"author": "someone"}, {"author": {"fid": "1"}}])
+def test_malformed_miniapps_are_rejected(miniapp):
+    with pytest.raises(MalformedPageError):
+        decode_entries([ranking_entry(1, "a", **miniapp)])
+
+
+@pytest.mark.parametrize("body", [b"not json", b"[]", b'{"data": []}', b'{"miniApps": {}}', b'{"miniApps": [], "next": {"cursor": 5}}'])
+def test_malformed_pages_are_rejected(body):
+    with pytest.raises(MalformedPageError):
+        decode_page(body)
+
+
+def test_snapshot_entries_accepts_every_stored_shape():
+    entries = [ranking_entry(1, "a")]
+
+    assert snapshot_entries(entries) is entries
+    assert snapshot_entries({"snapshotDate": "2025-07-25", "miniapps": entries}) is entries
+    assert snapshot_entries(json.loads(_page(entries))) == entries
+    with pytest.raises(ValueError):
+        snapshot_entries({"data": entries})
@@ -0,0 +1,36 @@
+import pytest
+
+from object_store import LocalObjectStore, ObjectStoreError, open_store
+
+
+def test_put_get_discard(tmp_path):
+    store = LocalObjectStore(str(tmp_path))
+
+    store.put("snapshots/2025/a.bin", b"payload")
+    assert store.exists("snapshots/2025/a.bin")
+    assert store.get("snapshots/2025/a.bin") == b"payload"
+    assert (tmp_path / "snapshots" / "2025" / "a.bin").read_bytes() == b"payload"
+
+    store.put("snapshots/2025/a.bin", b"replaced")
+    assert store.get("snapshots/2025/a.bin") == b"replaced"
+
+    store.discard("snapshots/2025/a.bin")
+    store.discard("snapshots/2025/a.bin")
+    assert not store.exists("snapshots/2025/a.bin")
+    with pytest.raises(ObjectStoreError):
+        store.get("snapshots/2025/a.bin")
+
+
+def test_open_store(tmp_path):
+    assert open_store(str(tmp_path)).root == str(tmp_path)
+    assert open_store(f"file://{tmp_path}").root == str(tmp_path)
+    with pytest.raises(ObjectStoreError):
+        open_store("ftp://example.com/objects")
+
+
+def test_local_store_is_not_durable_unless_configured(tmp_path, monkeypatch):
+    monkeypatch.setattr("object_store.OBJECT_STORE_DURABLE", False)
+    assert not LocalObjectStore(str(tmp_path)).durable
+    assert LocalObjectStore(str(tmp_path), durable=True).durable
+    monkeypatch.setattr("object_store.OBJECT_STORE_DURABLE", True)
+    assert LocalObjectStore(str(tmp_path)).durable
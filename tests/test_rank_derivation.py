@@ -0,0 +1,72 @@
+from datetime import date, timedelta
+
+from rank_derivation import derive_changes
+
+DAY = date(2025, 7, 25)
+
+
+def _rankings(cursor, day, ranks):
+    for app_id, rank in ranks.items():
+        cursor.execute(
+            "INSERT INTO miniapp_rankings (miniapp_id, ranking_date, rank) VALUES (%s, %s, %s)",
+            (app_id, day, rank)
+        )
+
+
+def _changes(cursor, table, column, day=DAY):
+    cursor.execute(
+        f"SELECT miniapp_id, {column}, window_days FROM {table} WHERE ranking_date = %s ORDER BY miniapp_id", (day,)
+    )
+    return cursor.fetchall()
+
+
+def test_exact_windows_store_current_minus_previous(pg):
+    cursor = pg.cursor()
+    _rankings(cursor, DAY - timedelta(days=30), {"a": 9})
+    _rankings(cursor, DAY - timedelta(days=7), {"a": 6, "b": 1})
+    _rankings(cursor, DAY - timedelta(days=1), {"a": 4, "b": 2})
+    _rankings(cursor, DAY, {"a": 1, "b": 3, "c": 2})
+
+    written = derive_changes(cursor, DAY, DAY)
+
+    assert written == {"miniapp_rankings_24h": 3, "miniapp_rankings_weekly": 3, "miniapp_rankings_30d": 3}
+    assert _changes(cursor, "miniapp_rankings_24h", "rank_24h_change") == [("a", -3, 1), ("b", 1, 1), ("c", None, None)]
+    assert _changes(cursor, "miniapp_rankings_weekly", "rank_7d_change") == [("a", -5, 7), ("b", 2, 7), ("c", None, None)]
+    assert _changes(cursor, "miniapp_rankings_30d", "rank_30d_change") == [("a", -8, 30), ("b", None, None), ("c", None, None)]
+
+
+def test_missing_day_falls_back_within_tolerance(pg):
+    cursor = pg.cursor()
+    # No run on DAY - 1
+    _rankings(cursor, DAY - timedelta(days=2), {"a": 5})
+    _rankings(cursor, DAY, {"a": 2})
+
+    derive_changes(cursor, DAY, DAY, tolerance=1)
+    assert _changes(cursor, "miniapp_rankings_24h", "rank_24h_change") == [("a", -3, 2)]
+
+    derive_changes(cursor, DAY, DAY, tolerance=0)
+    assert _changes(cursor, "miniapp_rankings_24h", "rank_24h_change") == [("a", None, None)]
+
+
+def test_nearest_run_decides_even_if_the_app_was_not_in_it(pg):
+    cursor = pg.cursor()
+    _rankings(cursor, DAY - timedelta(days=2), {"a": 5, "b": 1})
+    _rankings(cursor, DAY - timedelta(days=1), {"b": 2})
+    _rankings(cursor, DAY, {"a": 2, "b": 1})
+
+    derive_changes(cursor, DAY, DAY, tolerance=1)
+
+    # a was unranked on the last run, so it has no 24h change instead of one from two days ago
+    assert _changes(cursor, "miniapp_rankings_24h", "rank_24h_change") == [("a", None, None), ("b", -1, 1)]
+
+
+def test_rerun_writes_only_changed_rows(pg):
+    cursor = pg.cursor()
+    _rankings(cursor, DAY - timedelta(days=1), {"a": 3, "b": 1})
+    _rankings(cursor, DAY, {"a": 1, "b": 2})
+    derive_changes(cursor, DAY - timedelta(days=1), DAY)
+
+    assert derive_changes(cursor, DAY - timedelta(days=1), DAY)["miniapp_rankings_24h"] == 0
+    cursor.execute("UPDATE miniapp_rankings SET rank = 4 WHERE miniapp_id = 'b' AND ranking_date = %s", (DAY,))
+    assert derive_changes(cursor, DAY, DAY)["miniapp_rankings_24h"] == 1
+    assert _changes(cursor, "miniapp_rankings_24h", "rank_24h_change") == [("a", -2, 1), ("b", 3, 1)]
@@ -0,0 +1,85 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from rank_engine import NOT_RANKED, RankMatrix
+
+START = date(2025, 7, 1)
+
+
+def _day(n):
+    return START + timedelta(days=n)
+
+
+def test_from_rows_places_ranks_and_ignores_outsiders():
+    matrix = RankMatrix.from_rows(
+        [("a", _day(0), 3), ("b", _day(2), 1), ("a", _day(2), 2), ("x", _day(1), 9), ("b", _day(1), None)],
+        app_ids=["a", "b"],
+    )
+
+    assert matrix.start_date == _day(0)
+    assert matrix.end_date == _day(2)
+    assert matrix.ranks.tolist() == [[3, NOT_RANKED, 2], [NOT_RANKED, NOT_RANKED, 1]]
+    with pytest.raises(KeyError):
+        matrix.column(_day(3))
+
+
+def test_changes_are_previous_minus_current():
+    matrix = RankMatrix.from_rows([
+        ("a", _day(0), 5), ("a", _day(1), 2),
+        ("b", _day(0), 1), ("b", _day(1), 4),
+        ("c", _day(1), 3),
+    ])
+    changes = matrix.rank_changes(_day(1), windows=(1,))[1]
+
+    assert changes.tolist() == [3, -3, None]
+
+
+def test_window_without_snapshot_uses_tolerance():
+    # No run on day 5, so the 1-day window of day 6 needs the day before
+    rows = [(app, _day(d), rank) for d in (0, 4, 6) for app, rank in (("a", 2 + d), ("b", 1))]
+    matrix = RankMatrix.from_rows(rows)
+
+    assert matrix.window_lengths(_day(6), windows=(1, 2), tolerance=0) == {1: None, 2: 2}
+    assert matrix.window_lengths(_day(6), windows=(1, 2), tolerance=1) == {1: 2, 2: 2}
+    assert matrix.rank_changes(_day(6), windows=(1,), tolerance=1)[1].tolist() == [-2, 0]
+    assert matrix.rank_changes(_day(6), windows=(1,), tolerance=0)[1].tolist() == [None, None]
+
+
+def test_snapshot_days_decide_for_partial_matrices():
+    # Only "a" is loaded; the run of day 1 exists although "a" was not ranked then
+    matrix = RankMatrix.from_rows(
+        [("a", _day(0), 4), ("a", _day(2), 1)], snapshot_days=[_day(0), _day(1), _day(2)]
+    )
+
+    assert matrix.window_lengths(_day(2), windows=(1,), tolerance=1) == {1: 1}
+    assert matrix.rank_changes(_day(2), windows=(1,), tolerance=1)[1].tolist() == [None]
+
+
+def test_summarize_matches_a_direct_computation():
+    rng = np.random.default_rng(3)
+    ranks = rng.integers(0, 6, size=(40, 12)).astype(np.int32)
+    matrix = RankMatrix([f"app{i}" for i in range(40)], START, ranks)
+    summary = matrix.summarize(_day(9), windows=(1, 7))
+
+    for i, row in enumerate(ranks[:, :10].tolist()):
+        ranked = [r for r in row if r != NOT_RANKED]
+        if ranked:
+            assert summary.avg_rank[i] == pytest.approx(sum(ranked) / len(ranked))
+            assert summary.best_rank[i] == min(ranked)
+        else:
+            assert summary.avg_rank.mask[i] and summary.best_rank.mask[i]
+        current = row[9]
+        for window in (1, 7):
+            past = row[9 - window]
+            expected = past - current if past and current and ranks[:, 9 - window].any() else None
+            assert summary.changes[window].tolist()[i] == expected
+
+
+def test_set_column_writes_given_apps():
+    matrix = RankMatrix.empty(["a", "b", "c"], START, _day(1))
+    matrix.set_column(_day(1), ["c", "a"], [1, 2])
+
+    assert matrix.ranks[:, 1].tolist() == [2, NOT_RANKED, 1]
+    assert matrix.rows_for(["b", "zz"]).tolist() == [1, -1]
@@ -0,0 +1,82 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+import rank_store
+from rank_engine import NOT_RANKED
+from rank_store import RankStoreError, app_metadata, append_day, open_matrix
+
+START = date(2025, 7, 1)
+
+
+def test_append_then_reopen(tmp_path):
+    store = str(tmp_path)
+    assert append_day(START, [("a", 1), ("b", 2)], store, {"a": ("App A", "games")}) == 2
+    assert append_day(START + timedelta(days=1), [("b", 1), ("c", 2), ("a", 3)], store) == 1
+
+    matrix = open_matrix(store)
+    assert matrix.app_ids == ["a", "b", "c"]
+    assert matrix.start_date == START
+    assert matrix.end_date == START + timedelta(days=1)
+    assert matrix.ranks.tolist() == [[1, 3], [2, 1], [NOT_RANKED, 2]]
+    assert matrix.snapshots.tolist() == [True, True]
+
+    metadata = app_metadata(store)
+    assert metadata["name"] == ["App A", None, None]
+    assert metadata["categories"] == ["games"]
+    assert metadata["category"] == [0, -1, -1]
+
+
+def test_reappend_replaces_the_day(tmp_path):
+    store = str(tmp_path)
+    append_day(START, [("a", 1), ("b", 2)], store)
+    append_day(START, [("b", 1)], store)
+
+    assert open_matrix(store).ranks.tolist() == [[NOT_RANKED], [1]]
+
+
+def test_skipped_days_stay_unranked(tmp_path):
+    store = str(tmp_path)
+    append_day(START, [("a", 1)], store)
+    append_day(START + timedelta(days=3), [("a", 2)], store)
+    # An empty ranking stores the day but records no run
+    append_day(START + timedelta(days=4), [], store)
+
+    matrix = open_matrix(store)
+    assert matrix.ranks.tolist() == [[1, NOT_RANKED, NOT_RANKED, 2, NOT_RANKED]]
+    assert matrix.snapshots.tolist() == [True, False, False, True, False]
+
+
+def test_refuses_days_before_the_start(tmp_path):
+    append_day(START, [("a", 1)], str(tmp_path))
+    with pytest.raises(RankStoreError):
+        append_day(START - timedelta(days=1), [("a", 1)], str(tmp_path))
+
+
+def test_empty_store(tmp_path):
+    with pytest.raises(RankStoreError):
+        open_matrix(str(tmp_path))
+
+
+def test_capacity_growth_keeps_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(rank_store, "INITIAL_CAPACITY", 2)
+    store = str(tmp_path)
+    append_day(START, [("a", 1), ("b", 2)], store)
+    append_day(START + timedelta(days=1), [(f"app{i}", i + 1) for i in range(5)] + [("a", 9)], store)
+
+    matrix = open_matrix(store)
+    assert matrix.ranks.shape == (7, 2)
+    assert matrix.ranks[:2].tolist() == [[1, 9], [2, NOT_RANKED]]
+    assert matrix.ranks[2:, 1].tolist() == [1, 2, 3, 4, 5]
+
+
+def test_large_ranks_widen_the_dtype(tmp_path):
+    store = str(tmp_path)
+    append_day(START, [("a", 1), ("b", 2)], store)
+    assert open_matrix(store).ranks.dtype == np.uint16
+    append_day(START + timedelta(days=1), [("a", 70_000), ("b", 3)], store)
+
+    matrix = open_matrix(store)
+    assert matrix.ranks.dtype == np.uint32
+    assert matrix.ranks.tolist() == [[1, 70_000], [2, 3]]
@@ -0,0 +1,83 @@
+from datetime import date, timedelta
+
+from running_aggregates import fetch_aggregates, rebuild, refresh_day, verify
+
+DAY = date(2025, 7, 25)
+
+
+def _statistics(cursor, day, ranks):
+    cursor.execute("DELETE FROM miniapp_statistics WHERE stat_date = %s", (day,))
+    for app_id, rank in ranks.items():
+        cursor.execute(
+            "INSERT INTO miniapp_statistics (miniapp_id, stat_date, current_rank) VALUES (%s, %s, %s)",
+            (app_id, day, rank)
+        )
+
+
+def _run(cursor, day, ranks):
+    _statistics(cursor, day, ranks)
+    return refresh_day(cursor, day)
+
+
+def _aggregate(cursor, app_id):
+    cursor.execute(
+        "SELECT total_rankings, rank_sum, best_rank, worst_rank, last_rank FROM miniapp_rank_aggregates WHERE miniapp_id = %s",
+        (app_id,)
+    )
+    return cursor.fetchone()
+
+
+def test_days_fold_into_running_totals(pg):
+    cursor = pg.cursor()
+    for offset, ranks in enumerate(({"a": 3, "b": 1}, {"a": 1, "b": 2}, {"a": 2})):
+        _run(cursor, DAY + timedelta(days=offset), ranks)
+
+    assert _aggregate(cursor, "a") == (3, 6, 1, 3, 2)
+    assert _aggregate(cursor, "b") == (2, 3, 1, 2, 2)
+    assert fetch_aggregates(cursor, ["a"])["a"][1] == 1
+    assert verify(cursor) == 0
+
+
+def test_same_day_rerun_replaces_the_rank(pg):
+    cursor = pg.cursor()
+    _run(cursor, DAY, {"a": 5})
+    _run(cursor, DAY + timedelta(days=1), {"a": 2})
+
+    # The rerun's new rank replaces the day's best rank instead of adding a day
+    assert _run(cursor, DAY + timedelta(days=1), {"a": 7}) == (1, 1)
+    assert _aggregate(cursor, "a") == (2, 12, 5, 7, 7)
+    assert _run(cursor, DAY + timedelta(days=1), {"a": 7}) == (0, 0)
+    assert verify(cursor) == 0
+
+
+def test_older_days_are_skipped_until_rebuild(pg):
+    cursor = pg.cursor()
+    _run(cursor, DAY + timedelta(days=1), {"a": 4})
+    # A backfilled earlier day is not folded in; verify reports it and rebuild fixes it
+    assert _run(cursor, DAY, {"a": 1}) == (0, 0)
+    assert verify(cursor) == 1
+
+    rebuild(cursor)
+    assert _aggregate(cursor, "a") == (2, 5, 1, 4, 4)
+    assert verify(cursor) == 0
+
+
+def test_verify_and_rebuild_cover_rolled_up_weeks(pg):
+    cursor = pg.cursor()
+    cursor.execute("""
+        INSERT INTO miniapp_rank_history_weekly
+            (miniapp_id, week_start, days_ranked, rank_sum, best_rank, worst_rank, last_rank, last_seen_date)
+        VALUES ('a', '2025-06-02', 3, 30, 8, 12, 9, '2025-06-05')
+    """)
+    _statistics(cursor, DAY, {"a": 2, "b": 6})
+    rebuild(cursor)
+
+    assert _aggregate(cursor, "a") == (4, 32, 2, 12, 2)
+    assert verify(cursor) == 0
+
+    cursor.execute("UPDATE miniapp_rank_aggregates SET best_rank = 1 WHERE miniapp_id = 'b'")
+    cursor.execute("INSERT INTO miniapp_rank_aggregates (miniapp_id, total_rankings, rank_sum, best_rank, worst_rank, last_rank, last_seen_date) VALUES ('gone', 1, 1, 1, 1, 1, %s)", (DAY,))
+    assert verify(cursor) == 2
+    rebuild(cursor)
+    assert verify(cursor) == 0
+    assert _aggregate(cursor, "gone") is None
@@ -0,0 +1,124 @@
+import json
+import zlib
+from datetime import date
+
+import pytest
+
+from conftest import ranking_entry
+from object_store import LocalObjectStore
+from snapshot_archive import (
+    ArchiveError, SnapshotArchive, archive_snapshot, encode_archive, fetch_archive, store_archive,
+    verify_archive,
+)
+
+DAY = date(2025, 7, 25)
+
+
+def _write(tmp_path, data, day=DAY):
+    path = tmp_path / "day.mcol"
+    path.write_bytes(encode_archive(data, day))
+    return SnapshotArchive(str(path))
+
+
+def test_round_trip_is_lossless(tmp_path):
+    data = [ranking_entry(i, f"app{i}") for i in range(1, 30)]
+    # Fields without a typed column, a missing column, an int that only fits
+    # as JSON and a string where a column expects an int
+    data[0]["extraField"] = {"nested": [1, 2, 3]}
+    data[1]["miniApp"]["unknownKey"] = "kept"
+    del data[2]["miniApp"]["author"]
+    data[3]["miniApp"]["author"]["followerCount"] = 2 ** 70
+    data[4]["rank72hChange"] = "n/a"
+    data[5]["miniApp"]["supportsNotifications"] = 1
+
+    archive = _write(tmp_path, data)
+
+    assert archive.snapshot_date == str(DAY)
+    assert archive.rows == len(data)
+    assert archive.entries() == json.loads(json.dumps(data))
+    assert verify_archive(archive, data)
+
+
+def test_single_columns(tmp_path):
+    data = [ranking_entry(i, f"app{i}") for i in range(1, 6)]
+    archive = _write(tmp_path, data)
+
+    assert archive.column("rank") == [1, 2, 3, 4, 5]
+    assert archive.column("id") == [f"app{i}" for i in range(1, 6)]
+    # Kept in the rest column, read from the rebuilt entries
+    assert archive.column("icon_url") == [None] * 5
+    assert archive.column("home_url") == [f"https://app{i}.example" for i in range(1, 6)]
+    assert archive.column("supports_notifications") == [False, True, False, True, False]
+    with pytest.raises(ArchiveError):
+        archive.column_array("no_such_column")
+    with pytest.raises(ArchiveError):
+        archive.column("no_such_column")
+
+
+def test_verify_tells_types_apart(tmp_path):
+    data = [ranking_entry(1, "a")]
+    archive = _write(tmp_path, data)
+
+    changed = json.loads(json.dumps(data))
+    changed[0]["miniApp"]["supportsNotifications"] = 0
+    assert not verify_archive(archive, changed)
+    changed[0]["miniApp"]["supportsNotifications"] = False
+    changed[0]["rank"] = 1.0
+    assert not verify_archive(archive, changed)
+
+
+def test_smaller_than_compressed_json():
+    data = [
+        ranking_entry(
+            i, f"app-{i * 7919 % 10007:05d}",
+            iconUrl=f"https://proxy.example/?url=https%3A%2F%2Fapp{i}.example%2Ficon.png&s={i * 2654435761 % 2 ** 32:08x}",
+            splashImageUrl=f"https://app{i}.example/splash.png",
+            subtitle=f"The {i}th app",
+        )
+        for i in range(1, 251)
+    ]
+    assert len(encode_archive(data, DAY)) < len(zlib.compress(json.dumps(data).encode("utf-8")))
+
+
+def test_empty_day(tmp_path):
+    archive = _write(tmp_path, [])
+    assert archive.rows == 0
+    assert archive.entries() == []
+
+
+@pytest.mark.parametrize("payload", [
+    {"snapshotDate": "2025-07-25", "miniapps": []},
+    [{"rank": 1}],
+    [{"rank": 1, "miniApp": {"name": "no id"}}],
+    ["not an entry"],
+])
+def test_rejects_anything_but_ranking_entries(payload):
+    with pytest.raises(ArchiveError):
+        encode_archive(payload, DAY)
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "other.mcol"
+    path.write_bytes(b"MSNP\x01\x00")
+    with pytest.raises(ArchiveError):
+        SnapshotArchive(str(path))
+
+
+def test_checksum_is_checked(tmp_path):
+    store = LocalObjectStore(str(tmp_path / "objects"))
+    key, checksum = store_archive([ranking_entry(1, "a")], DAY, store)
+
+    assert fetch_archive(key, checksum, store).column("id") == ["a"]
+    with pytest.raises(ArchiveError):
+        fetch_archive(key, "0" * 64, store)
+
+
+def test_raw_json_is_kept_unless_the_store_is_durable(tmp_path):
+    data = [ranking_entry(i, f"app{i}") for i in range(1, 4)]
+
+    key, _, raw_json = archive_snapshot(data, DAY, LocalObjectStore(str(tmp_path / "local"), durable=False))
+    assert key == "snapshots/2025/top_miniapps_2025-07-25.mcol"
+    assert json.loads(raw_json) == data
+
+    _, _, raw_json = archive_snapshot(data, DAY, LocalObjectStore(str(tmp_path / "durable"), durable=True))
+    assert raw_json is None
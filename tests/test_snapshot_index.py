@@ -0,0 +1,80 @@
+import json
+from datetime import date
+
+import pytest
+
+from conftest import ranking_entry
+from snapshot_index import (
+    IndexedSnapshot, SnapshotFileError, convert_json, encode_snapshot, rank_history, snapshot_path,
+    write_snapshot,
+)
+
+DAY = date(2025, 7, 25)
+
+
+def test_round_trip(tmp_path):
+    data = [ranking_entry(i, f"app{(i * 37) % 101}") for i in range(1, 51)]
+    data[10]["rank"] = None
+    path = write_snapshot(data, DAY, str(tmp_path))
+
+    assert path == snapshot_path(DAY, str(tmp_path))
+    with IndexedSnapshot(path) as snapshot:
+        assert snapshot.snapshot_date == DAY
+        assert len(snapshot) == len(data)
+        assert snapshot.ids() == sorted(e["miniApp"]["id"] for e in data)
+        assert snapshot.entries() == data
+        for entry in data:
+            app_id = entry["miniApp"]["id"]
+            assert app_id in snapshot
+            assert snapshot.rank(app_id) == entry["rank"]
+            assert snapshot.entry(app_id) == entry
+        assert "missing" not in snapshot
+        assert snapshot.rank("missing") is None
+        assert snapshot.entry("missing") is None
+
+
+def test_empty_day(tmp_path):
+    with IndexedSnapshot(write_snapshot([], DAY, str(tmp_path))) as snapshot:
+        assert len(snapshot) == 0
+        assert snapshot.rank("app1") is None
+
+
+def test_rank_history(tmp_path):
+    write_snapshot([ranking_entry(1, "a"), ranking_entry(2, "b")], date(2025, 7, 25), str(tmp_path))
+    write_snapshot([ranking_entry(1, "b")], date(2025, 7, 27), str(tmp_path))
+
+    assert rank_history("a", date(2025, 7, 24), date(2025, 7, 28), str(tmp_path)) == [
+        (date(2025, 7, 25), 1), (date(2025, 7, 27), None),
+    ]
+
+
+def test_convert_json_dates(tmp_path):
+    entries = [ranking_entry(1, "a")]
+    wrapped = tmp_path / "wrapped.json"
+    wrapped.write_text(json.dumps({"snapshotDate": "2025-07-26", "miniapps": entries}))
+    named = tmp_path / "top_miniapps_2025-07-27.json"
+    named.write_text(json.dumps(entries))
+    undated = tmp_path / "undated.json"
+    undated.write_text(json.dumps(entries))
+    out = str(tmp_path / "index")
+
+    assert convert_json(str(wrapped), out)[0] == date(2025, 7, 26)
+    assert convert_json(str(named), out)[0] == date(2025, 7, 27)
+    assert convert_json(str(undated), out, date(2025, 7, 28))[0] == date(2025, 7, 28)
+    with pytest.raises(SnapshotFileError):
+        convert_json(str(undated), out)
+    with IndexedSnapshot(snapshot_path(date(2025, 7, 26), out)) as snapshot:
+        assert snapshot.entries() == entries
+
+
+@pytest.mark.parametrize("data", [b"", b"MSNP", b"MCOL\x02\x00\x00\x00\x00\x00", b"MSNP\x01\x00\x05\x00\x00\x00{bad}"])
+def test_rejects_bad_files(tmp_path, data):
+    path = tmp_path / "bad.msnap"
+    path.write_bytes(data)
+    with pytest.raises(SnapshotFileError):
+        IndexedSnapshot(str(path))
+
+
+def test_encode_needs_app_ids():
+    with pytest.raises(KeyError):
+        encode_snapshot([{"rank": 1, "miniApp": {}}], DAY)
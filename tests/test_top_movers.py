@@ -0,0 +1,93 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from rank_derivation import ASOF_TOLERANCE_DAYS
+from rank_engine import RankMatrix
+from rank_store import append_day, app_metadata, open_matrix
+from top_movers import covers, top_movers
+
+START = date(2025, 7, 1)
+DAYS = 20
+CATEGORIES = ("games", "social", None)
+
+
+def _history(seed):
+    """Random rankings over DAYS days with skipped runs and apps entering and leaving."""
+    rng = random.Random(seed)
+    apps = [f"app{i:02d}" for i in range(40)]
+    days = {}
+    for d in range(DAYS):
+        if d and rng.random() < 0.2:
+            continue
+        ranked = rng.sample(apps, rng.randint(25, 40))
+        days[START + timedelta(days=d)] = [(app_id, rank) for rank, app_id in enumerate(ranked, 1)]
+    metadata = {app_id: (f"Name {app_id}", CATEGORIES[i % 3]) for i, app_id in enumerate(apps)}
+    return days, metadata
+
+
+def _brute_force(days, end_date, window, limit, category, metadata):
+    past_day = None
+    for back in range(window, window + ASOF_TOLERANCE_DAYS + 1):
+        if end_date - timedelta(days=back) in days:
+            past_day = end_date - timedelta(days=back)
+            break
+    if past_day is None or end_date not in days:
+        return None, [], []
+    current = dict(days[end_date])
+    past = dict(days[past_day])
+    moved = [
+        (app_id, current[app_id], past[app_id] - current[app_id])
+        for app_id in current
+        if app_id in past and (category is None or metadata[app_id][1] == category)
+    ]
+    gainers = sorted((m for m in moved if m[2] > 0), key=lambda m: (-m[2], m[1]))[:limit]
+    losers = sorted((m for m in moved if m[2] < 0), key=lambda m: (m[2], m[1]))[:limit]
+    return (end_date - past_day).days, gainers, losers
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_brute_force(tmp_path, seed):
+    days, metadata = _history(seed)
+    store = str(tmp_path)
+    for day, ranking in sorted(days.items()):
+        append_day(day, ranking, store, metadata)
+    matrix, apps = open_matrix(store), app_metadata(store)
+
+    for end_date in sorted(days)[-5:]:
+        for window in (1, 3, 7, 14):
+            for category in (None, "games", "unknown"):
+                for limit in (3, 10):
+                    effective, gainers, losers = _brute_force(days, end_date, window, limit, category, metadata)
+                    result = top_movers(end_date, window, limit, category, matrix, apps)
+                    assert result.effective_days == effective
+                    assert [(m.app_id, m.rank, m.change) for m in result.gainers] == gainers
+                    assert [(m.app_id, m.rank, m.change) for m in result.losers] == losers
+                    for m in result.gainers + result.losers:
+                        assert m.previous_rank == m.rank + m.change
+                        assert (m.name, m.category) == metadata[m.app_id]
+
+
+def test_store_and_row_matrix_agree(tmp_path):
+    days, metadata = _history(7)
+    store = str(tmp_path)
+    for day, ranking in sorted(days.items()):
+        append_day(day, ranking, store, metadata)
+    end_date = max(days)
+    rows = [(app_id, day, rank) for day, ranking in days.items() for app_id, rank in ranking]
+    from_rows = RankMatrix.from_rows(rows, start_date=START, end_date=end_date, snapshot_days=days)
+
+    # The database fallback (top_movers.matrix_from_db) builds this row matrix
+    for window in (1, 7):
+        stored = top_movers(end_date, window, 10, None, open_matrix(store), app_metadata(store))
+        built = top_movers(end_date, window, 10, None, from_rows, {"name": [], "category": [], "categories": []})
+        assert [(m.app_id, m.change) for m in stored.gainers] == [(m.app_id, m.change) for m in built.gainers]
+        assert [(m.app_id, m.change) for m in stored.losers] == [(m.app_id, m.change) for m in built.losers]
+
+
+def test_covers():
+    matrix = RankMatrix.empty(["a"], START, START + timedelta(days=9))
+    assert covers(matrix, START + timedelta(days=9), 9)
+    assert not covers(matrix, START + timedelta(days=9), 10)
+    assert not covers(matrix, START + timedelta(days=10), 1)
@@ -0,0 +1,172 @@
+import argparse
+import sys
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+import numpy as np
+from rank_derivation import ASOF_TOLERANCE_DAYS
+from rank_engine import RankMatrix
+from rank_store import RankStoreError, app_metadata, open_matrix
+
+# Top gainers and losers for any window length and end date, answered from the
+# memory-mapped rank store (rank_store.py) instead of a change table per window.
+# When the store does not cover the window (never built, or a fresh runner),
+# the window is read from miniapp_statistics instead; `rank_store.py --rebuild`
+# fills the store.
+# Changes follow the statistics convention: previous rank - current rank.
+
+Mover = namedtuple("Mover", ["app_id", "name", "category", "rank", "previous_rank", "change"])
+Movers = namedtuple("Movers", ["end_date", "window_days", "effective_days", "gainers", "losers"])
+
+WINDOW_ROWS = """
+    SELECT miniapp_id, stat_date, current_rank FROM miniapp_statistics
+    WHERE stat_date BETWEEN %s AND %s AND current_rank > 0
+"""
+
+
+def top_movers(end_date, window_days, limit=10, category=None, matrix=None, metadata=None):
+    """Returns Movers for the window of `window_days` ending at `end_date`.
+
+    Like the fixed windows, the comparison day may fall back up to
+    ASOF_TOLERANCE_DAYS to the nearest earlier run (effective_days is the
+    length actually used, None when there is no run to compare with). Only
+    apps ranked on both days count; `category` keeps one primary_category.
+    """
+    matrix = matrix if matrix is not None else open_matrix()
+    metadata = metadata if metadata is not None else app_metadata()
+    window = int(window_days)
+    effective = matrix.window_lengths(end_date, (window,), ASOF_TOLERANCE_DAYS)[window]
+    changes = matrix.rank_changes(end_date, (window,), tolerance=ASOF_TOLERANCE_DAYS)[window]
+    current = matrix.ranks[:, matrix.column(end_date)]
+
+    valid = ~np.ma.getmaskarray(changes)
+    names, codes, categories = metadata["name"], metadata["category"], metadata["categories"]
+    if category is not None:
+        # Apps added after the latest metadata update have no category yet
+        known = np.full(len(valid), -1, dtype=np.int64)
+        known[:len(codes)] = codes[:len(valid)]
+        valid &= known == (categories.index(category) if category in categories else -2)
+    rows = np.flatnonzero(valid)
+    deltas = changes.data[rows].astype(np.int64)
+    ranks = current[rows]
+
+    def movers(keys):
+        # Only the candidates that can make the top `limit` are fully sorted;
+        # ties keep the better current rank first, like ORDER BY change, rank
+        candidates = np.arange(len(keys))
+        if len(keys) > limit > 0:
+            candidates = np.flatnonzero(keys <= np.partition(keys, limit - 1)[limit - 1])
+        order = candidates[np.lexsort((ranks[candidates], keys[candidates]))][:limit]
+        result = []
+        for i, change in zip(rows[order], deltas[order]):
+            name = names[i] if i < len(names) else None
+            code = codes[i] if i < len(codes) else -1
+            result.append(Mover(
+                matrix.app_ids[i], name, categories[code] if code >= 0 else None,
+                int(current[i]), int(current[i] + change), int(change)
+            ))
+        return result
+
+    gainers = [m for m in movers(-deltas) if m.change > 0]
+    losers = [m for m in movers(deltas) if m.change < 0]
+    return Movers(end_date, window, effective, gainers, losers)
+
+
+def covers(matrix, end_date, window_days):
+    """True when the matrix holds both ends of the window."""
+    return matrix.start_date <= end_date - timedelta(days=window_days) and end_date <= matrix.end_date
+
+
+def matrix_from_db(cursor, end_date, window_days):
+    """(RankMatrix, metadata) of one window, read from miniapp_statistics.
+
+    Holds the window plus the as-of tolerance, in the rank store's layout, so
+    top_movers() gives the same answer as from a complete store.
+    """
+    start = end_date - timedelta(days=window_days + ASOF_TOLERANCE_DAYS)
+    cursor.execute(WINDOW_ROWS, (start, end_date))
+    rows = cursor.fetchall()
+    matrix = RankMatrix.from_rows(rows, start_date=start, end_date=end_date,
+                                  snapshot_days={day for _, day, _ in rows})
+    cursor.execute("SELECT id, name, primary_category FROM miniapps WHERE id = ANY(%s)", (matrix.app_ids,))
+    known = {app_id: (name, category) for app_id, name, category in cursor.fetchall()}
+    metadata = {"name": [], "category": [], "categories": []}
+    for app_id in matrix.app_ids:
+        name, category = known.get(app_id, (None, None))
+        if category is not None and category not in metadata["categories"]:
+            metadata["categories"].append(category)
+        metadata["name"].append(name)
+        metadata["category"].append(-1 if category is None else metadata["categories"].index(category))
+    return matrix, metadata
+
+
+def _from_db(end_date, window_days):
+    from db import DB_ERRORS, connect, release
+    conn = None
+    try:
+        conn = connect()
+        cursor = conn.cursor()
+        if end_date is None:
+            cursor.execute("SELECT MAX(stat_date) FROM miniapp_statistics")
+            end_date = cursor.fetchone()[0]
+            if end_date is None:
+                raise RankStoreError("miniapp_statistics is empty")
+        return end_date, *matrix_from_db(cursor, end_date, window_days)
+    except DB_ERRORS + (RuntimeError,) as e:
+        raise RankStoreError(f"database fallback failed ({e}); run `python rank_store.py --rebuild START`") from e
+    finally:
+        release(conn)
+
+
+def _print_movers(title, movers):
+    print(title)
+    if not movers:
+        print("   (none)")
+    for m in movers:
+        category = f" [{m.category}]" if m.category else ""
+        print(f"   {m.change:+5d}  #{m.previous_rank} -> #{m.rank}  {m.name or m.app_id}{category}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Top gainers and losers over any window, from the rank store.")
+    parser.add_argument("window_days", type=int, help="window length in days, e.g. 14")
+    parser.add_argument("--end", type=date.fromisoformat, default=None, help="end date (default: latest stored day)")
+    parser.add_argument("--category", help="only apps with this primary_category")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+    if args.window_days < 1:
+        parser.error("window_days must be at least 1")
+
+    started = time.perf_counter()
+    try:
+        try:
+            matrix, metadata = open_matrix(), app_metadata()
+            end_date = args.end or matrix.end_date
+            stored = covers(matrix, end_date, args.window_days)
+        except RankStoreError:
+            matrix = end_date = None
+            stored = False
+        result = top_movers(end_date, args.window_days, args.limit, args.category, matrix, metadata) if stored else None
+        if result is None or result.effective_days is None:
+            print(f"⚠️  The rank store does not cover the {args.window_days}-day window, reading miniapp_statistics "
+                  "(`python rank_store.py --rebuild START` fills the store)")
+            end_date, matrix, metadata = _from_db(args.end or end_date, args.window_days)
+            result = top_movers(end_date, args.window_days, args.limit, args.category, matrix, metadata)
+    except (RankStoreError, KeyError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    elapsed = (time.perf_counter() - started) * 1000
+
+    scope = f", category {args.category}" if args.category else ""
+    if result.effective_days is None:
+        print(f"❌ No run {result.window_days}-{result.window_days + ASOF_TOLERANCE_DAYS} days before {result.end_date}, in the rank store or miniapp_statistics")
+        sys.exit(1)
+    print(f"=== {result.window_days}d movers ending {result.end_date} "
+          f"(compared with {result.effective_days} days earlier{scope}) ===")
+    _print_movers("Top gainers:", result.gainers)
+    _print_movers("Top losers:", result.losers)
+    print(f"({elapsed:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,53 +1,11 @@
-import json
-import requests
-from config import get_api_headers, FARCASTER_API_URL
+from miniapp_fetcher import download_miniapps
+from backup_store import put_snapshot
+from snapshot_index import write_snapshot
+from json_codec import dumps, write_bytes
 
 def download_all_miniapps():
     """Downloads all miniapps and saves to JSON file"""
-    
-    url = f"{FARCASTER_API_URL}?limit=100"
-    headers = get_api_headers()
-    
-    all_miniapps = []
-    cursor = None
-    
-    print("Downloading miniapp rankings...")
-    
-    while True:
-        full_url = url if not cursor else url + f"&cursor={cursor}"
-        response = requests.get(full_url, headers=headers)
-        
-        if response.status_code != 200:
-            print(f"Error: {response.status_code}")
-            print(f"Response: {response.text}")
-            return None
-        
-        data = response.json()
-        
-        # Handle 'result' object
-        if 'result' in data and 'miniApps' in data['result']:
-            miniapps = data['result']['miniApps']
-        elif 'miniApps' in data:
-            miniapps = data['miniApps']
-        else:
-            print(f"Unexpected API response structure")
-            print(f"Response keys: {list(data.keys())}")
-            return None
-        
-        all_miniapps.extend(miniapps)
-        
-        print(f"   Downloaded: {len(miniapps)} miniapps")
-        
-        # Next page
-        next_cursor = data.get('next', {}).get('cursor')
-        if next_cursor:
-            cursor = next_cursor
-            print(f"   Pagination, next cursor: {cursor}")
-        else:
-            break
-    
-    print(f"Total downloaded: {len(all_miniapps)} miniapps")
-    return all_miniapps
+    return download_miniapps()
 
 def save_to_json(miniapps_data):
     """Saves miniapp data to JSON file"""
@@ -57,12 +15,15 @@ def save_to_json(miniapps_data):
         'snapshotDate': today,
         'miniapps': miniapps_data
     }
-    # Save complete data to top_miniapps.json
-    with open("top_miniapps.json", "w", encoding="utf-8") as f:
-        json.dump(output, f, ensure_ascii=False, indent=2)
+    # Save complete data to top_miniapps.json, serialized once
+    size = write_bytes("top_miniapps.json", dumps(output, pretty=True))
     print(f"Data saved: top_miniapps.json")
     print(f"   - Miniapps count: {len(miniapps_data)}")
-    print(f"   - File size: {len(json.dumps(output))} characters")
+    print(f"   - File size: {size} bytes")
+    # Keep the day in the backup store too; top_miniapps.json is overwritten tomorrow
+    written, reused = put_snapshot(miniapps_data, today)
+    print(f"   - Backup store: {written} new records, {reused} already stored")
+    print(f"   - Indexed snapshot: {write_snapshot(miniapps_data, today)}")
 
 def main():
     """Main function"""